@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for Wilderness
+
+This package is not part of the distribution. Run the benchmarks from the
+root of the repository, for instance with ``python -m benchmarks.timing``
+or ``python -m benchmarks.memory``, and compare the results of two runs of
+the timing benchmarks with ``python -m benchmarks.compare``.
+
+"""
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""Compare benchmark results
+
+Compare two result files of ``python -m benchmarks.timing``, for instance
+from before and after a change. The best time of each benchmark is compared,
+and the exit code is nonzero if a benchmark became slower than the given
+threshold.
+
+Usage::
+
+    python -m benchmarks.compare before.json after.json --threshold 1.1
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import json
+
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+
+def compare(
+    before: Dict[str, Any], after: Dict[str, Any]
+) -> List[Tuple[str, float, float, float]]:
+    """Return (name, before, after, ratio) for the shared benchmarks"""
+    rows = []
+    for name, result in after["benchmarks"].items():
+        if name not in before["benchmarks"]:
+            continue
+        old = before["benchmarks"][name]["best"]
+        new = result["best"]
+        rows.append((name, old, new, new / old))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("before", help="results of the baseline")
+    parser.add_argument("after", help="results to compare")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="fail if a benchmark is slower by more than this ratio",
+    )
+    args = parser.parse_args()
+
+    with open(args.before) as fp:
+        before = json.load(fp)
+    with open(args.after) as fp:
+        after = json.load(fp)
+
+    if before["params"] != after["params"]:
+        print("warning: results are for different parameters")
+
+    failed = False
+    print(f"{'benchmark':<24} {'before':>12} {'after':>12} {'ratio':>8}")
+    for name, old, new, ratio in compare(before, after):
+        mark = ""
+        if args.threshold is not None and ratio > args.threshold:
+            mark = " *"
+            failed = True
+        print(
+            f"{name:<24} {old * 1e6:10.1f}us {new * 1e6:10.1f}us "
+            f"{ratio:8.2f}{mark}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
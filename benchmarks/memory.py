@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""Memory benchmark
+
+Measure the memory overhead per command of a synthetic application, both
+directly after registration (when the parsers of the commands have not been
+built yet) and after all parsers have been built.
+
+Usage::
+
+    python -m benchmarks.memory --commands 5000
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from typing import Any
+from typing import Dict
+
+from .synthetic import make_application
+
+
+def _traced(func) -> Any:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = func()
+        gc.collect()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, after - before, peak - before
+
+
+def measure(n_commands: int, n_options: int = 0) -> Dict[str, Any]:
+    """Measure the per-command memory overhead in bytes"""
+    _, base, _ = _traced(lambda: make_application(0, 0))
+    app, registered, _ = _traced(
+        lambda: make_application(0, n_commands, n_options=n_options)
+    )
+
+    def build_parsers():
+        for command in app.walk_commands():
+            command.parser
+
+    _, built, _ = _traced(build_parsers)
+
+    return {
+        "commands": n_commands,
+        "options": n_options,
+        "application_bytes": base,
+        "registered_bytes": registered - base,
+        "registered_bytes_per_command": (registered - base) / n_commands,
+        "parsers_bytes": built,
+        "parsers_bytes_per_command": built / n_commands,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--commands", type=int, default=5000)
+    parser.add_argument("-k", "--options", type=int, default=0)
+    args = parser.parse_args()
+    result = measure(args.commands, n_options=args.options)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""Record output benchmark
+
+Measure the throughput of the record encoders, by encoding a generator of
+records to the null device in every output format.
+
+Usage::
+
+    python -m benchmarks.records --rows 1000000
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import Tuple
+
+from wilderness.records import ENCODERS
+from wilderness.records import write_records
+
+FIELDS = ("name", "size", "used", "available", "mounted")
+
+
+def _records(n_rows: int, mappings: bool) -> Iterator[Any]:
+    for i in range(n_rows):
+        row = (f"/dev/sd{i}", 1 << 30, i * 4096, (1 << 30) - i * 4096, "/")
+        yield dict(zip(FIELDS, row)) if mappings else row
+
+
+def _encode(fmt: str, n_rows: int, mappings: bool) -> float:
+    with open(os.devnull, "w", buffering=1 << 16) as devnull:
+        start = time.perf_counter()
+        write_records(_records(n_rows, mappings), fmt, devnull, FIELDS)
+        return time.perf_counter() - start
+
+
+def measure(fmt: str, n_rows: int, mappings: bool) -> Tuple[float, float]:
+    """Time encoding the rows, returning seconds and peak memory in kB
+
+    The peak memory is measured in a separate run, since tracing memory
+    allocations slows down encoding. This run uses at most 100,000 rows, as
+    the memory use doesn't depend on the number of rows.
+
+    """
+    elapsed = _encode(fmt, n_rows, mappings)
+    tracemalloc.start()
+    try:
+        _encode(fmt, min(n_rows, 100000), mappings)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--rows", type=int, default=1000000)
+    parser.add_argument(
+        "--mappings", action="store_true", help="use dicts instead of tuples"
+    )
+    args = parser.parse_args()
+
+    results = {}  # type: Dict[str, Dict[str, float]]
+    for fmt in ENCODERS:
+        elapsed, peak_kb = measure(fmt, args.rows, args.mappings)
+        results[fmt] = {
+            "seconds": elapsed,
+            "rows_per_second": args.rows / elapsed,
+            "peak_kb": peak_kb,
+        }
+    print(json.dumps({"rows": args.rows, "formats": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
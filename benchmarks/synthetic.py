@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""Synthetic applications for benchmarking
+
+The applications created here have N groups of M commands with K options
+each. Commands can optionally have a mutually exclusive group of options and
+long descriptions that use the formatting constructs of the man pages, so
+that the help text and man page generation are exercised as well.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+from wilderness import Application
+from wilderness import Command
+
+LONG_DESCRIPTION = """\
+The {name} command is a synthetic command that is used for benchmarking. \
+Its description is deliberately long, so that the formatting of the man pages \
+takes a realistic amount of time. The description contains lists, \
+enumerations, and indented text.
+
+* The first item of a list, which refers to --option-0.
+* The second item of a list, which contains an ellipsis...
+* The third item of a list, with a backslash \\ in it.
+
+1. The first step of an enumeration.
+2. The second step of an enumeration.
+
+\tIndented text, such as an example: synthetic {name} --option-0 value
+"""
+
+
+def describe(name: str, long: bool = False) -> str:
+    if long:
+        return LONG_DESCRIPTION.format(name=name)
+    return f"Description of {name}."
+
+
+class SyntheticCommand(Command):
+    def __init__(
+        self,
+        name: str,
+        n_options: int = 0,
+        n_exclusive: int = 0,
+        long_descriptions: bool = False,
+    ):
+        super().__init__(
+            name,
+            title=f"The {name} command",
+            description=describe(f"the {name} command", long_descriptions),
+            extra_sections=(
+                {"examples": describe(f"examples of {name}", True)}
+                if long_descriptions
+                else None
+            ),
+        )
+        self._n_options = n_options
+        self._n_exclusive = n_exclusive
+        self._long = long_descriptions
+
+    def register(self):
+        for i in range(self._n_options):
+            self.add_argument(
+                f"--option-{i}",
+                help=f"option {i} of {self.name}",
+                description=describe(f"option {i} of {self.name}", self._long),
+            )
+        if self._n_exclusive:
+            meg = self.add_mutually_exclusive_group()
+            for i in range(self._n_exclusive):
+                meg.add_argument(
+                    f"--exclusive-{i}",
+                    action="store_true",
+                    help=f"exclusive flag {i} of {self.name}",
+                    description=describe(
+                        f"flag {i} of {self.name}", self._long
+                    ),
+                )
+        self.add_argument(
+            "path",
+            nargs="?",
+            help="path argument",
+            description=describe(f"the path of {self.name}", self._long),
+        )
+
+    def handle(self) -> int:
+        return 0
+
+
+def make_application(
+    n_groups: int = 1,
+    n_commands: int = 10,
+    n_options: int = 0,
+    n_exclusive: int = 0,
+    long_descriptions: bool = False,
+) -> Application:
+    """Create a synthetic application
+
+    Parameters
+    ----------
+    n_groups : int
+        Number of command groups. If zero, the commands are added to the
+        application directly.
+
+    n_commands : int
+        Number of commands per group (or in total if there are no groups).
+
+    n_options : int
+        Number of options per command.
+
+    n_exclusive : int
+        Number of mutually exclusive flags per command.
+
+    long_descriptions : bool
+        Whether to use long descriptions with lists and enumerations for the
+        commands and options.
+
+    """
+    app = Application(
+        "synthetic",
+        version="0.0.1",
+        title="synthetic application",
+        description=describe("the synthetic application", long_descriptions),
+        add_commands_section=True,
+    )
+
+    def command(name):
+        return SyntheticCommand(
+            name,
+            n_options=n_options,
+            n_exclusive=n_exclusive,
+            long_descriptions=long_descriptions,
+        )
+
+    if n_groups == 0:
+        for j in range(n_commands):
+            app.add(command(f"cmd-{j}"))
+        return app
+
+    for i in range(n_groups):
+        group = app.add_group(f"group {i}")
+        for j in range(n_commands):
+            group.add(command(f"cmd-{i}-{j}"))
+    return app
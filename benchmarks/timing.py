@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+"""Timing benchmarks
+
+Time the main operations of Wilderness on a synthetic application: creating
+the application, parsing and dispatching a command line, formatting the help
+text, the synopsis, and the options text, formatting man page text, and
+building all man pages.
+
+Each benchmark is timed with timeit, using the best of several repeats, and
+the results are written as JSON so that they can be compared between versions
+with ``python -m benchmarks.compare``.
+
+Usage::
+
+    python -m benchmarks.timing --groups 5 --commands 20 -o results.json
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from wilderness import build_manpages
+from wilderness.__version__ import __version__
+
+from .synthetic import make_application
+
+# A benchmark takes the parameters of the synthetic application and returns
+# the function to time
+Benchmark = Callable[[Dict[str, Any]], Callable[[], Any]]
+
+BENCHMARKS = {}  # type: Dict[str, Benchmark]
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    def decorator(func: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def _command_line(params: Dict[str, Any]) -> List[str]:
+    name = "cmd-0" if params["n_groups"] == 0 else "cmd-0-0"
+    args = [name]
+    if params["n_options"]:
+        args.extend(["--option-0", "value"])
+    if params["n_exclusive"]:
+        args.append("--exclusive-0")
+    args.append("somewhere")
+    return args
+
+
+def _first_command(app):
+    # The first command is the help command
+    return app.commands[1]
+
+
+@benchmark("construct")
+def bench_construct(params):
+    return lambda: make_application(**params)
+
+
+@benchmark("construct_and_run")
+def bench_construct_and_run(params):
+    # This is what a user pays on every invocation
+    args = _command_line(params)
+    return lambda: make_application(**params).run(args=list(args))
+
+
+@benchmark("run")
+def bench_run(params):
+    app = make_application(**params)
+    args = _command_line(params)
+    return lambda: app.run(args=list(args))
+
+
+@benchmark("format_help")
+def bench_format_help(params):
+    app = make_application(**params)
+    return app.format_help
+
+
+@benchmark("command_format_help")
+def bench_command_format_help(params):
+    command = _first_command(make_application(**params))
+    return command.format_help
+
+
+@benchmark("get_synopsis")
+def bench_get_synopsis(params):
+    command = _first_command(make_application(**params))
+    return command.get_synopsis
+
+
+@benchmark("get_options_text")
+def bench_get_options_text(params):
+    command = _first_command(make_application(**params))
+    return command.get_options_text
+
+
+@benchmark("groffify")
+def bench_groffify(params):
+    app = make_application(**params)
+    man = app.create_manpage()
+    text = _first_command(app).description or ""
+    return lambda: man.groffify(text)
+
+
+@benchmark("build_manpages")
+def bench_build_manpages(params):
+    app = make_application(**params)
+    tmpdir = tempfile.mkdtemp(prefix="wilderness-bench-")
+    atexit.register(shutil.rmtree, tmpdir, True)
+
+    def func():
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                build_manpages(app, output_directory=tmpdir)
+
+    return func
+
+
+def time_benchmark(
+    func: Callable[[], Any], repeat: int = 5, min_time: float = 0.2
+) -> Dict[str, Any]:
+    """Time a function, returning statistics in seconds per call"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    # autorange aims for 0.2 seconds, scale if more time is requested
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "best": min(times),
+        "median": statistics.median(times),
+        "times": times,
+    }
+
+
+def run_benchmarks(
+    params: Dict[str, Any],
+    names: Optional[List[str]] = None,
+    repeat: int = 5,
+    min_time: float = 0.2,
+    verbose: bool = True,
+) -> Dict[str, Any]:
+    results = {}
+    for name in names or list(BENCHMARKS):
+        func = BENCHMARKS[name](params)
+        results[name] = time_benchmark(func, repeat=repeat, min_time=min_time)
+        if verbose:
+            best = results[name]["best"] * 1e6
+            print(f"{name:<24} {best:12.1f} us", file=sys.stderr)
+    return {
+        "wilderness": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "params": params,
+        "benchmarks": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-g", "--groups", type=int, default=5)
+    parser.add_argument("-m", "--commands", type=int, default=20)
+    parser.add_argument("-k", "--options", type=int, default=10)
+    parser.add_argument("-x", "--exclusive", type=int, default=2)
+    parser.add_argument(
+        "--short", action="store_true", help="use short descriptions"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "-t",
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="minimum time per repeat (seconds)",
+    )
+    parser.add_argument(
+        "-b",
+        "--benchmark",
+        action="append",
+        choices=list(BENCHMARKS),
+        help="benchmark to run (can be repeated, default: all)",
+    )
+    parser.add_argument("-o", "--output", help="output file (JSON)")
+    args = parser.parse_args()
+
+    params = {
+        "n_groups": args.groups,
+        "n_commands": args.commands,
+        "n_options": args.options,
+        "n_exclusive": args.exclusive,
+        "long_descriptions": not args.short,
+    }
+    results = run_benchmarks(
+        params,
+        names=args.benchmark,
+        repeat=args.repeat,
+        min_time=args.min_time,
+    )
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,21 @@
 from fakedf.__version__ import __version__
 
 from wilderness import Application
+from wilderness.table import Column
+from wilderness.table import SizeFormatter
+from wilderness.table import TableWriter
 
 from ._docs import DOCS
 
+# Made up file systems: (device, type, size, used, mount point)
+FILESYSTEMS = [
+    ("udev", "devtmpfs", 8267931648, 0, "/dev"),
+    ("tmpfs", "tmpfs", 1658535936, 2605056, "/run"),
+    ("/dev/nvme0n1p2", "ext4", 502392610816, 187516207104, "/"),
+    ("tmpfs", "tmpfs", 8292663296, 161705984, "/dev/shm"),
+    ("/dev/nvme0n1p1", "vfat", 535805952, 6328320, "/boot/efi"),
+]
+
 
 class FakeDFApplication(Application):
     def __init__(self):
@@ -127,7 +139,33 @@ class FakeDFApplication(Application):
         self.add_argument("--version", action="version", version=__version__)
 
     def handle(self) -> int:
-        print(f"Running fakedf with options: {self.args}")
+        if self.args.k:
+            self.args.block_size = "1K"
+        sizes = SizeFormatter.from_args(self.args)
+        columns = [Column("Filesystem")]
+        if self.args.print_type:
+            columns.append(Column("Type"))
+        columns.extend(
+            [
+                Column(sizes.header, align="right", formatter=sizes.format),
+                Column("Used", align="right", formatter=sizes.format),
+                Column("Avail", align="right", formatter=sizes.format),
+                Column("Use%", align="right"),
+                Column("Mounted on"),
+            ]
+        )
+        with TableWriter(self.stdout, columns) as table:
+            for device, fstype, size, used, mount in FILESYSTEMS:
+                if self.args.type and fstype != self.args.type:
+                    continue
+                if self.args.exclude_type == fstype:
+                    continue
+                row = [device]
+                if self.args.print_type:
+                    row.append(fstype)
+                percent = f"{-(-100 * used // size)}%"
+                row.extend([size, used, size - used, percent, mount])
+                table.write_row(row)
         return 0
 
 
@@ -8,6 +8,7 @@ from .commands import CloneCommand
 from .commands import CommitCommand
 from .commands import FetchCommand
 from .commands import InitCommand
+from .commands import RemoteCommand
 
 
 class FakeGitApplication(Application):
@@ -174,6 +175,7 @@ def build_application() -> Application:
     group = app.add_group("collaborate (see also: git help workflows)")
     group.add(FetchCommand())
     # group.add(PullCommand())
+    group.add(RemoteCommand())
 
     app.set_epilog(
         "'git help -a' and 'git help -g' list available subcommands and some\n"
@@ -4,5 +4,12 @@ from .clone import CloneCommand
 from .commit import CommitCommand
 from .fetch import FetchCommand
 from .init import InitCommand
+from .remote import RemoteCommand
 
-__all__ = ["CloneCommand", "CommitCommand", "FetchCommand", "InitCommand"]
+__all__ = [
+    "CloneCommand",
+    "CommitCommand",
+    "FetchCommand",
+    "InitCommand",
+    "RemoteCommand",
+]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from wilderness import Command
+
+
+class RemoteAddCommand(Command):
+    def __init__(self):
+        super().__init__(
+            name="add",
+            title="Add a remote",
+            description=(
+                "Add a remote named <name> for the repository at <URL>. The "
+                "command git fetch <name> can then be used to create and "
+                "update remote-tracking branches <name>/<branch>."
+            ),
+        )
+
+    def register(self):
+        self.add_argument(
+            "-f",
+            action="store_true",
+            help="run git fetch <name> after the remote is set up",
+        )
+        self.add_argument("name", help=argparse.SUPPRESS)
+        self.add_argument("url", help=argparse.SUPPRESS)
+
+    def handle(self):
+        print(f"Adding remote {self.args.name} for {self.args.url}")
+
+
+class RemoteRemoveCommand(Command):
+    def __init__(self):
+        super().__init__(
+            name="remove",
+            title="Remove a remote",
+            description=(
+                "Remove the remote named <name>. All remote-tracking branches "
+                "and configuration settings for the remote are removed."
+            ),
+            aliases=["rm"],
+        )
+
+    def register(self):
+        self.add_argument("name", help=argparse.SUPPRESS)
+
+    def handle(self):
+        print(f"Removing remote {self.args.name}")
+
+
+class RemoteCommand(Command):
+    def __init__(self):
+        super().__init__(
+            name="remote",
+            title="Manage set of tracked repositories",
+            description=(
+                'Manage the set of repositories ("remotes") whose branches '
+                "you track."
+            ),
+        )
+
+    def register(self):
+        self.add_argument(
+            "-v",
+            "--verbose",
+            action="store_true",
+            help="be a little more verbose and show remote url after name",
+        )
+        self.add(RemoteAddCommand())
+        self.add(RemoteRemoveCommand())
+
+    def handle(self):
+        print("origin")
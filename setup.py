@@ -14,12 +14,12 @@ EMAIL = "gertjanvandenburg@gmail.com"
 LICENSE = "MIT"
 LICENSE_TROVE = "License :: OSI Approved :: MIT License"
 NAME = "wilderness"
-REQUIRES_PYTHON = ">=3.6.0"
+REQUIRES_PYTHON = ">=3.7.0"
 URL = "https://github.com/GjjvdBurg/wilderness"
 VERSION = None
 
 # What packages are required for this module to be executed?
-REQUIRED = []
+REQUIRED = ['importlib_metadata>=3.6; python_version<"3.8"']
 
 docs_require = ["sphinx", "sphinx-rtd-theme", "m2r2"]
 test_require = ["green", "mypy"]
@@ -68,7 +68,14 @@ setup(
     python_requires=REQUIRES_PYTHON,
     url=URL,
     packages=find_packages(
-        exclude=["tests", "*.tests", "*.tests.*", "tests.*"]
+        exclude=[
+            "tests",
+            "*.tests",
+            "*.tests.*",
+            "tests.*",
+            "benchmarks",
+            "benchmarks.*",
+        ]
     ),
     package_data={"wilderness": ["py.typed"]},
     zip_safe=False,
@@ -83,7 +90,7 @@ setup(
         LICENSE_TROVE,
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: Implementation :: CPython",
         "Programming Language :: Python :: Implementation :: PyPy",
     ],
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for cancellation
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import os
+import signal
+import threading
+import time
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.cancellation import EXIT_INTERRUPTED
+from wilderness.cancellation import EXIT_TERMINATED
+from wilderness.cancellation import EXIT_TIMEOUT
+from wilderness.cancellation import CancellationToken
+from wilderness.cancellation import Cancelled
+from wilderness.cancellation import parse_duration
+from wilderness.tester import Tester
+
+
+class WaitCommand(Command):
+    cancellable = True
+
+    def __init__(self):
+        super().__init__("wait")
+        self.cleaned = []
+        self.started = threading.Event()
+
+    def register(self):
+        self.add_argument("--signal", type=int)
+
+    def handle(self) -> int:
+        token = self.cancellation
+        token.add_cleanup(self.cleaned.append, "first")
+        token.add_cleanup(self.cleaned.append, "second")
+        self.started.set()
+        if self.args.signal is not None:
+            os.kill(os.getpid(), self.args.signal)
+        # The first signal only cancels the token
+        while not token.wait(0.01):
+            pass
+        token.check()
+        return 0
+
+
+class SleepCommand(Command):
+    def __init__(self):
+        super().__init__("sleep")
+        self.cleaned = False
+
+    def handle(self) -> int:
+        self.cancellation.add_cleanup(setattr, self, "cleaned", True)
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(5)
+        return 0
+
+
+class CancellationTestCase(unittest.TestCase):
+    def setUp(self):
+        self._app = Application("testapp", "0.1.0")
+        self._wait = WaitCommand()
+        self._sleep = SleepCommand()
+        self._app.add(self._wait)
+        self._app.add(self._sleep)
+
+    def test_token(self):
+        token = CancellationToken()
+        self.assertFalse(token.cancelled)
+        token.check()
+        self.assertTrue(token.cancel("stopped", 3))
+        self.assertFalse(token.cancel("again", 4))
+        self.assertEqual((token.reason, token.return_code), ("stopped", 3))
+        with self.assertRaises(Cancelled) as ctx:
+            token.check()
+        self.assertEqual(ctx.exception.return_code, 3)
+        self.assertTrue(token.wait(0))
+
+        calls = []
+        token.add_cleanup(calls.append, 1)
+        token.add_cleanup(lambda: 1 / 0)
+        token.add_cleanup(calls.append, 2)
+        token.run_cleanups()
+        self.assertEqual(calls, [2, 1])
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("1.5"), 1.5)
+        self.assertEqual(parse_duration("2m"), 120)
+        self.assertEqual(parse_duration("1d"), 86400)
+        for text in ["", "0", "-1", "1w", "m"]:
+            with self.subTest(text=text):
+                with self.assertRaises(argparse.ArgumentTypeError):
+                    parse_duration(text)
+
+    def test_timeout(self):
+        self.assertIn("--timeout", self._wait.format_help())
+        self.assertNotIn("--timeout", self._sleep.format_help())
+        return_code = self._app.run(["wait", "--timeout", "0.05"])
+        self.assertEqual(return_code, EXIT_TIMEOUT)
+        self.assertEqual(self._wait.cleaned, ["second", "first"])
+
+    def test_cooperative_signal(self):
+        return_code = self._app.run(
+            ["wait", "--signal", str(int(signal.SIGINT))]
+        )
+        self.assertEqual(return_code, EXIT_INTERRUPTED)
+        self.assertEqual(self._wait.cleaned, ["second", "first"])
+        self.assertIs(
+            signal.getsignal(signal.SIGINT), signal.default_int_handler
+        )
+
+    def test_signal(self):
+        return_code = self._app.run(["sleep"])
+        self.assertEqual(return_code, EXIT_TERMINATED)
+        self.assertTrue(self._sleep.cleaned)
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+
+    def test_cancel_invocation(self):
+        token = CancellationToken()
+
+        def cancel():
+            self._wait.started.wait()
+            token.cancel("stopped by server", 1)
+
+        thread = threading.Thread(target=cancel)
+        thread.start()
+        return_code = self._app.run(["wait"], cancellation=token)
+        thread.join()
+        self.assertEqual(return_code, 1)
+        self.assertEqual(self._wait.cleaned, ["second", "first"])
+
+        # The application keeps working
+        tester = Tester(self._app, trace_memory=False)
+        tester.test_application(["wait", "--timeout", "0.01"])
+        self.assertEqual(tester.get_return_code(), EXIT_TIMEOUT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for compression
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import unittest
+
+from wilderness.compression import ThreadedReader
+from wilderness.compression import compression_for_name
+from wilderness.compression import detect_compression
+
+
+class FailingStream(io.RawIOBase):
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        raise OSError("read failed")
+
+
+class CompressionTestCase(unittest.TestCase):
+    def test_detect_compression(self):
+        self.assertEqual(detect_compression(gzip.compress(b"x")), "gzip")
+        self.assertEqual(detect_compression(bz2.compress(b"x")), "bz2")
+        self.assertEqual(detect_compression(lzma.compress(b"x")), "xz")
+        self.assertIsNone(detect_compression(b"BZh is not bzip2"))
+        self.assertIsNone(detect_compression(b""))
+
+    def test_compression_for_name(self):
+        self.assertEqual(compression_for_name("data.csv.GZ"), "gzip")
+        self.assertEqual(compression_for_name("data.bz2"), "bz2")
+        self.assertEqual(compression_for_name("data.xz"), "xz")
+        self.assertIsNone(compression_for_name("data.gz.csv"))
+
+    def test_threaded_reader(self):
+        data = bytes(range(256)) * 1000
+        reader = ThreadedReader(io.BytesIO(data), chunk_size=1000, depth=2)
+        self.assertEqual(reader.read(), data)
+        self.assertEqual(reader.read(), b"")
+        reader.close()
+
+        # Closing doesn't wait for the chunks to be read
+        reader = ThreadedReader(io.BytesIO(data), chunk_size=10, depth=1)
+        reader.read(5)
+        reader.close()
+        self.assertFalse(reader._thread.is_alive())
+
+        reader = ThreadedReader(FailingStream(), chunk_size=10)
+        with self.assertRaisesRegex(OSError, "read failed"):
+            reader.read(10)
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
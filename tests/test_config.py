@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for layered configuration
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.cache import cache_filename
+from wilderness.config import read_config_file
+
+
+class CloneCommand(Command):
+    def __init__(self):
+        super().__init__("clone", title="Clone a repository")
+
+    def register(self):
+        self.add_argument("--depth", type=int, default=0)
+        self.add_argument("--bare", action="store_true")
+        self.add_argument("--branch", action="append", default=[])
+
+    def handle(self) -> int:
+        return 0
+
+
+class ConfigTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._cachedir = os.path.join(self._tmpdir.name, "cache")
+        self._env = mock.patch.dict(
+            os.environ, {"WILDERNESS_CACHE_DIR": self._cachedir}
+        )
+        self._env.start()
+        self._config = os.path.join(self._tmpdir.name, "config.ini")
+        with open(self._config, "w") as fp:
+            fp.write("[testapp]\nquiet = yes\n\n")
+            fp.write("[clone]\ndepth = 3\nbranch = main dev\n")
+
+    def tearDown(self):
+        self._env.stop()
+        self._tmpdir.cleanup()
+
+    def _make_app(self):
+        app = Application(
+            "testapp",
+            "0.1.0",
+            config_file=self._config,
+            env_prefix="TESTAPP",
+        )
+        app.add_argument("-q", "--quiet", action="store_true")
+        cmd = CloneCommand()
+        app.add(cmd)
+        return app, cmd
+
+    def test_config_file(self):
+        app, cmd = self._make_app()
+        app.run(["clone"])
+        self.assertTrue(cmd.args.quiet)
+        self.assertEqual(cmd.args.depth, 3)
+        self.assertFalse(cmd.args.bare)
+        self.assertEqual(cmd.args.branch, ["main", "dev"])
+
+    def test_environment_overrides_config(self):
+        env = {"TESTAPP_CLONE_DEPTH": "7", "TESTAPP_CLONE_BARE": "true"}
+        with mock.patch.dict(os.environ, env):
+            app, cmd = self._make_app()
+            app.run(["clone"])
+        self.assertEqual(cmd.args.depth, 7)
+        self.assertTrue(cmd.args.bare)
+
+    def test_command_line_overrides_all(self):
+        with mock.patch.dict(os.environ, {"TESTAPP_CLONE_DEPTH": "7"}):
+            app, cmd = self._make_app()
+            app.run(["clone", "--depth", "1"])
+        self.assertEqual(cmd.args.depth, 1)
+
+    def test_defaults_reset_between_runs(self):
+        app, cmd = self._make_app()
+        with mock.patch.dict(os.environ, {"TESTAPP_CLONE_DEPTH": "7"}):
+            app.run(["clone"])
+        self.assertEqual(cmd.args.depth, 7)
+        app.run(["clone"])
+        self.assertEqual(cmd.args.depth, 3)
+
+        with open(self._config, "w") as fp:
+            fp.write("[testapp]\n")
+        os.utime(self._config, ns=(0, 0))
+        app.run(["clone"])
+        self.assertEqual(cmd.args.depth, 0)
+        self.assertFalse(cmd.args.quiet)
+        self.assertEqual(cmd.args.branch, [])
+
+    def test_invalid_boolean(self):
+        with mock.patch.dict(os.environ, {"TESTAPP_QUIET": "maybe"}):
+            app, _ = self._make_app()
+            with self.assertRaises(SystemExit):
+                with mock.patch("sys.stderr"):
+                    app.run(["clone"])
+
+    def test_cache(self):
+        sections = read_config_file(self._config)
+        self.assertEqual(sections["clone"]["depth"], "3")
+        self.assertTrue(os.path.exists(cache_filename("config", self._config)))
+
+        # The cache is used when the file is unchanged
+        with mock.patch(
+            "wilderness.config._parse_config_file"
+        ) as parse_config_file:
+            self.assertEqual(read_config_file(self._config), sections)
+            parse_config_file.assert_not_called()
+
+        # And invalidated when the file changes
+        with open(self._config, "a") as fp:
+            fp.write("bare = true\n")
+        sections = read_config_file(self._config)
+        self.assertEqual(sections["clone"]["bare"], "true")
+
+    def test_missing_file(self):
+        missing = os.path.join(self._tmpdir.name, "missing.ini")
+        self.assertEqual(read_config_file(missing), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for external commands
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import os
+import shutil
+import signal
+import stat
+import tempfile
+import unittest
+
+from unittest import mock
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.external import find_external_commands
+from wilderness.external import spawn
+
+SCRIPT = """#!/bin/sh
+out="$1"
+shift
+echo "$@" > "$out"
+exit 3
+"""
+
+
+class StatusCommand(Command):
+    def __init__(self):
+        super().__init__("status", title="Show status")
+
+    def handle(self) -> int:
+        return 0
+
+
+@unittest.skipIf(os.name != "posix", "requires a POSIX shell")
+class ExternalCommandsTestCase(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._bindir = os.path.join(self._tmpdir, "bin")
+        os.makedirs(self._bindir)
+        for name in ["testapp-hello", "testapp-status", "other-tool"]:
+            self._add_script(name)
+        with open(os.path.join(self._bindir, "testapp-noexec"), "w") as fp:
+            fp.write("")
+
+        self._env = mock.patch.dict(
+            os.environ,
+            {
+                "PATH": self._bindir + os.pathsep + os.environ["PATH"],
+                "WILDERNESS_CACHE_DIR": os.path.join(self._tmpdir, "cache"),
+            },
+        )
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        shutil.rmtree(self._tmpdir)
+
+    def _add_script(self, name):
+        filename = os.path.join(self._bindir, name)
+        with open(filename, "w") as fp:
+            fp.write(SCRIPT)
+        os.chmod(filename, os.stat(filename).st_mode | stat.S_IXUSR)
+
+    def test_find_external_commands(self):
+        path = self._bindir
+        exp = {
+            "hello": os.path.join(path, "testapp-hello"),
+            "status": os.path.join(path, "testapp-status"),
+        }
+        self.assertEqual(find_external_commands("testapp", path=path), exp)
+        with mock.patch("wilderness.external._scan_path") as scan:
+            self.assertEqual(find_external_commands("testapp", path=path), exp)
+            scan.assert_not_called()
+
+        self._add_script("testapp-new")
+        os.utime(path, ns=(0, 0))
+        found = find_external_commands("testapp", path=path)
+        self.assertIn("new", found)
+
+    def test_dispatch(self):
+        app = Application("testapp", "0.1.0", external_commands=True)
+        app.add(StatusCommand())
+        self.assertEqual(
+            app.external_commands,
+            {"hello": os.path.join(self._bindir, "testapp-hello")},
+        )
+
+        outfile = os.path.join(self._tmpdir, "out.txt")
+        ret = app.run(["hello", outfile, "--flag", "-x", "value"])
+        self.assertEqual(ret, 3)
+        with open(outfile) as fp:
+            self.assertEqual(fp.read(), "--flag -x value\n")
+
+        # registered commands take precedence
+        self.assertEqual(app.run(["status"]), 0)
+
+    def test_spawn_ignores_interrupts(self):
+        # The interrupt that the executable sends to the application is
+        # ignored while the application waits
+        handler = signal.getsignal(signal.SIGINT)
+        script = "kill -INT $PPID; kill -INT $$; exit 4"
+        for fallback in [False, True]:
+            with self.subTest(fallback=fallback), mock.patch.dict(os.__dict__):
+                if fallback:
+                    os.__dict__.pop("posix_spawn", None)
+                # The executable is interrupted with the default handler
+                code = spawn(["/bin/sh", "-c", script])
+            self.assertEqual(code, 128 + signal.SIGINT)
+            self.assertIs(signal.getsignal(signal.SIGINT), handler)
+
+    def test_disabled(self):
+        app = Application("testapp", "0.1.0")
+        self.assertEqual(app.external_commands, {})
+        with mock.patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                app.run(["hello"])
+
+    def test_help(self):
+        app = Application("testapp", "0.1.0", external_commands=True)
+        app.add(StatusCommand())
+        help_text = app.format_help()
+        self.assertIn("External commands:\n  hello\n", help_text)
+
+
+if __name__ == "__main__":
+    unittest.main()
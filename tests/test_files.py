@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for file arguments
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tempfile
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.files import InputFile
+from wilderness.files import LazyFile
+from wilderness.files import LazyOutputFile
+from wilderness.files import OutputFile
+from wilderness.streams import use_streams
+from wilderness.tester import Tester
+
+CONTENTS = b"".join(b"line %d\n" % i for i in range(1000)) + b"last"
+
+COMPRESSORS = {
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+
+
+class CountCommand(Command):
+    def __init__(self):
+        super().__init__("count")
+
+    def register(self):
+        self.add_argument("input", type=InputFile(chunk_size=64))
+
+    def handle(self) -> int:
+        count = sum(1 for _ in self.args.input.lines())
+        self.stdout.write(f"{count}\n")
+        return 0
+
+
+class CopyCommand(Command):
+    def __init__(self):
+        super().__init__("copy")
+
+    def register(self):
+        self.add_argument("input", type=InputFile())
+        self.add_argument("-o", "--output", type=OutputFile(), default="-")
+
+    def handle(self) -> int:
+        out = self.args.output.open_text()
+        for line in self.args.input.lines(encoding="utf-8"):
+            out.write(line)
+        return 0
+
+
+class FilesTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._tmpdir.name, "data.txt")
+        with open(self._path, "wb") as fp:
+            fp.write(CONTENTS)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_lazy_open(self):
+        lazy_file = InputFile()(self._path)
+        self.assertIsNone(lazy_file._file)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            InputFile()(os.path.join(self._tmpdir.name, "missing"))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            InputFile()(self._tmpdir.name)
+
+    def test_chunks(self):
+        with LazyFile(self._path, chunk_size=100) as lazy_file:
+            chunks = list(bytes(c) for c in lazy_file.chunks())
+            self.assertEqual(b"".join(chunks), CONTENTS)
+            self.assertTrue(all(len(c) == 100 for c in chunks[:-1]))
+            # Every iteration starts at the beginning
+            self.assertEqual(len(list(lazy_file.chunks(1 << 20))), 1)
+
+    def test_lines(self):
+        for chunk_size in [1, 5, 7, 4096]:
+            with self.subTest(chunk_size=chunk_size):
+                lazy_file = LazyFile(self._path, chunk_size=chunk_size)
+                lines = list(lazy_file.lines())
+                lazy_file.close()
+                self.assertEqual(lines, CONTENTS.splitlines(keepends=True))
+
+        lazy_file = LazyFile(self._path)
+        self.assertEqual(next(lazy_file.lines(encoding="utf-8")), "line 0\n")
+        lazy_file.close()
+
+    def test_mmap(self):
+        lazy_file = LazyFile(self._path)
+        self.assertTrue(lazy_file.mappable)
+        data = lazy_file.mmap()
+        self.assertEqual(data[:6], b"line 0")
+        self.assertEqual(data[-4:], b"last")
+        lazy_file.close()
+        self.assertTrue(data.closed)
+
+        empty = os.path.join(self._tmpdir.name, "empty")
+        open(empty, "wb").close()
+        with LazyFile(empty) as lazy_file:
+            self.assertEqual(lazy_file.mmap(), b"")
+
+    def test_stdin(self):
+        app = Application("testapp", "0.1.0")
+        app.add(CountCommand())
+        tester = Tester(app, trace_memory=False)
+        tester.test_command("count", ["-"], stdin="a\nb\nc")
+        self.assertEqual(tester.get_stdout(), "3\n")
+
+        # A pipe can't be mapped into memory
+        read_fd, write_fd = os.pipe()
+        os.close(write_fd)
+        with open(read_fd) as stdin, use_streams(stdin=stdin):
+            with self.assertRaises(io.UnsupportedOperation):
+                LazyFile("-").mmap()
+
+    def test_close_after_handle(self):
+        app = Application("testapp", "0.1.0")
+        app.add(CountCommand())
+        self.assertEqual(app.run(["count", self._path]), 0)
+        self.assertTrue(app.args.input.closed)
+        self.assertTrue(app.args.input._file is None)
+
+    def test_compressed_input(self):
+        for name, compress in COMPRESSORS.items():
+            path = os.path.join(self._tmpdir.name, "data")
+            with open(path, "wb") as fp:
+                fp.write(compress(CONTENTS))
+            for threaded in [False, True]:
+                with self.subTest(compression=name, threaded=threaded):
+                    lazy_file = LazyFile(path, 64, threaded=threaded)
+                    self.assertEqual(lazy_file.compression, name)
+                    self.assertFalse(lazy_file.mappable)
+                    self.assertEqual(b"".join(lazy_file.lines()), CONTENTS)
+                    lazy_file.close()
+
+        lazy_file = LazyFile(path, decompress=False)
+        self.assertIsNone(lazy_file.compression)
+        self.assertEqual(lazy_file.mmap()[:6], b"\xfd7zXZ\x00")
+        lazy_file.close()
+
+    def test_compressed_stdin(self):
+        raw = io.BufferedReader(io.BytesIO(gzip.compress(CONTENTS)))
+        stdin = io.TextIOWrapper(raw)
+        with use_streams(stdin=stdin):
+            with LazyFile("-") as lazy_file:
+                self.assertEqual(lazy_file.compression, "gzip")
+                self.assertEqual(b"".join(lazy_file.chunks()), CONTENTS)
+        # The standard input isn't closed
+        self.assertFalse(stdin.closed)
+
+    def test_compressed_output(self):
+        for name, ext in [("gzip", ".gz"), ("bz2", ".bz2"), ("xz", ".xz")]:
+            with self.subTest(compression=name):
+                path = os.path.join(self._tmpdir.name, "out.txt" + ext)
+                output = OutputFile()(path)
+                self.assertEqual(output.compression, name)
+                self.assertFalse(os.path.exists(path))
+                with output:
+                    for i in range(1000):
+                        output.open().write(b"line %d\n" % i)
+                with LazyFile(path) as lazy_file:
+                    self.assertEqual(lazy_file.compression, name)
+                    self.assertEqual(
+                        b"".join(lazy_file.lines()), CONTENTS[:-4]
+                    )
+
+        path = os.path.join(self._tmpdir.name, "out.txt")
+        with LazyOutputFile(path) as output:
+            self.assertIsNone(output.compression)
+            output.open_text().write("text\n")
+            with self.assertRaises(ValueError):
+                output.open()
+        with open(path, "rb") as fp:
+            self.assertEqual(fp.read(), b"text\n")
+
+        with self.assertRaises(argparse.ArgumentTypeError):
+            OutputFile()(os.path.join(self._tmpdir.name, "missing", "out"))
+
+    def test_copy(self):
+        source = os.path.join(self._tmpdir.name, "data.xz")
+        with open(source, "wb") as fp:
+            fp.write(lzma.compress(CONTENTS))
+        target = os.path.join(self._tmpdir.name, "copy.gz")
+
+        app = Application("testapp", "0.1.0")
+        app.add(CopyCommand())
+        tester = Tester(app, trace_memory=False)
+        tester.test_application(["copy", source, "-o", target])
+        self.assertEqual(tester.get_return_code(), 0)
+        self.assertTrue(app.args.output.closed)
+        with gzip.open(target, "rb") as fp:
+            self.assertEqual(fp.read(), CONTENTS)
+
+        tester.test_application(["copy", source])
+        self.assertEqual(tester.get_stdout(), CONTENTS.decode())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -61,7 +61,7 @@ class GroupTestCase(unittest.TestCase):
 
         self.assertEqual(group.application, app)
         self.assertEqual(group.title, "group 1")
-        self.assertEqual(group.commands, [cmd1, cmd2])
+        self.assertEqual(group.commands, (cmd1, cmd2))
         self.assertEqual(len(group), 2)
         self.assertFalse(group.is_root)
 
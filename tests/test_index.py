@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for the command name index
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import contextlib
+import io
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.index import BKTree
+from wilderness.index import CommandIndex
+from wilderness.index import levenshtein
+
+
+class NamedCommand(Command):
+    def handle(self) -> int:
+        return 0
+
+
+class CommandIndexTestCase(unittest.TestCase):
+    def test_levenshtein(self):
+        self.assertEqual(levenshtein("fetch", "fetch"), 0)
+        self.assertEqual(levenshtein("fech", "fetch"), 1)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+
+    def test_bktree(self):
+        tree = BKTree(["fetch", "fork", "commit", "clone", "checkout"])
+        self.assertEqual(tree.search("fetc", 1), [(1, "fetch")])
+        self.assertEqual(tree.search("clon", 1), [(1, "clone")])
+        self.assertEqual(tree.search("xyz", 1), [])
+
+    def test_resolve(self):
+        index = CommandIndex()
+        index.add("commit", aliases=["ci"])
+        index.add("checkout", aliases=["co"])
+        self.assertEqual(index.resolve("commit"), "commit")
+        self.assertEqual(index.resolve("ci"), "commit")
+        self.assertIsNone(index.resolve("comm"))
+
+    def test_resolve_prefix(self):
+        index = CommandIndex(allow_prefix=True)
+        index.add("commit", aliases=["ci"])
+        index.add("checkout", aliases=["co"])
+        index.add("clone")
+        self.assertEqual(index.resolve("com"), "commit")
+        self.assertEqual(index.resolve("cl"), "clone")
+        self.assertIsNone(index.resolve("c"))
+        self.assertEqual(index.matches("c"), ["checkout", "clone", "commit"])
+
+    def test_suggest(self):
+        index = CommandIndex()
+        for name in ["fetch", "fork", "commit", "clone"]:
+            index.add(name)
+        self.assertEqual(index.suggest("fecth"), ["fetch"])
+        self.assertEqual(index.suggest("comit"), ["commit"])
+        self.assertEqual(index.suggest("status"), [])
+
+
+class ApplicationIndexTestCase(unittest.TestCase):
+    def _make_app(self, **kwargs):
+        app = Application("testapp", "0.1.0", **kwargs)
+        app.add(NamedCommand("commit", aliases=["ci"]))
+        app.add(NamedCommand("checkout"))
+        return app
+
+    def test_alias(self):
+        app = self._make_app()
+        self.assertEqual(app.run(["ci"]), 0)
+        self.assertEqual(app.args.target, "commit")
+        self.assertEqual(app.get_command("ci").name, "commit")
+
+    def test_abbreviation(self):
+        app = self._make_app(allow_command_abbrev=True)
+        self.assertEqual(app.run(["chec"]), 0)
+        self.assertEqual(app.args.target, "checkout")
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with self.assertRaises(SystemExit):
+                app.run(["c"])
+        self.assertIn(
+            "ambiguous choice: 'c' could match 'checkout', 'commit'",
+            stderr.getvalue(),
+        )
+
+    def test_no_abbreviation_by_default(self):
+        app = self._make_app()
+        with self.assertRaises(KeyError):
+            app.get_command("chec")
+
+    def test_suggestion(self):
+        app = self._make_app()
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with self.assertRaises(SystemExit):
+                app.run(["comit"])
+        self.assertIn(
+            "error: argument command: invalid choice: 'comit' "
+            "(did you mean 'commit'?)",
+            stderr.getvalue(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
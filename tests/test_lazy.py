@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for deferred type conversion
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import contextlib
+import io
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.lazy import DeferredValue
+from wilderness.lazy import LazyNamespace
+
+
+class CountingConverter:
+    __name__ = "int"
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, value):
+        self.calls += 1
+        return int(value)
+
+
+class NumberCommand(Command):
+    def __init__(self, converter):
+        super().__init__("number", title="Use a number")
+        self._converter = converter
+
+    def register(self):
+        self.add_argument("value", type=self._converter)
+        self.add_argument("--extra", type=self._converter, default="5")
+        self.add_argument("--many", type=self._converter, nargs="*")
+        self.add_argument("--mode", type=int, choices=[1, 2], default=1)
+
+    def handle(self) -> int:
+        return 0
+
+
+class LazyNamespaceTestCase(unittest.TestCase):
+    def setUp(self):
+        self._conv = CountingConverter()
+        self._app = Application("testapp", "0.1.0")
+        self._cmd = NumberCommand(self._conv)
+        self._app.add(self._cmd)
+
+    def test_deferred_until_access(self):
+        self._app.run(["number", "3", "--many", "1", "2"], lazy=True)
+        args = self._cmd.args
+        self.assertIsInstance(args, LazyNamespace)
+        self.assertEqual(self._conv.calls, 0)
+        self.assertIsInstance(vars(args)["value"], DeferredValue)
+
+        self.assertEqual(args.value, 3)
+        self.assertEqual(self._conv.calls, 1)
+        # memoized
+        self.assertEqual(args.value, 3)
+        self.assertEqual(self._conv.calls, 1)
+
+        self.assertEqual(args.many, [1, 2])
+        self.assertEqual(args.extra, 5)
+        self.assertEqual(self._conv.calls, 4)
+
+    def test_choices_converted_eagerly(self):
+        self._app.run(["number", "3", "--mode", "2"], lazy=True)
+        self.assertEqual(vars(self._cmd.args)["mode"], 2)
+
+    def test_not_lazy_by_default(self):
+        self._app.run(["number", "3"])
+        self.assertEqual(self._conv.calls, 2)
+        self.assertNotIsInstance(self._cmd.args, LazyNamespace)
+
+    def test_conversion_error(self):
+        self._app.run(["number", "abc"], lazy=True)
+        self._cmd.parser.exit_on_error = False
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            with self.assertRaises(argparse.ArgumentError) as cm:
+                self._cmd.args.value
+        self.assertEqual(
+            str(cm.exception), "argument value: invalid int value: 'abc'"
+        )
+        self.assertIn("invalid int value: 'abc'", stderr.getvalue())
+
+    def test_requires_lazy_namespace(self):
+        with self.assertRaises(ValueError):
+            self._app.run(
+                ["number", "3"], namespace=argparse.Namespace(), lazy=True
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
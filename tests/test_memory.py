@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for memory instrumentation
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from unittest import mock
+
+from wilderness import Application
+from wilderness import Command
+
+
+class GrowCommand(Command):
+    def __init__(self):
+        super().__init__("grow")
+
+    def handle(self) -> int:
+        self.checkpoint("start")
+        data = [bytearray(1024) for _ in range(1000)]
+        self.checkpoint("allocated")
+        del data
+        self.checkpoint("released")
+        return 0
+
+
+class MemoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._output = os.path.join(self._tmpdir.name, "memory.json")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_checkpoints_without_tracing(self):
+        app = Application("testapp", "0.1.0", trace_memory=True)
+        app.add(GrowCommand())
+        self.assertEqual(app.run(["grow"]), 0)
+        self.assertFalse(os.path.exists(self._output))
+
+    def test_trace_memory(self):
+        app = Application("testapp", "0.1.0", trace_memory=True)
+        app.add(GrowCommand())
+        argv = ["--trace-memory", self._output, "--trace-memory-top", "3"]
+        self.assertEqual(app.run(argv + ["grow"]), 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        with open(self._output) as fp:
+            report = json.load(fp)
+        self.assertEqual(report["command"], ["grow"])
+        self.assertEqual(report["return_code"], 0)
+        self.assertGreater(report["traced_peak_kb"], 1000)
+        self.assertLessEqual(len(report["top"]), 3)
+        if os.name == "posix":
+            self.assertGreater(report["peak_rss_kb"], 0)
+
+        names = [c["name"] for c in report["checkpoints"]]
+        self.assertEqual(names, ["start", "allocated", "released"])
+        allocated = report["checkpoints"][1]
+        self.assertEqual(len(allocated["diff"]), 3)
+        top_site = allocated["diff"][0]
+        self.assertEqual(top_site["file"], __file__)
+        self.assertGreater(top_site["size_diff_kb"], 1000)
+        released = report["checkpoints"][2]
+        self.assertLess(released["traced_current_kb"], 1000)
+
+    def test_trace_memory_environment(self):
+        env = {"WILDERNESS_TRACE_MEMORY": self._output}
+        with mock.patch.dict(os.environ, env):
+            app = Application("testapp", "0.1.0")
+            app.add(GrowCommand())
+            self.assertNotIn("--trace-memory", app.get_synopsis())
+            self.assertEqual(app.run(["grow"]), 0)
+        self.assertTrue(os.path.exists(self._output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for usage metrics
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from unittest import mock
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.metrics import JSONLinesWriter
+from wilderness.metrics import MetricsHook
+from wilderness.metrics import used_options
+
+
+class CloneCommand(Command):
+    def __init__(self):
+        super().__init__("clone")
+
+    def register(self):
+        self.add_argument("--depth", type=int)
+        self.add_argument("--bare", action="store_true")
+        self.add_argument("-v", "--verbose", action="store_true")
+        self.add_argument("-o", "--origin")
+        self.add_argument("url")
+
+    def handle(self) -> int:
+        return 2 if self.args.bare else 0
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _app(self, filename):
+        app = Application("testapp", "0.1.0", metrics_file=filename)
+        app.add_argument("-q", "--quiet", action="store_true")
+        app.add(CloneCommand())
+        (hook,) = [h for h in app._hooks if isinstance(h, MetricsHook)]
+        return app, hook
+
+    def test_json_lines(self):
+        filename = os.path.join(self._tmpdir.name, "metrics.jsonl")
+        app, hook = self._app(filename)
+        app.run(["-q", "clone", "--dep=1", "--", "--secret"])
+        app.run(["clone", "--bare", "https://example.com/secret"])
+        self.assertFalse(os.path.exists(filename))
+        hook.flush()
+
+        with open(filename) as fp:
+            records = [json.loads(line) for line in fp]
+        self.assertEqual(len(records), 2)
+        first, second = records
+        self.assertEqual(first["command"], "clone")
+        self.assertEqual(first["options"], ["-q", "--depth"])
+        self.assertEqual(first["return_code"], 0)
+        self.assertEqual(second["options"], ["--bare"])
+        self.assertEqual(second["return_code"], 2)
+        self.assertNotIn("secret", json.dumps(records))
+        for key in ["duration", "cpu_time", "peak_rss_kb", "timestamp"]:
+            self.assertIn(key, first)
+
+    def test_combined_short_options(self):
+        app, _ = self._app(os.path.join(self._tmpdir.name, "metrics.jsonl"))
+        command = app.get_command("clone")
+        parsers = [app.parser, command.parser]
+        argv = ["-q", "clone", "-vorigin", "-vx", "url"]
+        self.assertEqual(used_options(argv, parsers), ["-q", "-v", "-o"])
+
+    def test_duration_includes_parsing(self):
+        class SlowCommand(Command):
+            def __init__(self):
+                super().__init__("slow")
+
+            def register(self):
+                time.sleep(0.05)
+
+            def handle(self):
+                return 0
+
+        filename = os.path.join(self._tmpdir.name, "metrics.jsonl")
+        app, hook = self._app(filename)
+        app.add(SlowCommand())
+        app.run(["slow"])
+        hook.flush()
+        with open(filename) as fp:
+            (record,) = [json.loads(line) for line in fp]
+        self.assertGreaterEqual(record["duration"], 0.05)
+
+    def test_rotation(self):
+        filename = os.path.join(self._tmpdir.name, "metrics.jsonl")
+        writer = JSONLinesWriter(filename, max_bytes=100, backup_count=2)
+        for i in range(10):
+            writer.write([{"i": i, "padding": "x" * 50}])
+        files = sorted(os.listdir(self._tmpdir.name))
+        self.assertIn("metrics.jsonl.2", files)
+        self.assertNotIn("metrics.jsonl.3", files)
+        with open(filename) as fp:
+            lines = fp.readlines()
+        self.assertLess(len(lines), 3)
+        self.assertEqual(json.loads(lines[-1])["i"], 9)
+
+    def test_partial_writes(self):
+        filename = os.path.join(self._tmpdir.name, "metrics.jsonl")
+        write = os.write
+        records = [{"i": i, "padding": "x" * 50} for i in range(3)]
+        with mock.patch(
+            "os.write", side_effect=lambda fd, data: write(fd, data[:7])
+        ):
+            JSONLinesWriter(filename).write(records)
+        with open(filename) as fp:
+            self.assertEqual([json.loads(line) for line in fp], records)
+
+    def test_prometheus(self):
+        filename = os.path.join(self._tmpdir.name, "testapp.prom")
+        app, hook = self._app(filename)
+        app.run(["clone", "url"])
+        hook.flush()
+        app.run(["clone", "--bare", "url"])
+        app.run(["clone", "url"])
+        hook.flush()
+
+        with open(filename) as fp:
+            content = fp.read()
+        self.assertIn("# TYPE testapp_invocations_total counter", content)
+        self.assertIn(
+            'testapp_invocations_total{command="clone",return_code="0"} 2.0',
+            content,
+        )
+        self.assertIn(
+            'testapp_invocations_total{command="clone",return_code="2"} 1.0',
+            content,
+        )
+        self.assertIn(
+            'testapp_option_uses_total{command="clone",option="--bare"} 1.0',
+            content,
+        )
+        self.assertIn("testapp_last_invocation_timestamp_seconds ", content)
+
+    def test_environment(self):
+        filename = os.path.join(self._tmpdir.name, "metrics.jsonl")
+        with mock.patch.dict(os.environ, {"WILDERNESS_METRICS": filename}):
+            _, hook = self._app(None)
+        self.assertEqual(hook.filename, filename)
+
+
+if __name__ == "__main__":
+    unittest.main()
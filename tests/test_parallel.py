@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for parallel execution
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import threading
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.parallel import ExecutorPool
+from wilderness.parallel import default_jobs
+from wilderness.tester import Tester
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+class SquareCommand(Command):
+    parallel = "thread"
+
+    def __init__(self):
+        super().__init__("square")
+        self.executors = []
+
+    def handle(self) -> int:
+        self.executors.append(self.executor)
+        self.stdout.write(f"{sum(self.executor.map(square, range(10)))}\n")
+        return 0
+
+
+class ProcessCommand(Command):
+    parallel = "process"
+
+    def __init__(self):
+        super().__init__("process")
+
+    def handle(self) -> int:
+        self.stdout.write(f"{sum(self.executor.map(square, range(10)))}\n")
+        return 0
+
+
+class InterruptCommand(Command):
+    parallel = "thread"
+
+    def __init__(self):
+        super().__init__("interrupt")
+        self.futures = []
+
+    def handle(self) -> int:
+        executor = self.executor
+        self.futures = [executor.submit(square, i) for i in range(1000)]
+        raise KeyboardInterrupt
+
+
+class ParallelTestCase(unittest.TestCase):
+    def setUp(self):
+        self._app = Application("testapp", "0.1.0")
+        self._square = SquareCommand()
+        self._app.add(self._square)
+        self._app.add(ProcessCommand())
+        self._interrupt = InterruptCommand()
+        self._app.add(self._interrupt)
+        self._tester = Tester(self._app, trace_memory=False)
+
+    def tearDown(self):
+        self._app.shutdown_executors()
+
+    def test_jobs_option(self):
+        help_text = self._square.format_help()
+        self.assertIn("--jobs", help_text)
+        self.assertIn(f"(default: {default_jobs()})", help_text)
+
+        with self.assertRaises(SystemExit):
+            self._tester.test_application(["square", "-j", "0"])
+        self.assertIn("invalid number of jobs", self._tester.get_stderr())
+
+    def test_shared_executor(self):
+        for _ in range(2):
+            self._tester.test_application(["square", "-j", "2"])
+            self.assertEqual(self._tester.get_stdout(), "285\n")
+        first, second = self._square.executors
+        self.assertIs(first, second)
+        self.assertEqual(first._max_workers, 2)
+
+        # A different number of jobs replaces the executor
+        self._tester.test_application(["square", "--jobs", "3"])
+        third = self._square.executors[-1]
+        self.assertIsNot(third, first)
+        self.assertEqual(third._max_workers, 3)
+
+        self._app.shutdown_executors()
+        with self.assertRaises(RuntimeError):
+            third.submit(square, 2)
+
+    def test_concurrent_sizes(self):
+        pool = ExecutorPool()
+        with pool.invocation():
+            first = pool.get("thread", 2)
+
+            # Another invocation asks for a different number of jobs while
+            # the first one still uses its executor
+            others = []
+
+            def other():
+                with pool.invocation():
+                    others.append(pool.get("thread", 3))
+
+            thread = threading.Thread(target=other)
+            thread.start()
+            thread.join()
+            self.assertEqual(first.submit(square, 3).result(), 9)
+        # The old executor is shut down when it is no longer used
+        with self.assertRaises(RuntimeError):
+            first.submit(square, 2)
+        self.assertEqual(others[0].submit(square, 4).result(), 16)
+        pool.shutdown()
+
+    def test_process_executor(self):
+        self._tester.test_application(["process", "-j", "2"])
+        self.assertEqual(self._tester.get_stdout(), "285\n")
+
+    def test_interrupt(self):
+        with self.assertRaises(KeyboardInterrupt):
+            self._app.run(["interrupt", "-j", "1"])
+        self.assertTrue(any(f.cancelled() for f in self._interrupt.futures))
+
+
+if __name__ == "__main__":
+    unittest.main()
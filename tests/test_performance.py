@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for the performance mode
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import wilderness
+
+from wilderness import Application
+from wilderness import Command
+
+
+class ThresholdCommand(Command):
+    def __init__(self):
+        super().__init__("threshold")
+        self.threshold = None
+
+    def handle(self) -> int:
+        self.threshold = gc.get_threshold()
+        return 3
+
+
+class PerformanceTestCase(unittest.TestCase):
+    def tearDown(self):
+        gc.unfreeze()
+
+    def test_gc_tuning(self):
+        before = gc.get_threshold()
+        app = Application("testapp", "0.1.0", performance=True)
+        command = ThresholdCommand()
+        app.add(command)
+        self.assertEqual(app.run(["threshold"]), 3)
+        self.assertEqual(command.threshold, (50000, 20, 20))
+        self.assertEqual(gc.get_threshold(), before)
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+    def test_main_fast_exit(self):
+        script = textwrap.dedent(
+            """
+            import atexit
+            import sys
+            import threading
+
+            from wilderness import Application
+            from wilderness.files import LazyOutputFile
+
+            # Files that are opened in a worker thread aren't closed when
+            # the command returns
+            output = LazyOutputFile(sys.argv[1])
+
+            class App(Application):
+                def handle(self):
+                    print("output", end="")
+                    write = lambda: output.open().write(b"data")
+                    thread = threading.Thread(target=write)
+                    thread.start()
+                    thread.join()
+                    return 4
+
+            atexit.register(lambda: print("cleanup", file=sys.stderr))
+            app = App("testapp", "0.1.0", add_help=False, performance=True)
+            app.main([])
+            """
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "script.py")
+            with open(filename, "w") as fp:
+                fp.write(script)
+            outfile = os.path.join(tmpdir, "out.txt")
+            root = os.path.dirname(os.path.dirname(wilderness.__file__))
+            env = dict(os.environ, PYTHONPATH=root)
+            proc = subprocess.run(
+                [sys.executable, filename, outfile],
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+            )
+            with open(outfile, "rb") as fp:
+                self.assertEqual(fp.read(), b"data")
+        self.assertEqual(proc.returncode, 4)
+        self.assertEqual(proc.stdout, "output")
+        self.assertEqual(proc.stderr.strip(), "cleanup")
+
+
+if __name__ == "__main__":
+    unittest.main()
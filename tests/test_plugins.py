@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for plugin commands
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from unittest import mock
+
+from wilderness import Application
+from wilderness.plugins import PluginCommand
+from wilderness.plugins import discover_plugins
+from wilderness.tester import Tester
+
+PLUGIN_MODULE = """
+from wilderness import Command
+
+IMPORTS = []
+IMPORTS.append(__name__)
+
+
+class GreetCommand(Command):
+    def __init__(self):
+        super().__init__("greet", title="Say hello", aliases=["hi"])
+
+    def register(self):
+        self.add_argument("who")
+
+    def handle(self):
+        print(f"hello {self.args.who}")
+        return 0
+
+
+class PairsCommand(Command):
+    output_format = "text"
+    cancellable = True
+
+    def __init__(self):
+        super().__init__("pairs", title="List pairs")
+
+    def handle(self):
+        return [{"a": 1, "b": 2}]
+"""
+
+
+class PluginsTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._site = os.path.join(self._tmpdir, "site")
+        distinfo = os.path.join(self._site, "greetplugin-0.1.dist-info")
+        os.makedirs(distinfo)
+        with open(os.path.join(distinfo, "METADATA"), "w") as fp:
+            fp.write("Metadata-Version: 2.1\n")
+            fp.write("Name: greetplugin\nVersion: 0.1\n")
+        with open(os.path.join(distinfo, "entry_points.txt"), "w") as fp:
+            fp.write(
+                textwrap.dedent(
+                    """\
+                    [testapp.commands]
+                    greet = greetplugin:GreetCommand
+                    pairs = greetplugin:PairsCommand
+                    """
+                )
+            )
+        with open(os.path.join(self._site, "greetplugin.py"), "w") as fp:
+            fp.write(PLUGIN_MODULE)
+
+        sys.path.insert(0, self._site)
+        importlib.invalidate_caches()
+        self._env = mock.patch.dict(
+            os.environ,
+            {"WILDERNESS_CACHE_DIR": os.path.join(self._tmpdir, "cache")},
+        )
+        self._env.start()
+        # The index is keyed by the site directories
+        self._sites = mock.patch(
+            "wilderness.plugins._site_directories", return_value=[self._site]
+        )
+        self._sites.start()
+
+    def tearDown(self):
+        self._sites.stop()
+        self._env.stop()
+        sys.path.remove(self._site)
+        sys.modules.pop("greetplugin", None)
+        shutil.rmtree(self._tmpdir)
+
+    def test_discover_plugins(self):
+        exp = [
+            ("greet", "Say hello", ("hi",), "greetplugin:GreetCommand"),
+            ("pairs", "List pairs", (), "greetplugin:PairsCommand"),
+        ]
+        self.assertEqual(discover_plugins("testapp.commands"), exp)
+        with mock.patch("wilderness.plugins._scan_plugins") as scan:
+            self.assertEqual(discover_plugins("testapp.commands"), exp)
+            scan.assert_not_called()
+        self.assertEqual(discover_plugins("testapp.other"), [])
+
+    def test_cache_invalidated(self):
+        discover_plugins("testapp.commands")
+        with open(os.path.join(self._site, "other.py"), "w") as fp:
+            fp.write("")
+        os.utime(self._site, ns=(0, 0))
+        with mock.patch("wilderness.plugins._scan_plugins") as scan:
+            scan.return_value = []
+            self.assertEqual(discover_plugins("testapp.commands"), [])
+            scan.assert_called_once()
+
+    def test_cache_pth_paths(self):
+        editable = os.path.join(self._tmpdir, "editable")
+        os.makedirs(editable)
+        with open(os.path.join(self._site, "editable.pth"), "w") as fp:
+            fp.write(f"# editable install\nimport os\n{editable}\n")
+        discover_plugins("testapp.commands")
+
+        # Other entries of sys.path (like the working directory) aren't part
+        # of the key
+        os.utime(self._tmpdir, ns=(0, 0))
+        with mock.patch.object(
+            sys, "path", [self._tmpdir] + sys.path
+        ), mock.patch("wilderness.plugins._scan_plugins") as scan:
+            discover_plugins("testapp.commands")
+            scan.assert_not_called()
+
+        os.utime(editable, ns=(0, 0))
+        with mock.patch("wilderness.plugins._scan_plugins") as scan:
+            scan.return_value = []
+            self.assertEqual(discover_plugins("testapp.commands"), [])
+            scan.assert_called_once()
+
+    def test_lazy_plugin_command(self):
+        discover_plugins("testapp.commands")
+        sys.modules.pop("greetplugin", None)
+
+        app = Application("testapp", "0.1.0")
+        command, _ = app.load_plugins("testapp.commands", title="Plugins")
+        self.assertIsInstance(command, PluginCommand)
+        self.assertNotIn("greetplugin", sys.modules)
+        self.assertIn("Say hello", app.format_help())
+        self.assertNotIn("greetplugin", sys.modules)
+
+        tester = Tester(app)
+        tester.test_application(["hi", "world"])
+        self.assertEqual(tester.get_return_code(), 0)
+        self.assertEqual(tester.get_stdout(), "hello world\n")
+        self.assertTrue(command.loaded)
+        self.assertTrue(
+            command.format_help().startswith("usage: testapp greet [-h] who")
+        )
+        self.assertEqual(command.create_manpage().name, "testapp-greet")
+
+    def test_plugin_records(self):
+        app = Application("testapp", "0.1.0")
+        app.load_plugins("testapp.commands", use_cache=False)
+        tester = Tester(app)
+        tester.test_application(["pairs", "--format", "json"])
+        self.assertEqual(tester.get_return_code(), 0)
+        self.assertEqual(json.loads(tester.get_stdout()), [{"a": 1, "b": 2}])
+
+        tester.test_application(["pairs", "--timeout", "10"])
+        self.assertEqual(tester.get_return_code(), 0)
+        self.assertEqual(tester.get_stdout(), "1 2\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for running many processes
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.cancellation import EXIT_TIMEOUT
+from wilderness.cancellation import CancellationToken
+from wilderness.cancellation import Cancelled
+from wilderness.cancellation import cancellation_scope
+from wilderness.processes import run_processes
+from wilderness.tester import Tester
+
+
+def python(code: str):
+    return [sys.executable, "-c", code]
+
+
+class MissingCommand(Command):
+    def __init__(self):
+        super().__init__("missing")
+
+    def handle(self) -> int:
+        argv = [["wilderness-does-not-exist"]]
+        (result,) = run_processes(argv, capture=False)
+        return result.return_code
+
+
+@unittest.skipUnless(os.name == "posix", "requires POSIX processes")
+class ProcessesTestCase(unittest.TestCase):
+    def test_capture(self):
+        err = "import sys; print('out'); print('err', file=sys.stderr)"
+        results = run_processes(
+            [
+                python(err),
+                python("import sys; sys.exit(3)"),
+                python("import os, signal; os.kill(os.getpid(), 9)"),
+            ]
+        )
+        first, second, third = results
+        self.assertEqual(first.return_code, 0)
+        self.assertEqual(first.stdout, b"out\n")
+        self.assertEqual(first.stderr, b"err\n")
+        self.assertGreaterEqual(first.duration, 0)
+        self.assertEqual(second.return_code, 3)
+        self.assertEqual(third.return_code, 128 + 9)
+
+    def test_large_output(self):
+        # More output than fits in a pipe on both streams
+        code = (
+            "import sys; sys.stdout.write('x' * 1000000); "
+            "sys.stderr.write('y' * 1000000)"
+        )
+        (result,) = run_processes([python(code)])
+        self.assertEqual(len(result.stdout), 1000000)
+        self.assertEqual(len(result.stderr), 1000000)
+
+    def test_concurrency_limit(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            code = (
+                "import os, sys, time; d = sys.argv[1]; "
+                "n = len(os.listdir(d)); "
+                "open(os.path.join(d, str(os.getpid())), 'w').close(); "
+                "time.sleep(0.2); "
+                "os.unlink(os.path.join(d, str(os.getpid()))); print(n)"
+            )
+            commands = [python(code) + [tmpdir] for _ in range(4)]
+            start = time.monotonic()
+            results = run_processes(commands, max_concurrency=2)
+            elapsed = time.monotonic() - start
+        self.assertTrue(all(int(r.stdout) < 2 for r in results))
+        self.assertGreaterEqual(elapsed, 0.4)
+
+    def test_on_output(self):
+        output = {}
+
+        def on_output(index, name, data):
+            key = (index, name)
+            output[key] = output.get(key, b"") + data
+
+        results = run_processes(
+            [python("print('a')"), python("print('b')")],
+            capture=False,
+            on_output=on_output,
+        )
+        expected = {(0, "stdout"): b"a\n", (1, "stdout"): b"b\n"}
+        self.assertEqual(output, expected)
+        self.assertIsNone(results[0].stdout)
+
+    def test_cwd_and_missing(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results = run_processes(
+                [python("import os; print(os.getcwd())")], cwd=tmpdir
+            )
+        self.assertEqual(
+            os.path.realpath(results[0].stdout.decode().strip()),
+            os.path.realpath(tmpdir),
+        )
+        (missing,) = run_processes([["wilderness-does-not-exist"]])
+        self.assertEqual(missing.return_code, 127)
+        self.assertIn(b"wilderness-does-not-exist", missing.stderr)
+
+        output = []
+        run_processes(
+            [["wilderness-does-not-exist"]],
+            capture=False,
+            on_output=lambda *args: output.append(args),
+        )
+        self.assertEqual(len(output), 1)
+        self.assertEqual(output[0][:2], (0, "stderr"))
+
+    def test_missing_in_tester(self):
+        app = Application("testapp", "0.1.0")
+        app.add(MissingCommand())
+        tester = Tester(app, trace_memory=False)
+        tester.test_command("missing", [])
+        self.assertEqual(tester.get_return_code(), 127)
+        self.assertTrue(
+            tester.get_stderr().startswith("wilderness-does-not-exist: ")
+        )
+
+    def test_interrupt(self):
+        def on_output(index, name, data):
+            raise KeyboardInterrupt
+
+        commands = [python("print('start', flush=True)")]
+        commands += [python("import time; time.sleep(30)")] * 3
+        start = time.monotonic()
+        with self.assertRaises(KeyboardInterrupt):
+            run_processes(commands, max_concurrency=3, on_output=on_output)
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_cancel(self):
+        commands = [python("import time; time.sleep(30)")] * 2
+        start = time.monotonic()
+        with cancellation_scope(CancellationToken(), timeout=0.2):
+            with self.assertRaises(Cancelled) as ctx:
+                run_processes(commands, max_concurrency=1)
+        self.assertEqual(ctx.exception.return_code, EXIT_TIMEOUT)
+        self.assertLess(time.monotonic() - start, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
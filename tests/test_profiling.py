@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for hooks and profiling
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import io
+import json
+import os
+import pstats
+import signal
+import tempfile
+import time
+import unittest
+
+from contextlib import redirect_stderr
+from unittest import mock
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.hooks import Hook
+
+
+def busy_function():
+    return sum(i * i for i in range(1000))
+
+
+def spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        busy_function()
+
+
+class SpinCommand(Command):
+    def __init__(self):
+        super().__init__("spin")
+
+    def handle(self) -> int:
+        spin(0.2)
+        return 0
+
+
+class BusyCommand(Command):
+    def __init__(self):
+        super().__init__("busy", title="Keep busy")
+
+    def handle(self) -> int:
+        busy_function()
+        return 3
+
+
+class FailingCommand(Command):
+    def __init__(self):
+        super().__init__("fail")
+
+    def handle(self) -> int:
+        raise RuntimeError("failed")
+
+
+class RecordingHook(Hook):
+    def __init__(self, name, events):
+        self.name = name
+        self.events = events
+
+    def start(self, app, command):
+        self.events.append(("start", self.name, command.name))
+
+    def stop(self, app, command, return_code):
+        self.events.append(("stop", self.name, return_code))
+
+
+class HooksTestCase(unittest.TestCase):
+    def test_hook_order(self):
+        events = []
+        app = Application("testapp", "0.1.0")
+        app.add(BusyCommand())
+        app.add(FailingCommand())
+        app.add_hook(RecordingHook("a", events))
+        app.add_hook(RecordingHook("b", events))
+        self.assertEqual(app.run(["busy"]), 3)
+        self.assertEqual(
+            events,
+            [
+                ("start", "a", "busy"),
+                ("start", "b", "busy"),
+                ("stop", "b", 3),
+                ("stop", "a", 3),
+            ],
+        )
+
+        events.clear()
+        with self.assertRaises(RuntimeError):
+            app.run(["fail"])
+        self.assertEqual(events[-1], ("stop", "a", None))
+
+
+class ProfileTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._output = os.path.join(self._tmpdir.name, "out.prof")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _check_output(self, argv):
+        stats = pstats.Stats(self._output)
+        names = [func[2] for func in stats.stats]  # type: ignore
+        self.assertIn("busy_function", names)
+        with open(self._output + ".json") as fp:
+            metadata = json.load(fp)
+        self.assertEqual(metadata["argv"], argv)
+        self.assertEqual(metadata["command"], ["busy"])
+        self.assertEqual(metadata["return_code"], 3)
+
+    def test_profile_option(self):
+        app = Application("testapp", "0.1.0", profile=True)
+        app.add(BusyCommand())
+        self.assertIn("[--profile[=FILE]]", app.get_synopsis())
+
+        # not profiled unless requested
+        self.assertEqual(app.run(["busy"]), 3)
+        self.assertFalse(os.path.exists(self._output))
+
+        argv = ["--profile", self._output, "--profile-top", "5", "busy"]
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(app.run(argv), 3)
+        self._check_output(argv)
+        self.assertIn("busy_function", stderr.getvalue())
+
+    def test_profile_environment(self):
+        with mock.patch.dict(os.environ, {"WILDERNESS_PROFILE": self._output}):
+            app = Application("testapp", "0.1.0")
+            app.add(BusyCommand())
+            self.assertNotIn("--profile", app.get_synopsis())
+            self.assertEqual(app.run(["busy"]), 3)
+        self._check_output(["busy"])
+
+
+@unittest.skipUnless(hasattr(signal, "setitimer"), "requires setitimer")
+class SamplingTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._output = os.path.join(self._tmpdir.name, "out.folded")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_sample_option(self):
+        app = Application("testapp", "0.1.0", sampling=True)
+        app.add(SpinCommand())
+        previous = signal.getsignal(signal.SIGPROF)
+
+        argv = ["--sample", self._output, "--sample-rate", "1000", "spin"]
+        self.assertEqual(app.run(argv), 0)
+        self.assertIs(signal.getsignal(signal.SIGPROF), previous)
+
+        with open(self._output) as fp:
+            lines = fp.read().splitlines()
+        self.assertTrue(lines)
+        total = 0
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(stack.startswith("testapp;"))
+            total += int(count)
+        self.assertTrue(any("busy_function" in line for line in lines))
+
+        with open(self._output + ".json") as fp:
+            metadata = json.load(fp)
+        self.assertEqual(metadata["argv"], argv)
+        self.assertEqual(metadata["rate"], 1000)
+        self.assertEqual(metadata["samples"], total)
+
+    def test_sample_environment(self):
+        env = {"WILDERNESS_SAMPLE": self._output}
+        with mock.patch.dict(os.environ, env):
+            app = Application("testapp", "0.1.0")
+            app.add(SpinCommand())
+            self.assertNotIn("--sample", app.get_synopsis())
+            self.assertEqual(app.run(["spin"]), 0)
+        self.assertTrue(os.path.exists(self._output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for progress reporting
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import io
+import json
+import threading
+import time
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.progress import ProgressCounter
+from wilderness.progress import ProgressReporter
+from wilderness.tester import Tester
+
+
+class Terminal(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+class CountCommand(Command):
+    def __init__(self):
+        super().__init__("count")
+
+    def handle(self) -> int:
+        progress = self.progress("items", total=3)
+        for _ in range(3):
+            progress.advance()
+        return 0
+
+
+class ProgressTestCase(unittest.TestCase):
+    def test_counter_threads(self):
+        counter = ProgressCounter("items")
+
+        def work():
+            for _ in range(10000):
+                counter.advance()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.done, 80000)
+
+    def test_silent(self):
+        stream = io.StringIO()
+        reporter = ProgressReporter(stream)
+        reporter.counter("items").advance()
+        reporter.close()
+        self.assertEqual(stream.getvalue(), "")
+        self.assertIsNone(reporter._thread)
+
+    def test_status_line(self):
+        stream = Terminal()
+        reporter = ProgressReporter(stream, rate=1)
+        counter = reporter.counter("items", total=10, unit="files")
+        counter.advance(5)
+        reporter.report()
+        self.assertIn("\ritems: 5/10 files (50%)", stream.getvalue())
+        reporter.close()
+        self.assertTrue(stream.getvalue().endswith("\r\x1b[K"))
+
+    def test_json_events(self):
+        stream = io.StringIO()
+        reporter = ProgressReporter(stream, mode="json", rate=1)
+        first = reporter.counter("first", total=2)
+        reporter.counter("second")
+        first.advance()
+        reporter.report()
+        first.advance()
+        reporter.report()
+        reporter.close()
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(
+            [(e["name"], e["done"], "final" in e) for e in events],
+            [
+                ("first", 1, False),
+                ("second", 0, False),
+                ("first", 2, False),
+                ("first", 2, True),
+                ("second", 0, True),
+            ],
+        )
+
+    def test_rate_limit(self):
+        stream = io.StringIO()
+        reporter = ProgressReporter(stream, mode="json", rate=10)
+        counter = reporter.counter("items")
+        stop = time.monotonic() + 0.3
+        while time.monotonic() < stop:
+            counter.advance()
+        reporter.close()
+        self.assertLessEqual(len(stream.getvalue().splitlines()), 6)
+
+    def test_application(self):
+        app = Application("testapp", "0.1.0", progress="json")
+        app.add(CountCommand())
+        tester = Tester(app, trace_memory=False)
+        tester.test_application(["count"])
+        self.assertEqual(tester.get_return_code(), 0)
+        lines = tester.get_stderr().splitlines()
+        event = json.loads(lines[-1])
+        self.assertEqual((event["done"], event["total"]), (3, 3))
+        self.assertTrue(event["final"])
+
+        with self.assertRaises(ValueError):
+            Application("testapp", "0.1.0", progress="bar")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for record output
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import io
+import json
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.records import RecordEncoder
+from wilderness.records import write_records
+from wilderness.tester import Tester
+
+
+class SizesCommand(Command):
+    output_format = "text"
+    output_fields = ("name", "size")
+
+    def __init__(self):
+        super().__init__("sizes")
+
+    def handle(self):
+        yield ("a", 1)
+        yield ("b,c", 2)
+
+
+class UsersCommand(Command):
+    output_format = "json"
+
+    def __init__(self):
+        super().__init__("users")
+
+    def handle(self):
+        return [{"name": "alice", "uid": 1000}, {"name": "bob", "uid": 1001}]
+
+
+class FailCommand(Command):
+    output_format = "text"
+
+    def __init__(self):
+        super().__init__("fail")
+
+    def handle(self):
+        return 3
+
+
+class StatusCommand(Command):
+    output_format = "text"
+
+    def __init__(self):
+        super().__init__("status")
+
+    def handle(self):
+        return "ok"
+
+
+class RecordsTestCase(unittest.TestCase):
+    def setUp(self):
+        self._app = Application("testapp", "0.1.0")
+        self._app.add(SizesCommand())
+        self._app.add(UsersCommand())
+        self._app.add(FailCommand())
+        self._app.add(StatusCommand())
+        self._tester = Tester(self._app, trace_memory=False)
+
+    def _run(self, *args: str) -> str:
+        self._tester.test_application(list(args))
+        self.assertEqual(self._tester.get_return_code(), 0)
+        return self._tester.get_stdout()
+
+    def test_formats(self):
+        self.assertEqual(self._run("sizes"), "a 1\nb,c 2\n")
+        self.assertEqual(
+            self._run("sizes", "--format", "csv"),
+            'name,size\na,1\n"b,c",2\n',
+        )
+        self.assertEqual(
+            self._run("sizes", "--format", "tsv"), "name\tsize\na\t1\nb,c\t2\n"
+        )
+        self.assertEqual(
+            self._run("sizes", "--format", "ndjson"),
+            '{"name":"a","size":1}\n{"name":"b,c","size":2}\n',
+        )
+        users = json.loads(self._run("users"))
+        self.assertEqual(users[1], {"name": "bob", "uid": 1001})
+        self.assertEqual(
+            self._run("users", "--format", "csv").split(),
+            ["name,uid", "alice,1000", "bob,1001"],
+        )
+
+    def test_test_command(self):
+        self._tester.test_command("sizes", ["--format", "tsv"])
+        self.assertEqual(
+            self._tester.get_stdout(), "name\tsize\na\t1\nb,c\t2\n"
+        )
+
+    def test_return_code(self):
+        self._tester.test_application(["fail"])
+        self.assertEqual(self._tester.get_return_code(), 3)
+        self.assertEqual(self._tester.get_stdout(), "")
+
+    def test_option_in_help(self):
+        command = self._app.get_command("sizes")
+        self.assertIn("--format", command.format_help())
+
+    def test_streaming(self):
+        stream = io.StringIO()
+
+        def records():
+            for i in range(5000):
+                yield {"i": i}
+                # Earlier batches have been written already
+                if i == 2048:
+                    self.assertGreater(len(stream.getvalue()), 0)
+
+        self.assertEqual(write_records(records(), "json", stream), 5000)
+        self.assertEqual(len(json.loads(stream.getvalue())), 5000)
+
+        stream = io.StringIO()
+        write_records([], "json", stream)
+        self.assertEqual(json.loads(stream.getvalue()), [])
+
+    def test_invalid_result(self):
+        with self.assertRaisesRegex(TypeError, "not str"):
+            self._tester.test_command("status", [])
+
+    def test_abstract_encoder(self):
+        with self.assertRaises(TypeError):
+            RecordEncoder(io.StringIO(), None)  # type: ignore
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for the command registry
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+
+
+class DummyCommand(Command):
+    def handle(self) -> int:
+        return 0
+
+
+class RegistryTestCase(unittest.TestCase):
+    def test_views_are_cached(self):
+        app = Application("testapp", "0.1.0")
+        app.add(DummyCommand("one"))
+        commands = app.commands
+        groups = app.groups
+        self.assertIs(app.commands, commands)
+        self.assertIs(app.groups, groups)
+
+        group = app.add_group("Other")
+        self.assertIsNot(app.groups, groups)
+        self.assertEqual(app.groups[-1], group)
+
+        cmd = DummyCommand("two")
+        group.add(cmd)
+        self.assertIsNot(app.commands, commands)
+        self.assertEqual(
+            [c.name for c in app.commands], ["help", "one", "two"]
+        )
+
+    def test_leaf_has_no_registry(self):
+        app = Application("testapp", "0.1.0")
+        cmd = DummyCommand("one")
+        app.add(cmd)
+        self.assertEqual(cmd.commands, ())
+        self.assertEqual(cmd.groups, ())
+        self.assertIsNone(cmd._registry)
+        with self.assertRaises(KeyError):
+            cmd.get_command("two")
+
+    def test_group_slots(self):
+        app = Application("testapp", "0.1.0")
+        group = app.add_group("Other")
+        with self.assertRaises(AttributeError):
+            group.foo = 1
+
+
+if __name__ == "__main__":
+    unittest.main()
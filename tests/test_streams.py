@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for the streams of an invocation
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import wilderness
+
+from wilderness.streams import EXIT_BROKEN_PIPE
+from wilderness.streams import buffered_stdout
+from wilderness.streams import current_streams
+from wilderness.streams import use_streams
+
+SCRIPT = """
+import sys
+
+from wilderness import Application
+
+class App(Application):
+    def handle(self):
+        for i in range(int(sys.argv[1])):
+            self.stdout.write(f"line {i}\\n")
+        return 0
+
+app = App("testapp", "0.1.0", add_help=False, output_buffer_size=1 << 16)
+sys.exit(app.run([]))
+"""
+
+
+class StreamsTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._script = os.path.join(self._tmpdir.name, "script.py")
+        with open(self._script, "w") as fp:
+            fp.write(textwrap.dedent(SCRIPT))
+        root = os.path.dirname(os.path.dirname(wilderness.__file__))
+        self._env = dict(os.environ, PYTHONPATH=root)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _spawn(self, n: int) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, self._script, str(n)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self._env,
+        )
+
+    def test_use_streams(self):
+        stdout = io.StringIO()
+        with use_streams(stdout=stdout) as streams:
+            self.assertIs(current_streams().stdout, stdout)
+            self.assertIs(streams.stderr, sys.stderr)
+            with buffered_stdout(1024) as buffered:
+                self.assertIsNone(buffered)
+        self.assertIs(current_streams().stdout, sys.stdout)
+
+    def test_buffered_output(self):
+        proc = self._spawn(1000)
+        stdout, stderr = proc.communicate()
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(stderr, b"")
+        lines = stdout.decode().splitlines()
+        self.assertEqual(lines[0], "line 0")
+        self.assertEqual(lines[-1], "line 999")
+
+    @unittest.skipUnless(os.name == "posix", "requires SIGPIPE semantics")
+    def test_broken_pipe(self):
+        proc = self._spawn(1000000)
+        assert proc.stdout is not None and proc.stderr is not None
+        self.assertEqual(proc.stdout.readline(), b"line 0\n")
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.wait()
+        self.assertEqual(proc.returncode, EXIT_BROKEN_PIPE)
+        self.assertEqual(stderr, b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for nested subcommands
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import contextlib
+import os
+import tempfile
+import unittest
+
+from wilderness import Application
+from wilderness import Command
+from wilderness import build_manpages
+from wilderness.tester import Tester
+
+
+class LeafCommand(Command):
+    registered = []  # type: list
+
+    def __init__(self, name, title=None):
+        super().__init__(name, title=title)
+
+    def register(self):
+        LeafCommand.registered.append(self.name)
+        self.add_argument("item")
+
+    def handle(self) -> int:
+        print(f"{'-'.join(self.path)} {self.args.item}")
+        return 0
+
+
+class RemoteCommand(Command):
+    def __init__(self):
+        super().__init__("remote", title="Manage remotes")
+
+    def register(self):
+        self.add_argument("-v", "--verbose", action="store_true")
+        self.add(LeafCommand("add", title="Add a remote"))
+        group = self.add_group("destructive commands")
+        group.add(LeafCommand("remove", title="Remove a remote"))
+
+    def handle(self) -> int:
+        print("listing remotes")
+        return 0
+
+
+class SubcommandsTestCase(unittest.TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        LeafCommand.registered = []
+        self._app = Application("testapp", "0.1.0")
+        self._remote = RemoteCommand()
+        self._app.add(self._remote)
+        self._app.add(LeafCommand("status"))
+
+    def test_lazy_parsers(self):
+        self.assertEqual(LeafCommand.registered, [])
+        self._app.run(["status", "x"])
+        self.assertEqual(LeafCommand.registered, ["status"])
+
+    def test_nested_dispatch(self):
+        tester = Tester(self._app)
+        tester.test_application(["remote", "-v", "add", "origin"])
+        self.assertEqual(tester.get_return_code(), 0)
+        self.assertEqual(tester.get_stdout(), "remote-add origin\n")
+        self.assertEqual(LeafCommand.registered, ["add"])
+        self.assertTrue(self._app.args.verbose)
+        self.assertEqual(self._app.args.target_remote, "add")
+
+    def test_host_without_subcommand(self):
+        tester = Tester(self._app)
+        tester.test_application(["remote"])
+        self.assertEqual(tester.get_return_code(), 0)
+        self.assertEqual(tester.get_stdout(), "listing remotes\n")
+
+    def test_test_command(self):
+        tester = Tester(self._app)
+        tester.test_command("remote remove", ["upstream"])
+        self.assertEqual(tester.get_stdout(), "remote-remove upstream\n")
+
+    def test_walk_commands(self):
+        paths = [c.path for c in self._app.walk_commands()]
+        self.assertEqual(
+            paths,
+            [
+                ["help"],
+                ["remote"],
+                ["remote", "add"],
+                ["remote", "remove"],
+                ["status"],
+            ],
+        )
+
+    def test_help(self):
+        exp = (
+            "usage: testapp remote [-h] [-v] command ...\n"
+            "\n"
+            "Available commands:\n"
+            "  add     Add a remote\n"
+            "\n"
+            "destructive commands:\n"
+            "  remove  Remove a remote\n"
+        )
+        self.assertEqual(self._remote.format_help(), exp)
+        self.assertEqual(self._remote.parser.format_help(), exp)
+
+    def test_manpages(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    build_manpages(self._app, output_directory=tmpdir)
+            pages = sorted(os.listdir(tmpdir))
+            self.assertEqual(
+                pages,
+                [
+                    "testapp-help.1",
+                    "testapp-remote-add.1",
+                    "testapp-remote-remove.1",
+                    "testapp-remote.1",
+                    "testapp-status.1",
+                    "testapp.1",
+                ],
+            )
+            with open(os.path.join(tmpdir, "testapp-remote.1")) as fp:
+                content = fp.read()
+            self.assertIn("testapp\\-remote\\-add(1)", content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for the table writer and size formatting
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import io
+import unittest
+
+from wilderness.table import Column
+from wilderness.table import SizeFormatter
+from wilderness.table import TableWriter
+from wilderness.table import parse_size
+
+
+class SizeTestCase(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("M"), 1 << 20)
+        self.assertEqual(parse_size("4K"), 4096)
+        self.assertEqual(parse_size("1KB"), 1000)
+        self.assertEqual(parse_size("2MiB"), 2 << 20)
+        self.assertEqual(parse_size("512"), 512)
+        for text in ["", "0", "1X", "iB", "-1"]:
+            with self.subTest(text=text):
+                with self.assertRaises(argparse.ArgumentTypeError):
+                    parse_size(text)
+
+    def test_human_readable(self):
+        f = SizeFormatter(human=1024)
+        cases = {
+            0: "0",
+            1023: "1023",
+            1024: "1.0K",
+            1025: "1.1K",
+            1536: "1.5K",
+            (1 << 20) - 1: "1.0M",
+            1023 << 20: "1023M",
+            (10 << 30) - 1: "10G",
+        }
+        for size, expected in cases.items():
+            with self.subTest(size=size):
+                self.assertEqual(f.format(size), expected)
+
+    def test_si(self):
+        f = SizeFormatter(human=1000)
+        self.assertEqual(f.format(1000), "1.0k")
+        self.assertEqual(f.format(1100000000), "1.1G")
+        self.assertEqual(f.format(999999), "1.0M")
+
+    def test_from_args(self):
+        args = argparse.Namespace(
+            human_readable=False, si=False, block_size="M"
+        )
+        f = SizeFormatter.from_args(args)
+        self.assertEqual(f.header, "1M-blocks")
+        self.assertEqual(f.format((1 << 20) + 1), "2")
+        self.assertEqual(f.format((1 << 80) + 1), str((1 << 60) + 1))
+        args.si = True
+        self.assertEqual(SizeFormatter.from_args(args).header, "Size")
+        self.assertEqual(
+            SizeFormatter.from_args(argparse.Namespace()).header, "1K-blocks"
+        )
+
+
+class TableWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self._columns = [Column("Name"), Column("Size", align="right")]
+
+    def test_aligned(self):
+        stream = io.StringIO()
+        with TableWriter(stream, self._columns) as table:
+            table.write_rows([("a", 1), ("bbb", 1000)])
+        self.assertEqual(
+            stream.getvalue(), "Name Size\na       1\nbbb  1000\n"
+        )
+
+    def test_streaming(self):
+        stream = io.StringIO()
+        table = TableWriter(stream, self._columns, lookahead=2)
+        table.write_row(("a", 1))
+        table.write_row(("b", 2))
+        self.assertEqual(stream.getvalue(), "")
+        table.write_row(("c", 3))
+        self.assertEqual(len(stream.getvalue().splitlines()), 4)
+        self.assertEqual(table.widths, [4, 4])
+
+        # Rows after the lookahead window are written immediately
+        table.write_row(("longer", 12345))
+        self.assertEqual(stream.getvalue().splitlines()[-1], "longer 12345")
+        table.close()
+
+    def test_truncate(self):
+        stream = io.StringIO()
+        table = TableWriter(
+            stream,
+            [Column("Name", max_width=5), "Note"],
+            overflow="truncate",
+            ellipsis="~",
+        )
+        table.write_row(("abcdefgh", "x"))
+        table.close()
+        self.assertEqual(stream.getvalue(), "Name  Note\nabcd~ x\n")
+
+    def test_reflow(self):
+        stream = io.StringIO()
+        table = TableWriter(
+            stream, ["Key", "Value"], lookahead=0, overflow="reflow"
+        )
+        table.write_row(("k", "abcdefghij"))
+        table.close()
+        self.assertEqual(
+            stream.getvalue(), "Key Value\nk   abcde\n    fghij\n"
+        )
+
+    def test_max_width(self):
+        stream = io.StringIO()
+        table = TableWriter(
+            stream, ["A", "B"], max_width=10, overflow="truncate", ellipsis=""
+        )
+        table.write_row(("aaaaaaaa", "bbbbbbbb"))
+        table.close()
+        self.assertEqual(table.widths, [4, 5])
+        self.assertEqual(stream.getvalue().splitlines()[1], "aaaa bbbbb")
+
+    def test_wrong_length(self):
+        table = TableWriter(io.StringIO(), self._columns)
+        with self.assertRaises(ValueError):
+            table.write_row(("a",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for the Tester
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.tester import Measurement
+from wilderness.tester import Tester
+
+
+class AllocCommand(Command):
+    def __init__(self):
+        super().__init__("alloc", title="Allocate memory")
+
+    def register(self):
+        self.add_argument("size", type=int)
+
+    def handle(self) -> int:
+        data = bytearray(self.args.size)
+        print(len(data))
+        return 0
+
+
+class UpperCommand(Command):
+    def __init__(self):
+        super().__init__("upper", title="Convert to upper case")
+
+    def register(self):
+        self.add_argument("--prefix", default="")
+
+    def handle(self) -> int:
+        for line in self.stdin:
+            self.stdout.write(self.args.prefix + line.upper())
+        self.stderr.write("done\n")
+        return 0
+
+
+class TesterTestCase(unittest.TestCase):
+    def setUp(self):
+        self._app = Application("testapp", "0.1.0")
+        self._app.add(AllocCommand())
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._baseline = os.path.join(self._tmpdir.name, "baseline.json")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_measurement(self):
+        tester = Tester(self._app, repeat=3, trace_memory=True)
+        self.assertIsNone(tester.get_measurement())
+        tester.test_command("alloc", ["1000000"])
+        self.assertEqual(tester.get_stdout(), "1000000\n")
+
+        measurement = tester.get_measurement()
+        self.assertIsInstance(measurement, Measurement)
+        self.assertGreater(measurement.wall_ms, 0)
+        self.assertGreaterEqual(measurement.peak_kb, 1000000 / 1024)
+
+    def test_streams(self):
+        self._app.add(UpperCommand())
+        tester = Tester(self._app, redirect=False)
+        tester.test_command("upper", [], stdin="a\nb\n")
+        self.assertEqual(tester.get_stdout(), "A\nB\n")
+        self.assertEqual(tester.get_stderr(), "done\n")
+
+        tester.test_application(["upper", "--prefix", "> "], stdin="c\n")
+        self.assertEqual(tester.get_stdout(), "> C\n")
+
+        tester.test_application(["upper", "--unknown"])
+        self.assertEqual(tester.get_return_code(), 1)
+        self.assertIn("unrecognized arguments", tester.get_stderr())
+
+    def test_parallel(self):
+        self._app.add(UpperCommand())
+        Tester(self._app, redirect=False).test_command("upper", [])
+        outputs = {}
+
+        def run(i):
+            # The parsed arguments are stored on the commands, so every
+            # thread needs its own application
+            app = Application("testapp", "0.1.0")
+            app.add(UpperCommand())
+            tester = Tester(app, trace_memory=False, redirect=False)
+            lines = "".join(f"line {i} {j}\n" for j in range(200))
+            tester.test_application(["upper", "--prefix", f"{i}:"], lines)
+            outputs[i] = tester.get_stdout()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(8):
+            expected = "".join(f"{i}:LINE {i} {j}\n" for j in range(200))
+            self.assertEqual(outputs[i], expected)
+
+    def test_assert_within(self):
+        tester = Tester(self._app, trace_memory=True)
+        with self.assertRaises(ValueError):
+            tester.assert_within(max_ms=1000)
+
+        tester.test_application(["alloc", "2000000"])
+        self.assertEqual(tester.get_return_code(), 0)
+        tester.assert_within(max_ms=60000, max_kb=4096)
+        with self.assertRaisesRegex(AssertionError, "peak_kb"):
+            tester.assert_within(max_kb=1024)
+
+    def test_assert_within_without_tracing(self):
+        # Memory isn't traced by default
+        tester = Tester(self._app)
+        tester.test_application(["alloc", "10"])
+        self.assertEqual(tester.get_measurement().peak_kb, 0)
+        with self.assertRaises(ValueError):
+            tester.assert_within(max_kb=10)
+
+    def test_baseline(self):
+        tester = Tester(self._app, baseline_file=self._baseline)
+        tester.test_application(["alloc", "1000"])
+        tester.assert_baseline("alloc")
+        with open(self._baseline) as fp:
+            stored = json.load(fp)
+        self.assertEqual(
+            sorted(stored["alloc"]), ["cpu_ms", "peak_kb", "wall_ms"]
+        )
+
+        # the same run stays within the baseline
+        tester.test_application(["alloc", "1000"])
+        tester.assert_baseline("alloc")
+
+        # a run that uses much more memory doesn't
+        tester.test_application(["alloc", "4000000"])
+        with self.assertRaisesRegex(AssertionError, "regression for 'alloc'"):
+            tester.assert_baseline("alloc")
+
+    def test_update_baseline(self):
+        with open(self._baseline, "w") as fp:
+            json.dump({"alloc": {"cpu_ms": 0, "peak_kb": 0}}, fp)
+        with mock.patch.dict(os.environ, {"WILDERNESS_UPDATE_BASELINE": "1"}):
+            tester = Tester(self._app, baseline_file=self._baseline)
+        tester.test_application(["alloc", "4000000"])
+        tester.assert_baseline("alloc")
+        with open(self._baseline) as fp:
+            stored = json.load(fp)
+        self.assertGreater(stored["alloc"]["peak_kb"], 1000)
+
+        tester = Tester(
+            self._app, trace_memory=False, baseline_file=self._baseline
+        )
+        tester.test_application(["alloc", "10"])
+        with self.assertRaises(ValueError):
+            tester.assert_baseline("alloc")
+        tester.assert_baseline("alloc", metrics=["cpu_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""Unit tests for tracing
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from wilderness import Application
+from wilderness import Command
+from wilderness.tracing import Tracer
+from wilderness.tracing import TracingHook
+from wilderness.tracing import disable_tracing
+from wilderness.tracing import export_otlp
+from wilderness.tracing import get_tracer
+from wilderness.tracing import span
+
+
+class IndexCommand(Command):
+    def __init__(self):
+        super().__init__("index")
+
+    def handle(self) -> int:
+        with self.span("load-index", size=3):
+            with self.span("read"):
+                pass
+        return 0
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._output = os.path.join(self._tmpdir.name, "trace.json")
+
+    def tearDown(self):
+        disable_tracing()
+        self._tmpdir.cleanup()
+
+    def _hook(self, app: Application) -> TracingHook:
+        return next(h for h in app._hooks if isinstance(h, TracingHook))
+
+    def test_span_disabled(self):
+        self.assertIsNone(get_tracer())
+        with span("a") as s1, span("b") as s2:
+            s2.set_attribute("key", "value")
+        self.assertIs(s1, s2)
+
+    def test_ring_buffer(self):
+        tracer = Tracer(capacity=3)
+        for i in range(5):
+            tracer.record(f"s{i}", i + 1, None, i, i + 1, {})
+        self.assertEqual([s.name for s in tracer.spans()], ["s2", "s3", "s4"])
+        self.assertEqual(tracer.dropped, 2)
+
+    def test_trace_chrome(self):
+        app = Application("testapp", "0.1.0", tracing=True)
+        app.add(IndexCommand())
+        self.assertEqual(app.run(["--trace", self._output, "index"]), 0)
+        self._hook(app).export()
+
+        with open(self._output) as fp:
+            trace = json.load(fp)
+        events = {e["name"]: e for e in trace["traceEvents"]}
+        self.assertEqual(
+            set(events),
+            {"run", "parse", "dispatch", "handle", "load-index", "read"},
+        )
+        self.assertTrue(all(e["ph"] == "X" for e in events.values()))
+
+        def parent(name):
+            return events[name]["args"].get("parent_id")
+
+        root = events["run"]["args"]["span_id"]
+        self.assertIsNone(parent("run"))
+        self.assertEqual(parent("parse"), root)
+        self.assertEqual(parent("dispatch"), root)
+        self.assertEqual(parent("handle"), root)
+        handle = events["handle"]["args"]
+        self.assertEqual(handle["command"], "index")
+        self.assertEqual(handle["return_code"], 0)
+        self.assertEqual(parent("load-index"), handle["span_id"])
+        self.assertEqual(events["load-index"]["args"]["size"], 3)
+        self.assertEqual(
+            parent("read"), events["load-index"]["args"]["span_id"]
+        )
+        self.assertGreaterEqual(events["run"]["dur"], events["handle"]["dur"])
+
+    def test_trace_otlp_environment(self):
+        env = {
+            "WILDERNESS_TRACE": self._output,
+            "WILDERNESS_TRACE_FORMAT": "otlp",
+        }
+        with mock.patch.dict(os.environ, env):
+            app = Application("testapp", "0.1.0")
+            app.add(IndexCommand())
+            self.assertEqual(app.run(["index"]), 0)
+        self._hook(app).export()
+
+        with open(self._output) as fp:
+            trace = json.load(fp)
+        resource = trace["resourceSpans"][0]
+        attrs = resource["resource"]["attributes"]
+        attrs = {a["key"]: a["value"] for a in attrs}
+        self.assertEqual(attrs["service.name"], {"stringValue": "testapp"})
+        spans = resource["scopeSpans"][0]["spans"]
+        self.assertEqual(len(spans), 6)
+        self.assertEqual(len({s["traceId"] for s in spans}), 1)
+        by_id = {s["spanId"]: s for s in spans}
+        read = next(s for s in spans if s["name"] == "read")
+        self.assertEqual(by_id[read["parentSpanId"]]["name"], "load-index")
+
+    def test_exception_status(self):
+        tracer = Tracer()
+        with self.assertRaises(ValueError):
+            with tracer.span("fail"):
+                raise ValueError
+        stream = io.StringIO()
+        export_otlp(tracer, stream, {})
+        trace = json.loads(stream.getvalue())
+        (record,) = trace["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(record["status"], {"code": 2})
+
+    def test_tracing_not_requested(self):
+        app = Application("testapp", "0.1.0", tracing=True)
+        app.add(IndexCommand())
+        self.assertEqual(app.run(["index"]), 0)
+        self.assertIsNone(get_tracer())
+
+
+if __name__ == "__main__":
+    unittest.main()
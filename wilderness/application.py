@@ -12,24 +12,66 @@ This file is part of Wilderness.
 """
 
 import argparse
+import configparser
+import contextlib
+import os
 import sys
+import time
 
+from typing import Callable
 from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import NoReturn
 from typing import Optional
-from typing import TextIO
+from typing import Sequence
+from typing import Tuple
 
 from wilderness.argparse_wrappers import ArgumentParser
+from wilderness.cancellation import CancellationToken
+from wilderness.cancellation import Cancelled
+from wilderness.cancellation import add_timeout_argument
+from wilderness.cancellation import cancellation_scope
 from wilderness.command import Command
-from wilderness.documentable import DocumentableMixin
+from wilderness.config import ConfigSections
+from wilderness.config import EnvVars
+from wilderness.config import apply_defaults
+from wilderness.config import env_int
+from wilderness.config import env_name
+from wilderness.config import read_config_file
+from wilderness.config import read_environment
+from wilderness.external import ExternalCommand
+from wilderness.external import find_external_commands
+from wilderness.files import closing_files
 from wilderness.formatter import HelpFormatter
-from wilderness.group import Group
 from wilderness.help import HelpCommand
 from wilderness.help import help_action_factory
+from wilderness.hooks import Hook
+from wilderness.lazy import LazyNamespace
+from wilderness.lazy import deferred_conversion
 from wilderness.manpages import ManPage
-
-
-class Application(DocumentableMixin):
+from wilderness.memory import MemoryHook
+from wilderness.metrics import MetricsHook
+from wilderness.parallel import ExecutorPool
+from wilderness.parallel import add_jobs_argument
+from wilderness.performance import PerformanceHook
+from wilderness.performance import fast_exit
+from wilderness.plugins import PluginCommand
+from wilderness.plugins import discover_plugins
+from wilderness.profiling import ProfileHook
+from wilderness.profiling import SamplingHook
+from wilderness.progress import MODES as PROGRESS_MODES
+from wilderness.progress import report_progress
+from wilderness.records import add_format_argument
+from wilderness.records import handle_result
+from wilderness.streams import buffered_stdout
+from wilderness.streams import current_streams
+from wilderness.streams import handle_broken_pipe
+from wilderness.subcommands import SubcommandsMixin
+from wilderness.tracing import TracingHook
+
+
+class Application(SubcommandsMixin):
     """Base class for applications
 
     .. _FakeDF: https://github.com/GjjvdBurg/wilderness/tree/master/examples/fakedf
@@ -105,11 +147,99 @@ class Application(DocumentableMixin):
         Whether to automatically generate a section in the application man page
         that lists the available commands.
 
+    config_file: Optional[str]
+        Path to a configuration file (in INI format) that provides default
+        values for the options of the application and its commands. Options
+        of the application are read from the section with the name of the
+        application and options of commands from the section with the name of
+        the command (or the names of nested commands joined by dots, such as
+        ``remote.add``). See :mod:`wilderness.config` for details.
+
+    env_prefix: Optional[str]
+        Prefix for environment variables that provide default values for the
+        options of the application and its commands (e.g., ``FAKEGIT``
+        results in ``FAKEGIT_QUIET`` for the ``--quiet`` option of the
+        application and ``FAKEGIT_CLONE_DEPTH`` for the ``--depth`` option of
+        the ``clone`` command). Environment variables take precedence over the
+        configuration file, and the command line takes precedence over both.
+
+    allow_command_abbrev: bool
+        Whether unique prefixes of command names are accepted on the command
+        line (e.g., ``fakegit sta`` for ``fakegit status``).
+
+    external_commands: bool
+        Whether to run executables on the PATH for unknown commands, as git
+        does. With this enabled, ``fakegit foo`` runs the ``fakegit-foo``
+        executable if no command named ``foo`` is registered. See
+        :mod:`wilderness.external` for details.
+
+    profile: bool
+        Whether to add the ``--profile`` and ``--profile-top`` options that
+        run the command under cProfile. Profiling can also be enabled with
+        the ``WILDERNESS_PROFILE`` environment variable, without adding the
+        options. See :mod:`wilderness.profiling` for details.
+
+    sampling: bool
+        Whether to add the ``--sample`` and ``--sample-rate`` options that
+        run the command under a low-overhead sampling profiler, which writes
+        folded stacks for flame graph tools. This can also be enabled with
+        the ``WILDERNESS_SAMPLE`` environment variable, without adding the
+        options.
+
+    trace_memory: bool
+        Whether to add the ``--trace-memory`` and ``--trace-memory-top``
+        options that report the peak memory use and the top allocation sites
+        of the command. This can also be enabled with the
+        ``WILDERNESS_TRACE_MEMORY`` environment variable, without adding the
+        options. See :mod:`wilderness.memory` for details.
+
+    metrics_file: Optional[str]
+        File to which a metrics record is written for every invocation, with
+        the command, the names of the options that were used, the duration,
+        the CPU time, the peak memory, and the return code. Files ending in
+        ``.prom`` are written in the Prometheus textfile format, other files
+        in JSON lines format. The ``WILDERNESS_METRICS`` environment variable
+        is used if this is omitted. See :mod:`wilderness.metrics` for
+        details.
+
+    tracing: bool
+        Whether to add the ``--trace`` and ``--trace-format`` options that
+        record spans for the phases of the run (parsing, dispatch, and the
+        spans opened by the command) and export them when the process exits.
+        This can also be enabled with the ``WILDERNESS_TRACE`` environment
+        variable, without adding the options. See :mod:`wilderness.tracing`
+        for details.
+
+    performance: bool
+        Whether to tune the process for commands that run on large
+        applications: long-lived objects are frozen with :func:`gc.freeze`
+        before the first command runs, the garbage collector runs less often
+        while a command runs, and :func:`main` exits without the teardown of
+        the interpreter. This can also be enabled with the
+        ``WILDERNESS_PERFORMANCE`` environment variable. See
+        :mod:`wilderness.performance` for details.
+
+    output_buffer_size: Optional[int]
+        Size in bytes of the buffer of the standard output of commands
+        (``self.stdout``). With a large buffer, commands that write many
+        lines aren't slowed down by flushing every line. The
+        ``WILDERNESS_OUTPUT_BUFFER_SIZE`` environment variable is used if
+        this is omitted. By default :data:`sys.stdout` is used. See
+        :mod:`wilderness.streams` for details.
+
+    progress: Optional[str]
+        How the progress of commands is reported (see
+        :func:`Command.progress <wilderness.command.Command.progress>`):
+        ``"auto"`` draws a status line on the standard error if it is a
+        terminal, ``"json"`` writes progress events as JSON lines to the
+        standard error (for applications that are run by other programs),
+        and ``"none"`` doesn't report progress. The
+        ``WILDERNESS_PROGRESS`` environment variable is used if this is
+        omitted, and the default is ``"auto"``. See
+        :mod:`wilderness.progress` for details.
 
     """
 
-    _cmd_name = "command"
-
     def __init__(
         self,
         name: str,
@@ -125,12 +255,25 @@ class Application(DocumentableMixin):
         options_prolog: Optional[str] = None,
         options_epilog: Optional[str] = None,
         add_commands_section: bool = False,
+        config_file: Optional[str] = None,
+        env_prefix: Optional[str] = None,
+        allow_command_abbrev: bool = False,
+        external_commands: bool = False,
+        profile: bool = False,
+        sampling: bool = False,
+        trace_memory: bool = False,
+        metrics_file: Optional[str] = None,
+        tracing: bool = False,
+        performance: bool = False,
+        output_buffer_size: Optional[int] = None,
+        progress: Optional[str] = None,
     ):
         super().__init__(
             description=description,
             extra_sections=extra_sections,
             options_prolog=options_prolog,
             options_epilog=options_epilog,
+            allow_command_abbrev=allow_command_abbrev,
         )
 
         self._name = name
@@ -147,11 +290,7 @@ class Application(DocumentableMixin):
             formatter_class=HelpFormatter,
             add_help=False,
         )  # type: ArgumentParser
-        self._subparsers = None  # type: Optional[argparse._SubParsersAction]
-
-        self._command_map = {}  # type: Dict[str, Command]
-        self._group_map = {}  # type: Dict[str, Group]
-        self._root_group = None  # type: Optional[Group]
+        self._subparsers_ready = True
         self._args = None  # type: Optional[argparse.Namespace]
 
         self._prolog = prolog
@@ -159,6 +298,18 @@ class Application(DocumentableMixin):
 
         self._add_commands_section = add_commands_section
 
+        self._config_file = config_file
+        self._env_prefix = env_prefix
+        self._config = None  # type: Optional[Tuple[ConfigSections, EnvVars]]
+
+        self._use_external = external_commands
+        self._external = None  # type: Optional[Dict[str, str]]
+
+        self._hooks = []  # type: List[Hook]
+        self._argv = []  # type: List[str]
+        self._timeline = {}  # type: Dict[str, int]
+        self._executors = ExecutorPool()
+
         # TODO: allow the user to set this and extract from self._parser
         default_prefix = "-"
         if self._add_help:
@@ -172,6 +323,39 @@ class Application(DocumentableMixin):
             self.add(HelpCommand())
 
         self.register()
+        if self.output_format is not None:
+            add_format_argument(self)
+        if self.parallel is not None:
+            add_jobs_argument(self)
+        if self.cancellable:
+            add_timeout_argument(self)
+        if self._use_external:
+            self._ensure_subparsers()
+        if profile or os.environ.get("WILDERNESS_PROFILE"):
+            self.add_hook(ProfileHook(add_options=profile))
+        if sampling or os.environ.get("WILDERNESS_SAMPLE"):
+            self.add_hook(SamplingHook(add_options=sampling))
+        if trace_memory or os.environ.get("WILDERNESS_TRACE_MEMORY"):
+            self.add_hook(MemoryHook(add_options=trace_memory))
+        if metrics_file is None:
+            metrics_file = os.environ.get("WILDERNESS_METRICS") or None
+        if metrics_file is not None:
+            self.add_hook(MetricsHook(metrics_file))
+        if tracing or os.environ.get("WILDERNESS_TRACE"):
+            self.add_hook(TracingHook(add_options=tracing))
+        self._performance = performance or bool(
+            os.environ.get("WILDERNESS_PERFORMANCE")
+        )
+        if self._performance:
+            self.add_hook(PerformanceHook())
+        if output_buffer_size is None:
+            output_buffer_size = env_int("WILDERNESS_OUTPUT_BUFFER_SIZE")
+        self._output_buffer_size = output_buffer_size
+        if progress is None:
+            progress = os.environ.get("WILDERNESS_PROGRESS") or "auto"
+        if progress not in PROGRESS_MODES:
+            raise ValueError(f"Unknown progress mode: {progress}")
+        self._progress = progress
 
     @property
     def name(self) -> str:
@@ -189,41 +373,67 @@ class Application(DocumentableMixin):
         return self._version
 
     @property
-    def commands(self) -> List[Command]:
-        """List the commands registered to the application
+    def argv(self) -> List[str]:
+        """The command line arguments given to :func:`run`"""
+        return self._argv
 
-        Returns
-        -------
-        commands : List[:class:`wilderness.command.Command`]
-            The list of commands registered to the application.
+    @property
+    def timeline(self) -> Dict[str, int]:
+        """The times of the phases of the last run
 
+        The times are from :func:`time.perf_counter_ns` and are recorded
+        when :func:`run` starts (``start``), when the command line is parsed
+        (``parsed``), and when the command to run has been found
+        (``dispatched``).
         """
-        cmds = []
-        if self._root_group:
-            cmds.extend(list(self._root_group.commands))
-        for group in self._group_map.values():
-            cmds.extend(list(group.commands))
-        return cmds
+        return self._timeline
 
     @property
-    def groups(self) -> List[Group]:
-        """List the groups registered to the application
+    def subparsers_dest(self) -> str:
+        return "target"
 
-        If no groups have been added to the application but commands have been
-        added, this property will contain a single group, the root group.
+    def _get_application(self) -> "Application":
+        return self
 
-        Returns
-        -------
-        groups: List[:class:`wilderness.group.Group`]
-            The list of groups registered to the application
+    @property
+    def external_commands(self) -> Dict[str, str]:
+        """The external commands that are available on the PATH
+
+        This is a mapping from command names to executables, and is empty if
+        external commands are not enabled. Registered commands take
+        precedence over external commands with the same name, and are not
+        included.
 
         """
-        groups = []
-        if self._root_group is not None:
-            groups.append(self._root_group)
-        for group in self._group_map.values():
-            groups.append(group)
-        return groups
+        if not self._use_external:
+            return {}
+        if self._external is None:
+            found = find_external_commands(self.name)
+            self._external = {
+                name: path
+                for name, path in sorted(found.items())
+                if self._registry is None or name not in self._registry
+            }
+        return self._external
+
+    def _ensure_subparsers(self) -> None:
+        super()._ensure_subparsers()
+        if self._use_external:
+            assert self._subparsers is not None
+            self._subparsers.fallback = self._is_external_command
+
+    def _is_external_command(self, name: str) -> bool:
+        return name in self.external_commands
+
+    def _command_sections(
+        self,
+    ) -> Iterator[Tuple[Optional[str], Sequence[argparse.Action]]]:
+        yield from super()._command_sections()
+        if self.external_commands:
+            yield "External commands", [
+                argparse.Action(option_strings=[], dest=name)
+                for name in self.external_commands
+            ]
 
     def add_argument(self, *args, **kwargs) -> argparse.Action:
         """Add an argument to the application
@@ -239,57 +449,18 @@ class Application(DocumentableMixin):
         self._arg_help[action.dest] = description
         return action
 
-    def add(self, command: Command):
-        """Add a command to the application
-
-        Note that the ``register`` method of the command is called when it is
-        added to the application.
+    def add_hook(self, hook: Hook) -> None:
+        """Add a hook that runs before and after the command
 
         Parameters
         ----------
-        command : :class:`wilderness.command.Command`
-            The command to add to the application.
+        hook : :class:`wilderness.hooks.Hook`
+            The hook to add. The ``register`` method of the hook is called
+            immediately, so that it can add command line arguments.
 
         """
-        if self._subparsers is None:
-            self._subparsers = self._parser.add_subparsers(
-                dest="target", metavar=self._cmd_name
-            )
-        if self._root_group is None:
-            self._root_group = Group(title="Available commands", is_root=True)
-            self._root_group.set_app(self)
-        self._root_group.add(command)
-
-    def _add_command(self, command: Command):
-        assert self._subparsers is not None
-        self._command_map[command._name] = command
-        cmd_parser = self._subparsers.add_parser(
-            command.name,
-            help=command.title,
-            add_help=command._add_help,
-        )
-        command.parser = cmd_parser
-        command.register()
-        command._application = self
-
-    def add_group(self, title: str) -> Group:
-        """Create a group of commands
-
-        Parameters
-        ----------
-        title : str
-            The title for the group.
-
-        Returns
-        -------
-        :class:`wilderness.group.Group`
-            The created command group.
-
-        """
-        group = Group(title)
-        group.set_app(self)
-        self._group_map[title] = group
-        return group
+        self._hooks.append(hook)
+        hook.register(self)
 
     def register(self):
         """Register arguments to the application
@@ -305,6 +476,100 @@ class Application(DocumentableMixin):
         """
         pass
 
+    def load_config(self) -> None:
+        """Apply the configuration file and environment to the defaults
+
+        This method is called by :func:`run` before the command line arguments
+        are parsed, and does nothing if neither a configuration file nor an
+        environment prefix was provided. The configuration file is cached in
+        compiled form (see
+        :func:`read_config_file <wilderness.config.read_config_file>`), and the
+        environment is scanned once for all commands.
+
+        """
+        if self._config_file is None and self._env_prefix is None:
+            return
+
+        sections = {}  # type: ConfigSections
+        if self._config_file is not None:
+            try:
+                sections = read_config_file(self._config_file)
+            except configparser.Error as err:
+                self._parser.error(f"unable to read configuration: {err}")
+                return
+
+        environ = {}  # type: EnvVars
+        prefix = self._env_prefix
+        if prefix is not None:
+            environ = read_environment(prefix)
+
+        self._config = (sections, environ)
+        apply_defaults(
+            self._parser, sections.get(self.name, {}), environ, prefix
+        )
+        # Commands whose parser hasn't been built yet are configured when the
+        # parser is built
+        for command in self._walk_built_commands():
+            self._configure_command(command)
+
+    def _configure_command(self, command: Command) -> None:
+        if self._config is None:
+            return
+        sections, environ = self._config
+        prefix = self._env_prefix
+        apply_defaults(
+            command.parser,
+            sections.get(".".join(command.path), {}),
+            environ,
+            None if prefix is None else env_name(prefix, *command.path),
+        )
+
+    def load_plugins(
+        self,
+        group: str,
+        title: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> List[PluginCommand]:
+        """Add the commands provided by plugins
+
+        Plugins are commands advertised by installed distributions through
+        package entry points (see :mod:`wilderness.plugins`). The discovered
+        plugins are stored in an index in the cache directory, and the
+        plugins themselves are only imported when their command is used.
+
+        Parameters
+        ----------
+        group : str
+            The name of the entry point group, such as ``"fakegit.commands"``.
+
+        title : Optional[str]
+            Title of the command group to add the plugin commands to. By
+            default the commands are added to the root group.
+
+        use_cache : bool
+            Whether to use the plugin index in the cache directory.
+
+        Returns
+        -------
+        commands : List[:class:`wilderness.plugins.PluginCommand`]
+            The placeholder commands that were added.
+
+        """
+        plugins = [
+            PluginCommand(name, target, title=cmd_title, aliases=list(aliases))
+            for name, cmd_title, aliases, target in discover_plugins(
+                group, use_cache=use_cache
+            )
+        ]
+        if plugins and title is not None:
+            cmd_group = self.add_group(title)
+            for command in plugins:
+                cmd_group.add(command)
+        else:
+            for command in plugins:
+                self.add(command)
+        return plugins
+
     def handle(self) -> int:
         """Main method to override for single-command applications.
 
@@ -312,6 +577,9 @@ class Application(DocumentableMixin):
         example), this method must be overridden with the actual functionality.
         For multi-command applications, this method is not used.
 
+        Applications that set the ``output_format`` attribute can return an
+        iterable of records instead, see :mod:`wilderness.records`.
+
         Returns
         -------
         return_code : int
@@ -326,6 +594,8 @@ class Application(DocumentableMixin):
         args: Optional[List[str]] = None,
         namespace: Optional[argparse.Namespace] = None,
         exit_on_error: bool = True,
+        lazy: bool = False,
+        cancellation: Optional[CancellationToken] = None,
     ) -> int:
         """Main method to run the application
 
@@ -343,6 +613,20 @@ class Application(DocumentableMixin):
         exit_on_error : bool
             Whether or not to exit when argparse encounters an error.
 
+        lazy : bool
+            Whether to defer the type conversion of arguments until they are
+            first accessed. When enabled, the arguments are stored in a
+            :class:`LazyNamespace <wilderness.lazy.LazyNamespace>` that runs
+            the ``type`` converter of an argument on first access and
+            memoizes the result. Conversion errors are reported in the same
+            way as argparse reports them during parsing.
+
+        cancellation : Optional[CancellationToken]
+            The cancellation token of the invocation. This can be used to
+            cancel the invocation from another thread. By default a new
+            token is created. See :mod:`wilderness.cancellation` for
+            details.
+
         Returns
         -------
         return_code : int
@@ -350,9 +634,28 @@ class Application(DocumentableMixin):
             at the command line.
 
         """
+        if lazy:
+            if namespace is None:
+                namespace = LazyNamespace()
+            elif not isinstance(namespace, LazyNamespace):
+                raise ValueError(
+                    "Lazy type conversion requires a LazyNamespace "
+                    f"(received: {type(namespace)})"
+                )
+
+        self._timeline = {"start": time.perf_counter_ns()}
+        self._argv = sys.argv[1:] if args is None else list(args)
+
         # Parse the command line arguments as given
         self._parser.exit_on_error = exit_on_error
-        parsed_args = self._parser.parse_args(args=args, namespace=namespace)
+        self._parser._exit_called = False
+        self.load_config()
+        if self._parser._exit_called:
+            return 1
+        with deferred_conversion(lazy):
+            parsed_args = self._parser.parse_args(
+                args=args, namespace=namespace
+            )
 
         # If a parser error caused argparse to print the help, then we stop
         # here
@@ -361,9 +664,13 @@ class Application(DocumentableMixin):
 
         # If there are no subparsers registered, we have an application without
         # subcommands, so the application handles things
+        self._timeline["parsed"] = time.perf_counter_ns()
         self.args = parsed_args
         if self._subparsers is None:
-            return self.handle()
+            self._timeline["dispatched"] = self._timeline["parsed"]
+            return self._invoke(
+                None, lambda: handle_result(self, self.handle()), cancellation
+            )
 
         # Satisfy mypy
         assert self.args is not None
@@ -377,10 +684,123 @@ class Application(DocumentableMixin):
                 self.print_help()
                 return 1
 
+        # Find the requested command, descending into subcommands. If a
+        # command with subcommands is given without a subcommand, the command
+        # itself is run.
+        try:
+            command = self.get_command(self.args.target)
+        except KeyError:
+            # Accepted by the subparsers, so this is an external command
+            executable = self.external_commands[self.args.target]
+            command = ExternalCommand(self.args.target, executable)
+            command._parent = self
+        while command.commands:
+            name = getattr(self.args, command.subparsers_dest, None)
+            if name is None:
+                break
+            command = command.get_command(name)
+
         # Run the requested command
-        command = self.get_command(self.args.target)
         command.args = self.args
-        return self.run_command(command)
+        self._timeline["dispatched"] = time.perf_counter_ns()
+        return self._invoke(
+            command,
+            lambda: handle_result(command, self.run_command(command)),
+            cancellation,
+        )
+
+    def main(self, args: Optional[List[str]] = None) -> NoReturn:
+        """Run the application and exit with its return code
+
+        This is the entry point for console scripts. In performance mode the
+        process exits without the teardown of the interpreter, after running
+        the functions registered with :mod:`atexit` and flushing the output
+        (see :func:`wilderness.performance.fast_exit`).
+
+        Parameters
+        ----------
+        args : Optional[List[str]]
+            List of arguments to the application. By default the arguments
+            are read from the command line.
+
+        """
+        return_code = self.run(args=args)
+        self.shutdown_executors()
+        if self._performance:
+            fast_exit(return_code)
+        sys.exit(return_code)
+
+    def _invoke(
+        self,
+        command: Optional[Command],
+        func: Callable[[], int],
+        token: Optional[CancellationToken],
+    ) -> int:
+        host = self if command is None else command  # type: SubcommandsMixin
+        timeout = getattr(host.args, "timeout", None)
+        token = CancellationToken() if token is None else token
+        # A reader that goes away (as in ``app | head``) isn't an error of
+        # the command, so this exits quietly with the status of SIGPIPE
+        try:
+            with contextlib.ExitStack() as stack:
+                stack.enter_context(
+                    cancellation_scope(
+                        token,
+                        cooperative=host.cancellable,
+                        timeout=timeout if host.cancellable else None,
+                    )
+                )
+                stack.enter_context(
+                    report_progress(current_streams().stderr, self._progress)
+                )
+                stack.enter_context(closing_files())
+                stack.enter_context(self._executors.invocation())
+                if self._output_buffer_size is not None:
+                    stack.enter_context(
+                        buffered_stdout(self._output_buffer_size)
+                    )
+                return_code = self._run_hooks(command, func)
+                token.check()
+                return return_code
+        except BrokenPipeError:
+            return handle_broken_pipe()
+        except Cancelled as err:
+            if token.signum is not None:
+                # The signal was sent to the process, so the queued work of
+                # the executors is cancelled as for an interrupt
+                self._executors.shutdown(cancel=True)
+            token.run_cleanups()
+            return err.return_code
+        except KeyboardInterrupt:
+            # Don't wait for the work that is queued in the executors
+            self._executors.shutdown(cancel=True)
+            raise
+
+    def shutdown_executors(self) -> None:
+        """Shut down the executors of the commands
+
+        The executors are shared between the invocations of the commands of
+        the application, see :mod:`wilderness.parallel`. This waits for the
+        running work to finish. Executors are also shut down when the
+        process exits.
+
+        """
+        self._executors.shutdown()
+
+    def _run_hooks(
+        self, command: Optional[Command], func: Callable[[], int]
+    ) -> int:
+        started = []  # type: List[Hook]
+        return_code = None  # type: Optional[int]
+        try:
+            for hook in self._hooks:
+                hook.start(self, command)
+                started.append(hook)
+            return_code = func()
+            return return_code
+        finally:
+            for hook in reversed(started):
+                hook.stop(self, command, return_code)
 
     def run_command(self, command: Command) -> int:
         """Run a particular command directy
@@ -399,28 +819,6 @@ class Application(DocumentableMixin):
         # This is here so the user can override how commands are executed
         return command.handle()
 
-    def get_command(self, command_name: str) -> Command:
-        """Get a command by name
-
-        Parameters
-        ----------
-        command_name : str
-            The name of the command to find
-
-        Returns
-        -------
-        command : :class:`wilderness.command.Command`
-            The instance of the Command to be returned.
-
-        Raises
-        ------
-        KeyError
-            If no command with the provided name can be found, a KeyError is
-            raised.
-
-        """
-        return self._command_map[command_name]
-
     def set_prolog(self, prolog: str) -> None:
         """Set the prolog of the command line help text
 
@@ -445,14 +843,6 @@ class Application(DocumentableMixin):
         """
         self._epilog = epilog
 
-    def get_commands_text(self) -> str:
-        text = []
-        for cmd in self.commands:
-            text.append(f"{self.name}-{cmd.name}(1)")
-            text.append(f"\t{cmd.title or ''}")
-            text.append("")
-        return "\n".join(text)
-
     def create_manpage(self) -> ManPage:
         """Create the Manpage for the application
 
@@ -477,69 +867,3 @@ class Application(DocumentableMixin):
         for sec in self._extra_sections:
             man.add_section(sec, self._extra_sections[sec])
         return man
-
-    def format_help(self) -> str:
-        """Format the command line help for the application
-
-        This method creates the help text for the command line, which is
-        typically printed when the -h / --help / help command line arguments
-        are used. The :func:`print_help` method calls this method to format
-        the help text.
-
-        Returns
-        -------
-        help_text : str
-            The help text as a single string.
-
-        """
-        formatter = argparse.RawTextHelpFormatter(prog=self._parser.prog)
-
-        # usage
-        formatter.add_usage(
-            self._parser.usage,
-            self._parser._actions,
-            self._parser._mutually_exclusive_groups,
-        )
-
-        # prolog
-        formatter.add_text(self._prolog)
-
-        # add commands from root group, unless we only have help
-        only_help = (
-            self._root_group
-            and len(self._root_group) == 1
-            and self._root_group.commands[0].name == "help"
-        )
-        if self._root_group and not only_help:
-            formatter.start_section(self._root_group.title)
-            actions = self._root_group.commands_as_actions()
-            formatter.add_arguments(actions)
-            formatter.end_section()
-
-        # add commands from other groups
-        for group in self._group_map.values():
-            formatter.start_section(group.title)
-            actions = group.commands_as_actions()
-            formatter.add_arguments(actions)
-            formatter.end_section()
-
-        # epilog
-        formatter.add_text(self._epilog)
-
-        # determine help from format above
-        return formatter.format_help()
-
-    def print_help(self, file: Optional[TextIO] = None):
-        """Print the command line help text for the application
-
-        Parameters
-        ----------
-        file : Optional[TextIO]
-            The file to which to write the help text. If omitted, the help text
-            will be written to sys.stdout.
-
-        """
-        if file is None:
-            file = sys.stdout
-        message = self.format_help()
-        self._parser._print_message(message, file=file)
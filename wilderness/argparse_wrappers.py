@@ -14,17 +14,56 @@ import argparse
 import sys
 
 from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
 from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Union
+
+from wilderness.index import CommandIndex
+from wilderness.lazy import DeferredValue
+from wilderness.lazy import should_defer
+from wilderness.streams import current_streams
 
 if TYPE_CHECKING:
     import wilderness.command
 
+# Attribute of the namespace that holds the arguments that follow a command
+# handled by the fallback of the subparsers action
+PASSTHROUGH_DEST = "_passthrough_args"
+
 
 class ArgumentParser(argparse.ArgumentParser):
     def __init__(self, *args, exit_on_error=True, **kwargs):
         super().__init__(*args, **kwargs)
         self.exit_on_error = exit_on_error
         self._exit_called = False
+        self.help_provider = None  # type: Optional[wilderness.command.Command]
+
+    def format_help(self) -> str:
+        # Commands that have subcommands format their own help text
+        provider = self.help_provider
+        if provider is not None and provider.commands:
+            return provider.format_help()
+        return super().format_help()
+
+    def _print_message(self, message: str, file=None):
+        # Write to the streams of the current invocation
+        streams = current_streams()
+        if file is None or file is sys.stdout:
+            file = streams.stdout
+        elif file is sys.stderr:
+            file = streams.stderr
+        super()._print_message(message, file)
+
+    def parse_args(self, args=None, namespace=None):
+        # Report unrecognized arguments through error(), as argparse raises
+        # them instead when exit_on_error is false (Python 3.13+)
+        parsed, extras = self.parse_known_args(args, namespace)
+        if extras:
+            self.error("unrecognized arguments: %s" % " ".join(extras))
+        return parsed
 
     def exit(self, status: Optional[int] = 0, message: Optional[str] = None):
         if message:
@@ -33,6 +72,115 @@ class ArgumentParser(argparse.ArgumentParser):
         if self.exit_on_error:
             sys.exit(status)
 
+    def _get_value(self, action: argparse.Action, arg_string: str):
+        if should_defer(action):
+            return DeferredValue(self, action, arg_string)
+        return super()._get_value(action, arg_string)
+
+    def _check_value(self, action: argparse.Action, value):
+        if isinstance(action, SubParsersAction):
+            action.resolve(value)
+            return
+        super()._check_value(action, value)
+
+
+class SubParsersAction(argparse._SubParsersAction):
+    """Subparsers action that resolves command names through an index
+
+    The index maps aliases and (optionally) unique prefixes to the name of
+    the command, and provides suggestions for mistyped command names that are
+    included in the error message.
+
+    Parsers can be added lazily, in which case only the name is stored and
+    the parser is created by the builder function of the action when the
+    command is first selected.
+
+    Names that don't match a command can be accepted by the fallback function
+    of the action (used for external commands). The arguments that follow
+    such a name are not parsed, but are stored in the namespace as a list.
+
+    """
+
+    def __init__(self, *args, index: Optional[CommandIndex] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = index
+        self.builder = None  # type: Optional[Callable[[str], ArgumentParser]]
+        self._pending = set()  # type: Set[str]
+        self.fallback = None  # type: Optional[Callable[[str], bool]]
+
+    def create_parser(self, name: str, **kwargs) -> ArgumentParser:
+        """Create a parser for a subcommand without adding it"""
+        if kwargs.get("prog") is None:
+            kwargs["prog"] = f"{self._prog_prefix} {name}"
+        return self._parser_class(**kwargs)
+
+    def add_lazy_parser(self, name: str) -> None:
+        """Add a subcommand whose parser is built on first use"""
+        if self._has_name(name):
+            msg = f"conflicting subparser: {name}"
+            raise argparse.ArgumentError(self, msg)
+        self._pending.add(name)
+
+    def get_parser(self, name: str) -> argparse.ArgumentParser:
+        """Get the parser for a subcommand, building it if needed"""
+        parser = self._name_parser_map.get(name)
+        if parser is None:
+            assert self.builder is not None
+            self._pending.remove(name)
+            parser = self.builder(name)
+            self._name_parser_map[name] = parser
+        return parser
+
+    def _has_name(self, name: str) -> bool:
+        return name in self._name_parser_map or name in self._pending
+
+    def resolve(self, value: str) -> str:
+        """Resolve the command name, raising ArgumentError if unknown"""
+        if self.index is not None:
+            name = self.index.resolve(value)
+            if name is not None:
+                return name
+        if self._has_name(value):
+            return value
+        if self.fallback is not None and self.fallback(value):
+            return value
+        raise argparse.ArgumentError(self, self._invalid_choice(value))
+
+    def _invalid_choice(self, value: str) -> str:
+        if self.index is not None:
+            if self.index.allow_prefix and value:
+                matches = self.index.matches(value)
+                if len(matches) > 1:
+                    options = ", ".join(map(repr, matches))
+                    return f"ambiguous choice: {value!r} could match {options}"
+            suggestions = self.index.suggest(value)
+            if suggestions:
+                options = " or ".join(map(repr, suggestions))
+                return f"invalid choice: {value!r} (did you mean {options}?)"
+        names = [*self._name_parser_map, *sorted(self._pending)]
+        choices = ", ".join(map(repr, names))
+        return f"invalid choice: {value!r} (choose from {choices})"
+
+    def __call__(
+        self,
+        parser: argparse.ArgumentParser,
+        namespace: argparse.Namespace,
+        values: Union[str, Sequence[Any], None],
+        option_string: Optional[str] = None,
+    ):
+        # Subparsers are positional with nargs=PARSER, so the values are the
+        # command name followed by the remaining arguments
+        assert isinstance(values, list)
+        name = self.resolve(values[0])
+        if not self._has_name(name):
+            # Accepted by the fallback
+            setattr(namespace, self.dest, name)
+            setattr(namespace, PASSTHROUGH_DEST, values[1:])
+            return
+        self.get_parser(name)
+        values = [name, *values[1:]]
+        super().__call__(parser, namespace, values, option_string)
+
 
 class ArgumentGroup:
     def __init__(self, group: argparse._ArgumentGroup):
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers for on-disk caches
+
+Wilderness keeps a few small caches on disk (such as the compiled
+configuration files) to speed up application startup. This module contains
+the shared helpers for locating and writing these cache files.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from typing import Optional
+
+
+def cache_directory() -> str:
+    """Return the directory where Wilderness stores its caches
+
+    This follows the XDG Base Directory specification, i.e., the cache
+    directory is ``$XDG_CACHE_HOME/wilderness`` if the environment variable is
+    set and ``~/.cache/wilderness`` otherwise. The location can be overridden
+    by setting the ``WILDERNESS_CACHE_DIR`` environment variable.
+
+    """
+    override = os.environ.get("WILDERNESS_CACHE_DIR")
+    if override:
+        return override
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "wilderness")
+
+
+def cache_filename(kind: str, key: str, ext: str = "bin") -> str:
+    """Return the path of a cache file for a given kind and key
+
+    Parameters
+    ----------
+    kind : str
+        The kind of cache (e.g., ``"config"``), used as a prefix of the
+        filename.
+
+    key : str
+        Arbitrary string identifying the cached object, such as the path of
+        the file that was cached. It is hashed to create the filename.
+
+    ext : str
+        The extension of the cache file.
+
+    """
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_directory(), f"{kind}-{digest}.{ext}")
+
+
+def read_cache(filename: str) -> Optional[bytes]:
+    """Read a cache file, returning None if it can't be read"""
+    try:
+        with open(filename, "rb") as fp:
+            return fp.read()
+    except OSError:
+        return None
+
+
+def write_cache(filename: str, data: bytes) -> bool:
+    """Atomically write a cache file
+
+    The data is written to a temporary file in the same directory, which is
+    then moved in place. Failures are silently ignored, since a missing cache
+    only means that the cached data has to be recomputed.
+
+    Returns
+    -------
+    success : bool
+        Whether the cache file was written.
+
+    """
+    dirname = os.path.dirname(filename)
+    try:
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=dirname, prefix=".tmp-")
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmpname, filename)
+    except OSError:
+        try:
+            os.unlink(tmpname)
+        except OSError:
+            pass
+        return False
+    return True
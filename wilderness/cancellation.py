@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""Cancellation
+
+This module contains the cancellation token of an invocation, which tells a
+command that it should stop. The token of the current invocation is
+available as ``self.cancellation``, and a token is cancelled when the
+application receives ``SIGINT`` (Ctrl-C) or ``SIGTERM``, when the command
+runs longer than its ``--timeout``, or when :func:`CancellationToken.cancel`
+is called (for instance by a server that runs many invocations in the same
+process).
+
+Commands that set the ``cancellable`` class attribute check the token at
+convenient points, register cleanup functions that remove partial output,
+and get a ``--timeout`` option::
+
+    class ConvertCommand(Command):
+        cancellable = True
+
+        def handle(self):
+            token = self.cancellation
+            token.add_cleanup(os.unlink, self.args.output)
+            with open(self.args.output, "w") as fp:
+                for record in read_records(self.args.input):
+                    token.check()
+                    fp.write(convert(record))
+            return 0
+
+For these commands, the first signal only cancels the token, and a second
+signal stops the command where it is. For other commands the first signal
+stops the command where it is, as :class:`KeyboardInterrupt` would.
+Stopping raises :class:`Cancelled` (as does :func:`CancellationToken.check`),
+after which the cleanup functions are called in reverse order of
+registration and the invocation returns the exit code of the shell for the
+cause: 130 for ``SIGINT``, 143 for ``SIGTERM``, and 124 for a timeout (as
+the ``timeout`` utility does). The cleanup functions are also called if the
+command returns after its token was cancelled. The process itself keeps
+running, so that applications that run many invocations in the same
+process only cancel one of them.
+
+The signal handlers are only installed when the application runs in the
+main thread and the default handlers are in place. Note that threads don't
+inherit the token, so it should be passed to worker threads explicitly.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import contextlib
+import contextvars
+import re
+import signal
+import threading
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from wilderness.streams import current_streams
+
+if TYPE_CHECKING:
+    import wilderness.subcommands
+
+# The exit codes of cancelled invocations
+EXIT_TIMEOUT = 124
+EXIT_INTERRUPTED = 130  # 128 + SIGINT
+EXIT_TERMINATED = 143  # 128 + SIGTERM
+
+_SIGNALS = {
+    signal.SIGINT: ("interrupted", signal.default_int_handler),
+    signal.SIGTERM: ("terminated", signal.SIG_DFL),
+}  # type: Dict[int, Tuple[str, Any]]
+
+_DURATION = re.compile(r"^(\d+(?:\.\d*)?|\.\d+)([smhd]?)$")
+
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class Cancelled(KeyboardInterrupt):
+    """Raised to stop a command whose invocation is cancelled
+
+    This is a subclass of :class:`KeyboardInterrupt`, so that code that
+    stops its work on an interrupt (such as
+    :func:`wilderness.processes.run_processes`) does the same when the
+    invocation is cancelled, and so that ``except Exception`` doesn't catch
+    it.
+    """
+
+    def __init__(self, reason: str, return_code: int):
+        super().__init__(reason, return_code)
+        self.reason = reason
+        self.return_code = return_code
+
+
+class CancellationToken:
+    """The cancellation state of an invocation
+
+    The token can be cancelled from any thread, and once cancelled it stays
+    cancelled. Only the reason and exit code of the first cancellation are
+    kept.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        # The signal handlers cancel the token in the thread that may hold
+        # the lock
+        self._lock = threading.RLock()
+        self._reason = None  # type: Optional[str]
+        self._return_code = None  # type: Optional[int]
+        self._signum = None  # type: Optional[int]
+        self._cleanups = []  # type: List[Tuple[Callable, Tuple, Dict]]
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token is cancelled"""
+        return self._event.is_set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        """The reason for the cancellation, such as ``"interrupted"``"""
+        return self._reason
+
+    @property
+    def return_code(self) -> Optional[int]:
+        """The exit code of the cancelled invocation"""
+        return self._return_code
+
+    @property
+    def signum(self) -> Optional[int]:
+        """The signal that cancelled the token, if any"""
+        return self._signum
+
+    def cancel(
+        self,
+        reason: str = "cancelled",
+        return_code: int = EXIT_INTERRUPTED,
+        signum: Optional[int] = None,
+    ) -> bool:
+        """Cancel the token
+
+        Returns whether the token was cancelled by this call.
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._reason = reason
+            self._return_code = return_code
+            self._signum = signum
+            self._event.set()
+        return True
+
+    def check(self) -> None:
+        """Raise :class:`Cancelled` if the token is cancelled"""
+        if self._event.is_set():
+            assert self._reason is not None and self._return_code is not None
+            raise Cancelled(self._reason, self._return_code)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the token is cancelled or the timeout expires
+
+        This can replace :func:`time.sleep` in commands that wait, and
+        returns whether the token is cancelled.
+        """
+        return self._event.wait(timeout)
+
+    def add_cleanup(self, func: Callable, *args: Any, **kwargs: Any) -> None:
+        """Register a function that is called if the token is cancelled
+
+        The function is called with the given arguments when the invocation
+        ends, after the command has stopped.
+        """
+        with self._lock:
+            self._cleanups.append((func, args, kwargs))
+
+    def run_cleanups(self) -> None:
+        """Call the cleanup functions, most recently registered first
+
+        Errors are written to the standard error of the invocation and
+        don't stop the remaining cleanup functions.
+        """
+        with self._lock:
+            cleanups, self._cleanups = self._cleanups, []
+        for func, args, kwargs in reversed(cleanups):
+            try:
+                func(*args, **kwargs)
+            except Exception as err:
+                current_streams().stderr.write(f"Error in cleanup: {err}\n")
+
+
+_TOKEN = contextvars.ContextVar(
+    "wilderness_cancellation"
+)  # type: contextvars.ContextVar[CancellationToken]
+
+
+def current_token() -> CancellationToken:
+    """The cancellation token of the current invocation
+
+    Outside of an invocation a new token is returned, which isn't cancelled
+    unless the caller does so.
+    """
+    try:
+        return _TOKEN.get()
+    except LookupError:
+        return CancellationToken()
+
+
+def parse_duration(text: str) -> float:
+    """Parse a duration in seconds, with an optional unit
+
+    The units are those of the ``timeout`` utility: ``s`` for seconds (the
+    default), ``m`` for minutes, ``h`` for hours, and ``d`` for days.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        If the duration is invalid, so that this function can be used as the
+        ``type`` of an argument.
+
+    """
+    match = _DURATION.match(text.strip())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text!r}")
+    value = float(match.group(1)) * _UNITS[match.group(2)]
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text!r}")
+    return value
+
+
+def add_timeout_argument(host: "wilderness.subcommands.SubcommandsMixin"):
+    """Add the ``--timeout`` option for commands that can be cancelled
+
+    The option isn't added if the command already has a ``--timeout``
+    option.
+    """
+    if "--timeout" in host.parser._option_string_actions:
+        return
+    host.add_argument(
+        "--timeout",
+        type=parse_duration,
+        metavar="DURATION",
+        help="stop the command after DURATION (e.g., 30s, 5m, or 1h)",
+        description=(
+            "Stop the command if it runs longer than DURATION, which is a "
+            "number of seconds with an optional unit (s, m, h, or d). The "
+            f"exit code is then {EXIT_TIMEOUT}."
+        ),
+    )
+
+
+@contextlib.contextmanager
+def _signal_handlers(
+    token: CancellationToken, cooperative: bool
+) -> Iterator[None]:
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(signum, frame):
+        reason, _ = _SIGNALS[signum]
+        if token.cancel(reason, 128 + signum, signum) and cooperative:
+            return
+        token.check()
+
+    previous = {}  # type: Dict[int, Any]
+    for signum, (_, default) in _SIGNALS.items():
+        if signal.getsignal(signum) is default:
+            previous[signum] = signal.signal(signum, handler)
+    try:
+        yield
+    finally:
+        for signum, prev in previous.items():
+            signal.signal(signum, prev)
+
+
+@contextlib.contextmanager
+def cancellation_scope(
+    token: CancellationToken,
+    cooperative: bool = False,
+    timeout: Optional[float] = None,
+) -> Iterator[CancellationToken]:
+    """Make the token the token of the invocations in this context
+
+    This installs the signal handlers that cancel the token and starts the
+    timer of the timeout, if given. With ``cooperative``, the first signal
+    only cancels the token.
+    """
+    reset = _TOKEN.set(token)
+    timer = None
+    if timeout is not None:
+        timer = threading.Timer(
+            timeout,
+            token.cancel,
+            args=(f"timed out after {timeout:g} seconds", EXIT_TIMEOUT),
+        )
+        timer.daemon = True
+        timer.start()
+    try:
+        with _signal_handlers(token, cooperative):
+            yield token
+    finally:
+        if timer is not None:
+            timer.cancel()
+        _TOKEN.reset(reset)
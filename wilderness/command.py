@@ -15,19 +15,25 @@ import abc
 import argparse
 
 from typing import TYPE_CHECKING
+from typing import Any
 from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Tuple
 
 from wilderness.argparse_wrappers import ArgumentGroup
 from wilderness.argparse_wrappers import MutuallyExclusiveGroup
-from wilderness.documentable import DocumentableMixin
+from wilderness.group import Group
 from wilderness.manpages import ManPage
+from wilderness.memory import checkpoint
+from wilderness.subcommands import SubcommandsMixin
+from wilderness.tracing import span
 
 if TYPE_CHECKING:
     import wilderness.application
 
 
-class Command(DocumentableMixin, metaclass=abc.ABCMeta):
+class Command(SubcommandsMixin, metaclass=abc.ABCMeta):
     def __init__(
         self,
         name: str,
@@ -37,6 +43,7 @@ class Command(DocumentableMixin, metaclass=abc.ABCMeta):
         extra_sections: Optional[Dict[str, str]] = None,
         options_prolog: Optional[str] = None,
         options_epilog: Optional[str] = None,
+        aliases: Optional[List[str]] = None,
     ):
         super().__init__(
             description=description,
@@ -46,14 +53,71 @@ class Command(DocumentableMixin, metaclass=abc.ABCMeta):
         )
         self._name = name
         self._title = title
+        self._aliases = [] if aliases is None else list(aliases)
 
         self._args: Optional[argparse.Namespace] = None
-        self._application: Optional[wilderness.application.Application] = None
+        self._parent: Optional[SubcommandsMixin] = None
         self._add_help = add_help
 
     @property
     def application(self) -> Optional["wilderness.application.Application"]:
-        return self._application
+        return self._get_application()
+
+    def _get_application(
+        self,
+    ) -> Optional["wilderness.application.Application"]:
+        if self._parent is None:
+            return None
+        return self._parent._get_application()
+
+    @property
+    def parent(self) -> Optional[SubcommandsMixin]:
+        """The application or command that this command was added to"""
+        return self._parent
+
+    @property
+    def parser(self) -> argparse.ArgumentParser:
+        # The parser is built by the parent when first needed
+        if self._parser is None and self._parent is not None:
+            self._parent._ensure_subparsers()
+            assert self._parent._subparsers is not None
+            self._parent._subparsers.get_parser(self.name)
+        assert self._parser is not None
+        return self._parser
+
+    @parser.setter
+    def parser(self, parser: argparse.ArgumentParser):
+        self._parser = parser
+
+    def _ensure_registered(self) -> None:
+        # Subcommands can be added in register(), which is only called when
+        # the parser is built
+        if self._parser is None and self._parent is not None:
+            self.parser
+
+    @property
+    def commands(self) -> Tuple["Command", ...]:
+        self._ensure_registered()
+        return super().commands
+
+    @property
+    def groups(self) -> Tuple[Group, ...]:
+        self._ensure_registered()
+        return super().groups
+
+    def get_command(self, command_name: str) -> "Command":
+        self._ensure_registered()
+        return super().get_command(command_name)
+
+    @property
+    def path(self) -> List[str]:
+        if self._parent is None:
+            return [self.name]
+        return [*self._parent.path, self.name]
+
+    @property
+    def subparsers_dest(self) -> str:
+        return "_".join(["target", *self.path])
 
     @property
     def name(self) -> str:
@@ -63,6 +127,11 @@ class Command(DocumentableMixin, metaclass=abc.ABCMeta):
     def title(self) -> Optional[str]:
         return self._title
 
+    @property
+    def aliases(self) -> List[str]:
+        """Alternative names for the command"""
+        return self._aliases
+
     def add_argument(self, *args, **kwargs):
         assert self._parser is not None
         help_ = kwargs.get("help", None)
@@ -87,18 +156,60 @@ class Command(DocumentableMixin, metaclass=abc.ABCMeta):
         meg.command = self
         return meg
 
+    def format_help(self) -> str:
+        """Format the command line help for the command
+
+        For commands with subcommands this lists the available subcommands in
+        the same way as the help text of the application. For other commands
+        this is the help text produced by argparse.
+
+        """
+        if not self.commands:
+            return self.parser.format_help()
+        return super().format_help()
+
     def register(self):
+        """Register arguments and subcommands to the command
+
+        Override this method to add command line arguments to the command
+        (using self.add_argument, etc.). Commands can also add subcommands
+        here, using self.add or self.add_group. This method is called when the
+        parser of the command is built, which happens when the command is
+        selected on the command line or when its parser is first accessed.
+
+        """
         pass
 
     @abc.abstractmethod
     def handle(self) -> int:
         pass
 
+    def checkpoint(self, name: str) -> None:
+        """Record a named memory checkpoint
+
+        When the memory use of the command is traced (see
+        :mod:`wilderness.memory`), this records the traced memory and the
+        allocation sites that changed the most since the previous checkpoint.
+        Otherwise this does nothing.
+
+        """
+        checkpoint(name)
+
+    def span(self, name: str, **attributes: Any):
+        """Open a tracing span, for use as a context manager
+
+        When the application is traced (see :mod:`wilderness.tracing`), the
+        span is recorded as a child of the innermost open span. Otherwise
+        this returns an object that does nothing.
+
+        """
+        return span(name, **attributes)
+
     def create_manpage(self) -> ManPage:
         assert self.application is not None
         man = ManPage(
             self.application.name,
-            command_name=self.name,
+            command_name="-".join(self.path),
             version=self.application.version,
             title=self._title,
             author=self.application.author,
@@ -107,6 +218,8 @@ class Command(DocumentableMixin, metaclass=abc.ABCMeta):
         if self.description:
             man.add_section("description", self.description)
         man.add_section("options", self.get_options_text())
+        if self.commands:
+            man.add_section("commands", self.get_commands_text())
         for sec in self._extra_sections:
             man.add_section(sec, self._extra_sections[sec])
         return man
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""Compression
+
+This module contains the detection of compressed files and the streams that
+decompress and compress them, using the :mod:`gzip`, :mod:`bz2`, and
+:mod:`lzma` modules of the standard library. It is used by the file
+arguments in :mod:`wilderness.files`.
+
+The compression of input is detected from the first bytes of the data (the
+magic number of the format), so that it doesn't depend on the name of the
+file and works for the standard input. The compression of output is chosen
+from the name of the file, by its extension (``.gz``, ``.bz2``, or
+``.xz``).
+
+Decompression is CPU-bound, but the decompressors release the GIL while they
+work. The :class:`ThreadedReader` therefore decompresses in a separate
+thread, so that a command that parses the data can do so while the next
+chunk is decompressed.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+
+from typing import IO
+from typing import Any
+from typing import Optional
+
+# The number of bytes needed to detect the compression
+MAGIC_SIZE = 6
+
+SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+
+def detect_compression(header: bytes) -> Optional[str]:
+    """Detect the compression from the first bytes of the data
+
+    Returns ``"gzip"``, ``"bz2"``, ``"xz"``, or None for uncompressed data.
+    """
+    if header[:2] == b"\x1f\x8b":
+        return "gzip"
+    # The block size of bzip2 follows the magic number
+    if header[:3] == b"BZh" and header[3:4] in b"123456789":
+        return "bz2"
+    if header[:6] == b"\xfd7zXZ\x00":
+        return "xz"
+    return None
+
+
+def compression_for_name(path: str) -> Optional[str]:
+    """The compression to use for a file, based on its extension"""
+    _, ext = os.path.splitext(path)
+    return SUFFIXES.get(ext.lower())
+
+
+def decompressing_reader(fp: IO[bytes], compression: str) -> io.BufferedIOBase:
+    """Wrap a binary file in a stream that decompresses it
+
+    Closing the stream doesn't close the file.
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fp, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(fp, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(fp, mode="rb")
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def compressing_writer(
+    fp: IO[bytes], compression: str, level: Optional[int] = None
+) -> io.BufferedIOBase:
+    """Wrap a binary file in a stream that compresses what is written
+
+    The default level is that of the command line tools (6 for gzip and xz,
+    9 for bzip2). Closing the stream doesn't close the file.
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(
+            fileobj=fp, mode="wb", compresslevel=6 if level is None else level
+        )
+    if compression == "bz2":
+        return bz2.BZ2File(
+            fp, mode="wb", compresslevel=9 if level is None else level
+        )
+    if compression == "xz":
+        return lzma.LZMAFile(fp, mode="wb", preset=level)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+class ThreadedReader(io.RawIOBase):
+    """Read a stream in a background thread
+
+    The thread reads chunks of ``chunk_size`` bytes from the stream (such as
+    a decompressing stream) into a queue of at most ``depth`` chunks, from
+    which the reader is read. Errors of the stream are raised by the reader.
+    Closing the reader stops the thread, but doesn't close the stream.
+
+    """
+
+    def __init__(self, fp: IO[bytes], chunk_size: int, depth: int = 4):
+        super().__init__()
+        self._queue = queue.Queue(maxsize=depth)  # type: queue.Queue[Any]
+        self._stop = threading.Event()
+        self._pending = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(fp, chunk_size),
+            name="wilderness-reader",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, fp: IO[bytes], chunk_size: int) -> None:
+        try:
+            while not self._stop.is_set():
+                data = fp.read(chunk_size)
+                self._put(data)
+                if not data:
+                    return
+        except Exception as err:
+            self._put(err)
+
+    def _put(self, item: Any) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if not self._pending:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                self._eof = True
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self._pending = memoryview(item)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+        super().close()
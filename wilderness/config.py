@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""Layered configuration
+
+This module contains the code to read default values for command line
+arguments from a configuration file and from environment variables. The
+values are layered as follows (later layers take precedence):
+
+1. The defaults given to ``add_argument``.
+2. The configuration file.
+3. The environment variables.
+4. The command line.
+
+The configuration file uses the INI format. Options of the application are
+read from the section with the name of the application, and options of a
+command from the section with the name of the command. For nested commands
+the section name is formed by the command names joined by dots (e.g.,
+``remote.add``). Keys are the
+destinations of the arguments, where dashes and underscores are
+interchangeable. For example::
+
+    [fakegit]
+    quiet = true
+
+    [clone]
+    depth = 1
+
+Environment variables are formed by the prefix, the command name(s) (for
+command options), and the destination of the argument, joined by underscores
+and in upper case. For instance: ``FAKEGIT_QUIET`` or ``FAKEGIT_CLONE_DEPTH``.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import configparser
+import marshal
+import os
+import shlex
+import sys
+import weakref
+
+from typing import Any
+from typing import Dict
+from typing import Mapping
+from typing import Optional
+
+from wilderness.cache import cache_filename
+from wilderness.cache import read_cache
+from wilderness.cache import write_cache
+
+# The defaults of the parsers before they were set from the configuration
+_ORIGINAL_DEFAULTS = (
+    weakref.WeakKeyDictionary()
+)  # type: weakref.WeakKeyDictionary[argparse.ArgumentParser, Dict[str, Any]]
+
+# Increase when the layout of the compiled cache changes
+_CACHE_VERSION = 1
+
+ConfigSections = Dict[str, Dict[str, str]]
+EnvVars = Dict[str, str]
+
+
+def _parse_config_file(filename: str) -> ConfigSections:
+    parser = configparser.ConfigParser(interpolation=None)
+    with open(filename, "r", encoding="utf-8") as fp:
+        parser.read_file(fp, source=filename)
+    sections = {}
+    for name in parser.sections():
+        sections[name] = {
+            key.replace("-", "_"): value
+            for key, value in parser.items(name, raw=True)
+        }
+    return sections
+
+
+def read_config_file(filename: str, use_cache: bool = True) -> ConfigSections:
+    """Read a configuration file
+
+    The parsed configuration is cached in a compact binary form, keyed by the
+    absolute path, the modification time, and the size of the file. As long as
+    the configuration file doesn't change, subsequent calls read the cache
+    instead of parsing the file again.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the configuration file. If the file doesn't exist, an empty
+        configuration is returned.
+
+    use_cache : bool
+        Whether to use the on-disk cache.
+
+    Returns
+    -------
+    sections : Dict[str, Dict[str, str]]
+        Mapping from section names to a mapping of keys to values.
+
+    Raises
+    ------
+    configparser.Error
+        If the configuration file can't be parsed.
+
+    """
+    filename = os.path.abspath(os.path.expanduser(filename))
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return {}
+
+    if not use_cache:
+        return _parse_config_file(filename)
+
+    key = (_CACHE_VERSION, filename, stat.st_mtime_ns, stat.st_size)
+    cache_file = cache_filename("config", filename)
+    data = read_cache(cache_file)
+    if data is not None:
+        try:
+            cached_key, sections = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            cached_key, sections = None, None
+        if cached_key == key:
+            return sections
+
+    sections = _parse_config_file(filename)
+    write_cache(cache_file, marshal.dumps((key, sections)))
+    return sections
+
+
+def read_environment(prefix: str) -> EnvVars:
+    """Collect the environment variables that start with the given prefix
+
+    This makes a single pass over ``os.environ``, so that the lookups for
+    individual arguments are simple dictionary lookups.
+
+    Parameters
+    ----------
+    prefix : str
+        The prefix of the environment variables, without trailing
+        underscore. The prefix is case sensitive and is typically in upper
+        case.
+
+    Returns
+    -------
+    variables : Dict[str, str]
+        The matching environment variables.
+
+    """
+    start = prefix + "_"
+    return {k: v for k, v in os.environ.items() if k.startswith(start)}
+
+
+def env_name(*parts: str) -> str:
+    """Create the name of an environment variable from its parts"""
+    return "_".join(p.replace("-", "_") for p in parts).upper()
+
+
+def env_int(name: str) -> Optional[int]:
+    """Read an integer from an environment variable
+
+    Returns None if the variable is not set or empty, and warns about (and
+    ignores) values that aren't integers.
+    """
+    value = os.environ.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        print(f"warning: ignoring invalid value of {name}", file=sys.stderr)
+        return None
+
+
+def _is_flag(action: argparse.Action) -> bool:
+    return action.nargs == 0 and isinstance(action.const, bool)
+
+
+def _is_list(action: argparse.Action) -> bool:
+    return isinstance(action, argparse._AppendAction) or action.nargs in (
+        argparse.ZERO_OR_MORE,
+        argparse.ONE_OR_MORE,
+    )
+
+
+def _convert(
+    parser: argparse.ArgumentParser, action: argparse.Action, value: str
+) -> Any:
+    if _is_flag(action):
+        states = configparser.ConfigParser.BOOLEAN_STATES
+        if value.lower() not in states:
+            raise ValueError(f"invalid boolean value: {value!r}")
+        return states[value.lower()]
+    if isinstance(action, argparse._CountAction):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"invalid int value: {value!r}")
+    if _is_list(action):
+        return [parser._get_value(action, v) for v in shlex.split(value)]
+    # String defaults are converted by argparse when the option is not given
+    return value
+
+
+def apply_defaults(
+    parser: argparse.ArgumentParser,
+    section: Mapping[str, str],
+    environ: Mapping[str, str],
+    env_prefix: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Set the parser defaults from a configuration section and environment
+
+    Only optional arguments are considered, and keys that do not correspond
+    to an argument of the parser are ignored. Defaults that were set by an
+    earlier call are reset first, so that values that are no longer in the
+    configuration or the environment don't persist between runs.
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        The parser to set the defaults for.
+
+    section : Mapping[str, str]
+        The configuration file section for this parser.
+
+    environ : Mapping[str, str]
+        Environment variables as returned by :func:`read_environment`.
+
+    env_prefix : Optional[str]
+        The prefix of the environment variables for this parser. For commands
+        this should include the command name.
+
+    Returns
+    -------
+    defaults : Dict[str, Any]
+        The defaults that were set on the parser.
+
+    """
+    original = _ORIGINAL_DEFAULTS.setdefault(parser, {})
+    if original:
+        parser.set_defaults(**original)
+
+    defaults = {}
+    for action in parser._get_optional_actions():
+        dest = action.dest
+        if dest is argparse.SUPPRESS or action.nargs == argparse.PARSER:
+            continue
+        if isinstance(action, (argparse._HelpAction, argparse._VersionAction)):
+            continue
+
+        value, source = None, None
+        if dest in section:
+            value, source = section[dest], f"configuration key {dest!r}"
+        if env_prefix is not None:
+            name = env_name(env_prefix, dest)
+            if name in environ:
+                value, source = environ[name], f"environment variable {name}"
+        if value is None or source is None:
+            continue
+        try:
+            defaults[dest] = _convert(parser, action, value)
+        except (ValueError, argparse.ArgumentError) as err:
+            parser.error(f"{source}: {err}")
+        original.setdefault(dest, action.default)
+
+    if defaults:
+        parser.set_defaults(**defaults)
+    return defaults
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+"""External commands
+
+Similar to git, an application can dispatch commands that it doesn't know
+about to executables on the PATH. For an application named ``fakegit``,
+running ``fakegit foo --bar`` then runs the ``fakegit-foo`` executable with
+the argument ``--bar``, if no command named ``foo`` is registered.
+
+Listing the directories on the PATH is relatively slow, so the result of the
+scan is stored in the cache directory, keyed by the PATH and the
+modification times of the directories on it.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import contextlib
+import marshal
+import os
+import signal
+import subprocess
+import threading
+
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from wilderness.argparse_wrappers import PASSTHROUGH_DEST
+from wilderness.cache import cache_filename
+from wilderness.cache import read_cache
+from wilderness.cache import write_cache
+from wilderness.command import Command
+from wilderness.processes import exit_code
+from wilderness.streams import current_streams
+
+# Increase when the layout of the cached scan changes
+_CACHE_VERSION = 1
+
+
+def _scan_path(prefix: str, dirs: List[str]) -> Dict[str, str]:
+    found = {}  # type: Dict[str, str]
+    start = prefix + "-"
+    for dirname in dirs:
+        try:
+            entries = list(os.scandir(dirname))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.name.startswith(start):
+                continue
+            name = entry.name[len(start) :]
+            if not name or name in found:
+                continue
+            try:
+                is_file = entry.is_file()
+            except OSError:
+                continue
+            if is_file and os.access(entry.path, os.X_OK):
+                found[name] = entry.path
+    return found
+
+
+def find_external_commands(
+    prefix: str, path: Optional[str] = None, use_cache: bool = True
+) -> Dict[str, str]:
+    """Find the executables on the PATH that provide external commands
+
+    Parameters
+    ----------
+    prefix : str
+        The name of the application. Executables named ``<prefix>-<name>``
+        provide the external command ``<name>``.
+
+    path : Optional[str]
+        The search path. By default the ``PATH`` environment variable is
+        used.
+
+    use_cache : bool
+        Whether to use the cached result of an earlier scan.
+
+    Returns
+    -------
+    commands : Dict[str, str]
+        Mapping of command names to the path of the executable. If an
+        executable occurs in multiple directories, the first one on the PATH
+        is used, as the shell would.
+
+    """
+    if path is None:
+        path = os.environ.get("PATH", os.defpath)
+    dirs = [d for d in path.split(os.pathsep) if d]
+    if not use_cache:
+        return _scan_path(prefix, dirs)
+
+    mtimes = []
+    for dirname in dirs:
+        try:
+            mtimes.append(os.stat(dirname).st_mtime_ns)
+        except OSError:
+            mtimes.append(-1)
+
+    key = (_CACHE_VERSION, prefix, path, tuple(mtimes))
+    cache_file = cache_filename("external", f"{prefix}\0{path}")
+    data = read_cache(cache_file)
+    if data is not None:
+        try:
+            cached_key, commands = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            cached_key, commands = None, None
+        if cached_key == key:
+            return commands
+
+    commands = _scan_path(prefix, dirs)
+    write_cache(cache_file, marshal.dumps((key, commands)))
+    return commands
+
+
+@contextlib.contextmanager
+def _ignore_interrupts() -> Iterator[List[signal.Signals]]:
+    # The terminal sends Ctrl-C and Ctrl-\ to the executable as well, so the
+    # application leaves it to the executable to handle them and waits for
+    # it to exit, as git does. Handlers can only be set in the main thread.
+    if threading.current_thread() is not threading.main_thread():
+        yield []
+        return
+    signums = [signal.SIGINT]
+    if hasattr(signal, "SIGQUIT"):
+        signums.append(signal.SIGQUIT)
+    previous = [(s, signal.signal(s, signal.SIG_IGN)) for s in signums]
+    try:
+        yield signums
+    finally:
+        for signum, handler in previous:
+            if handler is not None:
+                signal.signal(signum, handler)
+
+
+def spawn(argv: List[str]) -> int:
+    """Run an executable and wait for it to finish
+
+    This uses ``os.posix_spawn`` where available, which avoids copying the
+    memory of the Python process as a fork would. Interrupts (SIGINT and
+    SIGQUIT) are ignored by the application while it waits, and are handled
+    by the executable.
+
+    Returns
+    -------
+    return_code : int
+        The exit code of the process, or 128 plus the signal number if the
+        process was killed by a signal.
+
+    """
+    streams = current_streams()
+    streams.stdout.flush()
+    streams.stderr.flush()
+    if not hasattr(os, "posix_spawn"):
+        with _ignore_interrupts() as signums:
+            restore = None
+            if signums and os.name == "posix":
+                # The handlers are inherited by the executable, so the
+                # defaults are restored in the child before it is executed
+                def restore():
+                    for signum in signums:
+                        signal.signal(signum, signal.SIG_DFL)
+
+            process = subprocess.Popen(argv, preexec_fn=restore)
+            code = process.wait()
+        # Popen reports signals as negative numbers
+        return 128 - code if code < 0 else code
+    with _ignore_interrupts() as signums:
+        # The executable gets the default handlers
+        pid = os.posix_spawn(argv[0], argv, os.environ, setsigdef=signums)
+        _, status = os.waitpid(pid, 0)
+    return exit_code(status)
+
+
+class ExternalCommand(Command):
+    """Command that runs an external executable
+
+    The remaining command line arguments after the command name are passed to
+    the executable unchanged.
+
+    Parameters
+    ----------
+    name : str
+        The name of the command.
+
+    executable : str
+        The path of the executable.
+
+    """
+
+    def __init__(self, name: str, executable: str):
+        super().__init__(name, add_help=False)
+        self._executable = executable
+
+    @property
+    def executable(self) -> str:
+        return self._executable
+
+    def _ensure_registered(self) -> None:
+        # External commands don't have a parser
+        pass
+
+    def handle(self) -> int:
+        args = getattr(self.args, PASSTHROUGH_DEST, None) or []
+        return spawn([self._executable, *args])
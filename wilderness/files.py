@@ -0,0 +1,614 @@
+# -*- coding: utf-8 -*-
+
+"""File arguments
+
+This module contains the :class:`InputFile` and :class:`OutputFile` argument
+types, for commands that read and write large files. Unlike
+:class:`argparse.FileType`, a file isn't opened when the command line is
+parsed, but when the command first uses it, and it is closed when the
+command returns (also when it fails)::
+
+    class CountCommand(Command):
+        def register(self):
+            self.add_argument("input", type=InputFile())
+
+        def handle(self):
+            count = sum(1 for _ in self.args.input.lines())
+            self.stdout.write(f"{count}\\n")
+            return 0
+
+A :class:`LazyFile` can be read in two ways. :func:`LazyFile.mmap` maps the
+file into memory, which gives random access to the contents without copying
+them. :func:`LazyFile.chunks` and :func:`LazyFile.lines` iterate over the
+file with :func:`readinto` into a single buffer of ``chunk_size`` bytes that
+is reused, so that reading a file of any size takes a fixed amount of memory
+and doesn't allocate per chunk. The chunks are views on this buffer, and
+have to be copied if they are kept after the next chunk is read.
+
+The file name ``-`` refers to the standard input of the invocation. It can
+be mapped into memory only if it is redirected from a regular file, but it
+can always be read in chunks.
+
+Input files that are compressed with gzip, bzip2, or xz are decompressed
+while they are read, where the compression is detected from the contents
+(see :mod:`wilderness.compression`). With ``InputFile(threaded=True)`` the
+decompression runs in a separate thread, so that it overlaps with the
+processing of the data by the command. Output files are compressed if
+their name ends in ``.gz``, ``.bz2``, or ``.xz``, and are written through a
+large buffer::
+
+    self.add_argument("-o", "--output", type=OutputFile(), default="-")
+    ...
+    out = self.args.output.open_text()
+    for record in records:
+        out.write(format_record(record))
+
+The file name ``-`` refers to the standard output of the invocation, which
+isn't compressed.
+
+The files are closed when the handle method of the command returns, if they
+were opened in the same thread. Files that are opened in worker threads
+should be closed with :func:`LazyFile.close` (in performance mode, they are
+also closed before the process exits).
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import contextlib
+import contextvars
+import io
+import mmap
+import os
+import stat
+import weakref
+
+from typing import IO
+from typing import Any
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+from wilderness.compression import MAGIC_SIZE
+from wilderness.compression import ThreadedReader
+from wilderness.compression import compressing_writer
+from wilderness.compression import compression_for_name
+from wilderness.compression import decompressing_reader
+from wilderness.compression import detect_compression
+from wilderness.streams import current_streams
+
+# The default size of the chunks that files are read in
+CHUNK_SIZE = 1 << 20
+
+_OPEN_FILES = contextvars.ContextVar(
+    "wilderness_open_files", default=None
+)  # type: contextvars.ContextVar[Optional[List[Any]]]
+
+# The files that are open in any thread
+_LIVE = weakref.WeakSet()  # type: weakref.WeakSet[Any]
+
+
+def _track(lazy_file: Any) -> None:
+    _LIVE.add(lazy_file)
+    opened = _OPEN_FILES.get()
+    if opened is not None:
+        opened.append(lazy_file)
+
+
+class LazyFile:
+    """A file that is opened when it is first read
+
+    Parameters
+    ----------
+    path : str
+        The path to the file, or ``-`` for the standard input.
+
+    chunk_size : int
+        The size of the chunks in bytes.
+
+    decompress : bool
+        Whether to decompress the file if it is compressed.
+
+    threaded : bool
+        Whether to decompress in a separate thread.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = CHUNK_SIZE,
+        decompress: bool = True,
+        threaded: bool = False,
+    ):
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be positive")
+        self._path = path
+        self._chunk_size = chunk_size
+        self._decompress = decompress
+        self._threaded = threaded
+        self._raw = None  # type: Optional[IO[bytes]]
+        self._file = None  # type: Optional[IO[bytes]]
+        self._compression = None  # type: Optional[str]
+        self._mmap = None  # type: Optional[mmap.mmap]
+        # The streams that are closed with the file, innermost first
+        self._streams = []  # type: List[IO[Any]]
+        self._closed = False
+
+    @property
+    def name(self) -> str:
+        """The path to the file, as given on the command line"""
+        return self._path
+
+    @property
+    def is_stdin(self) -> bool:
+        return self._path == "-"
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._path!r})"
+
+    def __enter__(self) -> "LazyFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def compression(self) -> Optional[str]:
+        """The compression of the file (``"gzip"``, ``"bz2"``, or ``"xz"``)
+
+        The compression is detected when the file is opened, and is None for
+        uncompressed files.
+        """
+        self.open()
+        return self._compression
+
+    def open(self) -> IO[bytes]:
+        """Open the file for reading in binary mode, if not yet opened
+
+        Compressed files are decompressed by the returned stream.
+        """
+        if self._closed:
+            raise ValueError(f"I/O operation on closed file: {self._path}")
+        if self._file is not None:
+            return self._file
+        if self.is_stdin:
+            stdin = current_streams().stdin
+            raw = getattr(stdin, "buffer", stdin)
+        else:
+            # Unbuffered, as the chunks are read into our own buffer
+            raw = open(self._path, "rb", buffering=0)
+            self._streams.append(raw)
+        self._raw = raw
+        _track(self)
+
+        fp = raw  # type: Any
+        if self._decompress:
+            self._compression = self._detect(raw)
+        if self._compression is not None:
+            if not self.is_stdin:
+                # The decompressors read the file in small blocks
+                fp = io.BufferedReader(raw, buffer_size=self._chunk_size)
+                self._streams.append(fp)
+            fp = decompressing_reader(fp, self._compression)
+            self._streams.append(fp)
+            if self._threaded:
+                fp = ThreadedReader(fp, self._chunk_size)
+                self._streams.append(fp)
+        self._file = fp
+        return fp
+
+    def _detect(self, fp: IO[Any]) -> Optional[str]:
+        peek = getattr(fp, "peek", None)
+        if peek is not None:
+            header = peek(MAGIC_SIZE)[:MAGIC_SIZE]
+        elif not self.is_stdin:
+            header = fp.read(MAGIC_SIZE)
+            fp.seek(0)
+        else:
+            return None
+        if isinstance(header, str):
+            return None
+        return detect_compression(header)
+
+    def _fileno(self) -> Optional[int]:
+        self.open()
+        assert self._raw is not None
+        try:
+            return self._raw.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    @property
+    def mappable(self) -> bool:
+        """Whether the file can be mapped into memory"""
+        fd = self._fileno()
+        if fd is None or self._compression is not None:
+            return False
+        return stat.S_ISREG(os.fstat(fd).st_mode)
+
+    def mmap(self) -> Union[mmap.mmap, bytes]:
+        """Map the file into memory for reading
+
+        The map is created once and closed with the file. Empty files can't
+        be mapped, for these an empty bytes object is returned.
+
+        Raises
+        ------
+        io.UnsupportedOperation
+            If the file isn't a regular file, such as a pipe, or if it is
+            compressed. Use :func:`chunks` or :func:`lines` to read these.
+
+        """
+        if self._mmap is not None:
+            return self._mmap
+        if not self.mappable:
+            raise io.UnsupportedOperation(
+                f"{self._path} can't be mapped into memory"
+            )
+        fd = self._fileno()
+        assert fd is not None
+        if os.fstat(fd).st_size == 0:
+            return b""
+        self._mmap = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _read(self, buffer: bytearray) -> Iterator[int]:
+        # Fills the buffer, and yields the number of bytes read
+        fp = self.open()
+        if not self.is_stdin and fp.seekable():
+            fp.seek(0)
+        readinto = getattr(fp, "readinto", None)
+        with memoryview(buffer) as view:
+            while True:
+                if readinto is not None:
+                    n = readinto(view)
+                else:
+                    # Streams without a binary buffer, such as io.StringIO
+                    data = fp.read(len(buffer))
+                    if isinstance(data, str):
+                        data = data.encode()
+                    n = len(data)
+                    view[:n] = data
+                if not n:
+                    return
+                yield n
+
+    def chunks(self, chunk_size: Optional[int] = None) -> Iterator[memoryview]:
+        """Iterate over the contents of the file in chunks
+
+        The chunks are views on a buffer that is reused for the next chunk,
+        and have at most ``chunk_size`` bytes. Every iteration starts at the
+        beginning of the file, except for the standard input and files that
+        are decompressed in a separate thread.
+        """
+        size = self._chunk_size if chunk_size is None else chunk_size
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        try:
+            for n in self._read(buffer):
+                yield view[:n]
+        finally:
+            view.release()
+
+    def lines(
+        self, encoding: Optional[str] = None, errors: str = "strict"
+    ) -> Iterator[Any]:
+        """Iterate over the lines of the file
+
+        The lines include the line ending, and are bytes unless an encoding
+        is given. The encoding must be compatible with ASCII (such as
+        UTF-8), as the lines are split before they are decoded.
+        """
+        buffer = bytearray(self._chunk_size)
+        view = memoryview(buffer)
+        rest = b""
+        try:
+            for n in self._read(buffer):
+                start = 0
+                end = buffer.find(b"\n", 0, n)
+                while end >= 0:
+                    line = view[start : end + 1].tobytes()
+                    if rest:
+                        line, rest = rest + line, b""
+                    yield line if encoding is None else line.decode(
+                        encoding, errors
+                    )
+                    start = end + 1
+                    end = buffer.find(b"\n", start, n)
+                rest += view[start:n]
+        finally:
+            view.release()
+        if rest:
+            yield rest if encoding is None else rest.decode(encoding, errors)
+
+    def close(self) -> None:
+        """Close the file, unless it is the standard input"""
+        if self._closed:
+            return
+        self._closed = True
+        _LIVE.discard(self)
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views on the map are still in use, it's closed when
+                # these are garbage collected
+                pass
+            self._mmap = None
+        # The standard input isn't in the streams, so it isn't closed
+        for stream in reversed(self._streams):
+            stream.close()
+        self._streams.clear()
+        self._file = self._raw = None
+
+
+class LazyOutputFile:
+    """A file that is created when it is first written to
+
+    Parameters
+    ----------
+    path : str
+        The path to the file, or ``-`` for the standard output.
+
+    buffer_size : int
+        The size of the write buffer in bytes.
+
+    compresslevel : Optional[int]
+        The compression level, for files that are compressed.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        buffer_size: int = CHUNK_SIZE,
+        compresslevel: Optional[int] = None,
+    ):
+        self._path = path
+        self._buffer_size = buffer_size
+        self._compresslevel = compresslevel
+        self._compression = None if path == "-" else compression_for_name(path)
+        self._file = None  # type: Optional[IO[bytes]]
+        self._text = None  # type: Optional[IO[str]]
+        self._streams = []  # type: List[IO[Any]]
+        self._closed = False
+
+    @property
+    def name(self) -> str:
+        """The path to the file, as given on the command line"""
+        return self._path
+
+    @property
+    def is_stdout(self) -> bool:
+        return self._path == "-"
+
+    @property
+    def compression(self) -> Optional[str]:
+        """The compression of the file, based on its extension"""
+        return self._compression
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._path!r})"
+
+    def __enter__(self) -> "LazyOutputFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def open(self) -> IO[bytes]:
+        """Open the file for writing in binary mode, if not yet opened
+
+        Files with the extension of a compression format are compressed.
+        """
+        if self._closed:
+            raise ValueError(f"I/O operation on closed file: {self._path}")
+        if self._text is not None:
+            raise ValueError(f"{self._path} is already opened in text mode")
+        if self._file is not None:
+            return self._file
+        if self.is_stdout:
+            stdout = current_streams().stdout
+            if not hasattr(stdout, "buffer"):
+                raise io.UnsupportedOperation(
+                    "The standard output doesn't support binary output"
+                )
+            # Earlier text output must come first
+            stdout.flush()
+            self._file = stdout.buffer
+        else:
+            fp = open(self._path, "wb", buffering=0)  # type: Any
+            self._streams.append(fp)
+            if self._compression is not None:
+                fp = compressing_writer(
+                    fp, self._compression, self._compresslevel
+                )
+                self._streams.append(fp)
+            # The compressors have a high cost per call, so writes are
+            # collected in a large buffer
+            fp = io.BufferedWriter(fp, buffer_size=self._buffer_size)
+            self._streams.append(fp)
+            self._file = fp
+        _track(self)
+        assert self._file is not None
+        return self._file
+
+    def open_text(
+        self, encoding: str = "utf-8", errors: str = "strict"
+    ) -> IO[str]:
+        """Open the file for writing in text mode, if not yet opened
+
+        For the standard output, the text stream of the invocation is
+        returned as is.
+        """
+        if self._text is not None:
+            return self._text
+        if self._file is not None:
+            raise ValueError(f"{self._path} is already opened in binary mode")
+        if self.is_stdout:
+            if self._closed:
+                raise ValueError("I/O operation on closed file: -")
+            self._text = current_streams().stdout
+            _track(self)
+            return self._text
+        binary = self.open()
+        self._file = None
+        self._text = io.TextIOWrapper(binary, encoding=encoding, errors=errors)
+        self._streams.append(self._text)
+        return self._text
+
+    def close(self) -> None:
+        """Close the file, or flush it for the standard output"""
+        if self._closed:
+            return
+        self._closed = True
+        _LIVE.discard(self)
+        if self.is_stdout:
+            for stream in (self._text, self._file):
+                if stream is not None:
+                    stream.flush()
+        # Closing a stream closes the streams it wraps, except for the files
+        # of the compressors
+        for stream in reversed(self._streams):
+            stream.close()
+        self._streams.clear()
+        self._file = self._text = None
+
+
+class InputFile:
+    """Argument type for files that are read lazily
+
+    The argument is converted to a :class:`LazyFile`. The file must exist
+    when the command line is parsed, but it is only opened when it is read.
+    Compressed files are decompressed, unless ``decompress`` is False.
+
+    Parameters
+    ----------
+    chunk_size : int
+        The size of the chunks the file is read in, in bytes.
+
+    decompress : bool
+        Whether to decompress compressed files.
+
+    threaded : bool
+        Whether to decompress in a separate thread, so that the command can
+        process a chunk while the next chunk is decompressed.
+
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        decompress: bool = True,
+        threaded: bool = False,
+    ):
+        self._chunk_size = chunk_size
+        self._decompress = decompress
+        self._threaded = threaded
+
+    def __call__(self, text: str) -> LazyFile:
+        if text != "-":
+            if not os.path.exists(text):
+                raise argparse.ArgumentTypeError(f"no such file: {text!r}")
+            if os.path.isdir(text):
+                raise argparse.ArgumentTypeError(f"is a directory: {text!r}")
+        return LazyFile(
+            text,
+            chunk_size=self._chunk_size,
+            decompress=self._decompress,
+            threaded=self._threaded,
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(chunk_size={self._chunk_size})"
+
+
+class OutputFile:
+    """Argument type for files that are written lazily
+
+    The argument is converted to a :class:`LazyOutputFile`. The directory of
+    the file must exist when the command line is parsed, but the file is
+    only created when it is written to. Files whose name ends in ``.gz``,
+    ``.bz2``, or ``.xz`` are compressed.
+
+    Parameters
+    ----------
+    buffer_size : int
+        The size of the write buffer in bytes.
+
+    compresslevel : Optional[int]
+        The compression level. By default the level of the command line
+        tools is used.
+
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = CHUNK_SIZE,
+        compresslevel: Optional[int] = None,
+    ):
+        self._buffer_size = buffer_size
+        self._compresslevel = compresslevel
+
+    def __call__(self, text: str) -> LazyOutputFile:
+        if text != "-":
+            directory = os.path.dirname(text) or "."
+            if not os.path.isdir(directory):
+                raise argparse.ArgumentTypeError(
+                    f"no such directory: {directory!r}"
+                )
+            if os.path.isdir(text):
+                raise argparse.ArgumentTypeError(f"is a directory: {text!r}")
+        return LazyOutputFile(
+            text,
+            buffer_size=self._buffer_size,
+            compresslevel=self._compresslevel,
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(buffer_size={self._buffer_size})"
+
+
+@contextlib.contextmanager
+def closing_files() -> Iterator[List[Union[LazyFile, LazyOutputFile]]]:
+    """Close the files that are opened in this context when it exits"""
+    opened = []  # type: List[Union[LazyFile, LazyOutputFile]]
+    token = _OPEN_FILES.set(opened)
+    try:
+        yield opened
+    finally:
+        _OPEN_FILES.reset(token)
+        for lazy_file in opened:
+            lazy_file.close()
+
+
+def close_open_files() -> None:
+    """Close the files that are still open, in any thread
+
+    This is used when the process exits without the teardown of the
+    interpreter (see :func:`wilderness.performance.fast_exit`), so that
+    buffered output is written. The first error is raised after all files
+    are closed.
+    """
+    error = None  # type: Optional[Exception]
+    for lazy_file in list(_LIVE):
+        try:
+            lazy_file.close()
+        except (OSError, ValueError) as err:
+            error = error or err
+    if error is not None:
+        raise error
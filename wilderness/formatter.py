@@ -95,7 +95,7 @@ class HelpFormatter(argparse.HelpFormatter):
                     if part[0] == "[" and part[-1] == "]":
                         part = part[1:-1]
                 else:
-                    if action.nargs == "?":
+                    if action.nargs in ("?", "*"):
                         pass
                     else:
                         part = "<%s>" % part
@@ -17,55 +17,87 @@ import argparse
 
 from typing import TYPE_CHECKING
 from typing import Dict
-from typing import List
 from typing import Optional
+from typing import Tuple
 
 if TYPE_CHECKING:
     import wilderness.application
     import wilderness.command
+    import wilderness.subcommands
 
 
 class Group:
+    __slots__ = (
+        "_title",
+        "_is_root",
+        "_command_map",
+        "_host",
+        "_commands_view",
+        "_actions_view",
+    )
+
     def __init__(self, title: Optional[str] = None, is_root: bool = False):
         self._title = title
         self._is_root = is_root
 
         self._command_map: Dict[str, wilderness.command.Command] = {}
-        self._app: Optional[wilderness.application.Application] = None
+        self._host: Optional[wilderness.subcommands.SubcommandsMixin] = None
+
+        # Cached views, cleared when a command is added
+        self._commands_view: Optional[Tuple[wilderness.command.Command, ...]]
+        self._commands_view = None
+        self._actions_view: Optional[Tuple[argparse.Action, ...]] = None
 
     @property
     def application(self) -> Optional["wilderness.application.Application"]:
-        return self._app
+        if self._host is None:
+            return None
+        return self._host._get_application()
+
+    @property
+    def host(self) -> Optional["wilderness.subcommands.SubcommandsMixin"]:
+        """The application or command that the group belongs to"""
+        return self._host
 
     @property
     def title(self) -> Optional[str]:
         return self._title
 
     @property
-    def commands(self) -> List["wilderness.command.Command"]:
-        return list(self._command_map.values())
+    def commands(self) -> Tuple["wilderness.command.Command", ...]:
+        if self._commands_view is None:
+            self._commands_view = tuple(self._command_map.values())
+        return self._commands_view
 
     @property
     def is_root(self) -> bool:
         """Return whether the groups is its Application's root group"""
         return self._is_root
 
-    def commands_as_actions(self) -> List[argparse.Action]:
-        actions = []
-        for command in self.commands:
-            action = argparse.Action(
-                option_strings=[], dest=command.name, help=command.title
+    def commands_as_actions(self) -> Tuple[argparse.Action, ...]:
+        if self._actions_view is None:
+            self._actions_view = tuple(
+                argparse.Action(
+                    option_strings=[], dest=command.name, help=command.title
+                )
+                for command in self.commands
             )
-            actions.append(action)
-        return actions
+        return self._actions_view
 
     def set_app(self, app: "wilderness.application.Application") -> None:
-        self._app = app
+        self.set_host(app)
+
+    def set_host(
+        self, host: "wilderness.subcommands.SubcommandsMixin"
+    ) -> None:
+        self._host = host
 
     def add(self, command: "wilderness.command.Command") -> None:
         self._command_map[command.name] = command
-        assert self.application is not None
-        self.application._add_command(command)
+        self._commands_view = None
+        self._actions_view = None
+        assert self._host is not None
+        self._host._add_command(command)
 
     def __len__(self) -> int:
-        return len(self.commands)
+        return len(self._command_map)
@@ -16,11 +16,11 @@ This file is part of Wilderness.
 
 import argparse
 import subprocess
-import sys
 
 from typing import TYPE_CHECKING
 
 from .command import Command
+from .subcommands import SubcommandsMixin
 
 if TYPE_CHECKING:
     import wilderness.application
@@ -38,23 +38,34 @@ class HelpCommand(Command):
         assert self.args is not None
         assert self.application
 
-        cmd = self.args.command
-        if cmd is None:
+        path = self.args.command
+        if not path:
             self.application.print_help()
             return 1
 
         if not have_man_command():
-            print("Error: man command not available.", file=sys.stderr)
+            print("Error: man command not available.", file=self.stderr)
             return 2
 
+        # Resolve aliases and abbreviations of (nested) commands
+        names = list(path)
+        host = self.application  # type: SubcommandsMixin
+        for i, name in enumerate(path):
+            try:
+                host = host.get_command(name)
+            except KeyError:
+                break
+            names[i] = host.name
+
         app_name = self.application.name
-        cp = subprocess.run(["man", f"{app_name}-{cmd}"])
+        page = "-".join([app_name, *names])
+        cp = subprocess.run(["man", page])
         return cp.returncode
 
     def register(self):
         self.add_argument(
             "command",
-            nargs="?",
+            nargs="*",
             # help=argparse.SUPPRESS,
             description=argparse.SUPPRESS,
         )
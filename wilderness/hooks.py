@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""Hooks
+
+Hooks run code before and after the command that is selected on the command
+line (or the handle method of single-command applications), for instance to
+profile the command. Hooks are added to an application with
+:func:`Application.add_hook <wilderness.application.Application.add_hook>`.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+from typing import TYPE_CHECKING
+from typing import Optional
+
+if TYPE_CHECKING:
+    import wilderness.application
+    import wilderness.command
+
+
+class Hook:
+    """Base class for hooks
+
+    The :func:`start` methods of the hooks are called in the order in which
+    the hooks were added, and the :func:`stop` methods in reverse order. The
+    stop method is also called when the command raises an exception.
+
+    """
+
+    def register(self, app: "wilderness.application.Application") -> None:
+        """Register command line arguments to the application
+
+        This is called when the hook is added to the application.
+        """
+        pass
+
+    def start(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+    ) -> None:
+        """Called before the command runs
+
+        Parameters
+        ----------
+        app : :class:`wilderness.application.Application`
+            The application. The parsed command line arguments are available
+            as ``app.args`` and the arguments given to the application as
+            ``app.argv``.
+
+        command : Optional[:class:`wilderness.command.Command`]
+            The command that will run, or None for single-command
+            applications.
+
+        """
+        pass
+
+    def stop(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+        return_code: Optional[int],
+    ) -> None:
+        """Called after the command has run
+
+        Parameters
+        ----------
+        app : :class:`wilderness.application.Application`
+            The application.
+
+        command : Optional[:class:`wilderness.command.Command`]
+            The command that ran, or None for single-command applications.
+
+        return_code : Optional[int]
+            The return code of the command, or None if the command raised an
+            exception.
+
+        """
+        pass
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""Command name index
+
+This module contains the CommandIndex class that is used to resolve command
+names given on the command line. It supports aliases and (optionally)
+unique-prefix matching through a trie, and typo suggestions through a BK-tree
+over the command names, so that lookups remain fast for applications with a
+large number of commands.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Compute the Levenshtein distance between two strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ca != cb),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+class _TrieNode:
+    __slots__ = ("children", "target")
+
+    def __init__(self):
+        self.children = {}  # type: Dict[str, _TrieNode]
+        self.target = None  # type: Optional[str]
+
+
+class _BKNode:
+    __slots__ = ("word", "children")
+
+    def __init__(self, word: str):
+        self.word = word
+        self.children = {}  # type: Dict[int, _BKNode]
+
+
+class BKTree:
+    """Burkhard-Keller tree for approximate string matching"""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._root = None  # type: Optional[_BKNode]
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        if self._root is None:
+            self._root = _BKNode(word)
+            return
+        node = self._root
+        while True:
+            dist = levenshtein(word, node.word)
+            if dist == 0:
+                return
+            child = node.children.get(dist)
+            if child is None:
+                node.children[dist] = _BKNode(word)
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Find all words within the given distance, closest first"""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            dist = levenshtein(word, node.word)
+            if dist <= max_distance:
+                found.append((dist, node.word))
+            lo, hi = dist - max_distance, dist + max_distance
+            for d, child in node.children.items():
+                if lo <= d <= hi:
+                    stack.append(child)
+        return sorted(found)
+
+
+class CommandIndex:
+    """Index of command names and aliases
+
+    Exact lookups only need a dictionary, so the trie and the BK-tree are
+    built on the first prefix lookup or suggestion. Adding a command thus
+    remains cheap, which matters for applications with many commands.
+
+    Parameters
+    ----------
+    allow_prefix : bool
+        Whether unique prefixes of command names (or aliases) resolve to the
+        command.
+
+    """
+
+    __slots__ = ("_allow_prefix", "_keys", "_trie", "_bktree")
+
+    def __init__(self, allow_prefix: bool = False):
+        self._allow_prefix = allow_prefix
+        self._keys = {}  # type: Dict[str, str]
+        self._trie = None  # type: Optional[_TrieNode]
+        self._bktree = None  # type: Optional[BKTree]
+
+    @property
+    def allow_prefix(self) -> bool:
+        return self._allow_prefix
+
+    def add(self, name: str, aliases: Iterable[str] = ()) -> None:
+        """Add a command name and its aliases to the index"""
+        for key in (name, *aliases):
+            self._keys[key] = name
+            if self._trie is not None:
+                self._trie_insert(self._trie, key, name)
+            if self._bktree is not None:
+                self._bktree.add(key)
+
+    @staticmethod
+    def _trie_insert(root: _TrieNode, key: str, name: str) -> None:
+        node = root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+        node.target = name
+
+    def _find_node(self, prefix: str) -> Optional[_TrieNode]:
+        if self._trie is None:
+            self._trie = _TrieNode()
+            for key, name in self._keys.items():
+                self._trie_insert(self._trie, key, name)
+        node = self._trie
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                return None
+            node = child
+        return node
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _walk(self, node: _TrieNode) -> Iterator[str]:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.target is not None:
+                yield node.target
+            stack.extend(node.children.values())
+
+    def matches(self, prefix: str) -> List[str]:
+        """List the command names that have a key starting with the prefix"""
+        node = self._find_node(prefix)
+        if node is None:
+            return []
+        return sorted(set(self._walk(node)))
+
+    def resolve(self, key: str) -> Optional[str]:
+        """Resolve a name, alias, or unique prefix to the command name
+
+        Returns
+        -------
+        name : Optional[str]
+            The name of the command, or None if the key doesn't match a
+            command (or is an ambiguous prefix).
+
+        """
+        name = self._keys.get(key)
+        if name is not None or not self._allow_prefix or not key:
+            return name
+
+        node = self._find_node(key)
+        if node is None:
+            return None
+
+        found = set()  # type: Set[str]
+        for target in self._walk(node):
+            found.add(target)
+            if len(found) > 1:
+                return None
+        return found.pop() if found else None
+
+    def suggest(
+        self, key: str, max_distance: Optional[int] = None, limit: int = 3
+    ) -> List[str]:
+        """Suggest names and aliases that are close to a mistyped name
+
+        Parameters
+        ----------
+        key : str
+            The mistyped command name.
+
+        max_distance : Optional[int]
+            The maximum edit distance of suggestions. By default this depends
+            on the length of the key.
+
+        limit : int
+            The maximum number of suggestions.
+
+        """
+        if max_distance is None:
+            max_distance = 1 if len(key) < 4 else 2
+        if self._bktree is None:
+            self._bktree = BKTree(self._keys)
+        found = self._bktree.search(key, max_distance)
+        return [word for _, word in found[:limit]]
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""Deferred type conversion
+
+This module contains the LazyNamespace class and the supporting code that
+allows argparse type conversion to be deferred until an argument is first
+accessed. This is useful when type converters are expensive (such as reading
+files or parsing JSON) and a command does not need all of its arguments.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import contextlib
+import contextvars
+
+from typing import Any
+from typing import Iterator
+
+_DEFER_CONVERSION = contextvars.ContextVar(
+    "wilderness_defer_conversion", default=False
+)
+
+
+class DeferredValue:
+    """Placeholder for an argument value that has not been converted yet
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        The parser that encountered the value. This parser is used to report
+        conversion errors.
+
+    action : argparse.Action
+        The action the value belongs to.
+
+    arg_string : str
+        The raw string from the command line (or the string default).
+
+    """
+
+    __slots__ = ("_parser", "_action", "_arg_string")
+
+    def __init__(
+        self,
+        parser: argparse.ArgumentParser,
+        action: argparse.Action,
+        arg_string: str,
+    ):
+        self._parser = parser
+        self._action = action
+        self._arg_string = arg_string
+
+    @property
+    def arg_string(self) -> str:
+        return self._arg_string
+
+    def resolve(self) -> Any:
+        """Run the type converter of the action on the stored string
+
+        Conversion errors are reported through the parser in the same way as
+        argparse does during parsing, i.e., by printing the usage and the
+        error message and exiting. If the parser is configured to not exit on
+        errors, the :class:`argparse.ArgumentError` is raised instead.
+
+        """
+        try:
+            # Call the base implementation to avoid deferring again
+            return argparse.ArgumentParser._get_value(
+                self._parser, self._action, self._arg_string
+            )
+        except argparse.ArgumentError as err:
+            self._parser.error(str(err))
+            raise
+
+    def __repr__(self) -> str:
+        return f"<deferred {self._action.dest}={self._arg_string!r}>"
+
+
+def _resolve(value: Any) -> Any:
+    if isinstance(value, DeferredValue):
+        return value.resolve()
+    if isinstance(value, list) and any(
+        isinstance(v, (DeferredValue, list)) for v in value
+    ):
+        return [_resolve(v) for v in value]
+    return value
+
+
+class LazyNamespace(argparse.Namespace):
+    """Namespace that converts argument values on first access
+
+    When an application is run with ``lazy=True``, the type converters of the
+    arguments are not called during parsing. Instead, the raw strings are
+    stored in this namespace and converted when the attribute is first
+    accessed. The converted value then replaces the raw value, so each
+    converter runs at most once.
+
+    Arguments with ``choices`` are always converted during parsing, since
+    argparse needs the converted value to check that it is a valid choice.
+
+    """
+
+    def __getattribute__(self, name: str) -> Any:
+        value = super().__getattribute__(name)
+        if name.startswith("__"):
+            return value
+        resolved = _resolve(value)
+        if resolved is not value:
+            super().__setattr__(name, resolved)
+        return resolved
+
+
+def should_defer(action: argparse.Action) -> bool:
+    """Whether the conversion of a value for this action can be deferred"""
+    if not _DEFER_CONVERSION.get():
+        return False
+    return action.type is not None and action.choices is None
+
+
+@contextlib.contextmanager
+def deferred_conversion(enabled: bool = True) -> Iterator[None]:
+    """Context manager that enables deferred type conversion while parsing"""
+    token = _DEFER_CONVERSION.set(enabled)
+    try:
+        yield
+    finally:
+        _DEFER_CONVERSION.reset(token)
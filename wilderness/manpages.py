@@ -143,13 +143,13 @@ class ManPage:
         self._page.extend(section)
 
     def groffify(self, text: str) -> str:
-        """Format a text line for use in manpages
+        r"""Format a text line for use in manpages
 
         This function supports several basic formatting constructs. First,
         newlines in the text are preserved. Next, lists can be created by
         starting lines with :literal:`* \ ` , as long as each list entry starts
-        on its own line (that is, separated by :code:`\\n`). Indented text can
-        be created by prefixing a line with one or more :code:`\\t` characters.
+        on its own line (that is, separated by :code:`\n`). Indented text can
+        be created by prefixing a line with one or more :code:`\t` characters.
         Numbered lists are also recognized, as long as each item starts with
         :literal:`1. \ ` (that is, a digit followed by a period, followed by a
         space).
@@ -170,7 +170,7 @@ class ManPage:
 
         lines = text.split("\n")
         for line in lines:
-            match = re.match("^\ ?\d+\.\ ", line)
+            match = re.match(r"^\ ?\d+\.\ ", line)
             if line.startswith("* "):
                 output.append(".RS 4")
                 output.append(".ie n \\{\\")
@@ -233,7 +233,7 @@ def build_manpages(
     man = app.create_manpage()
     filename = man.export(output_directory)
     print(f"Wrote manpage to {filename}")
-    for cmd in app.commands:
+    for cmd in app.walk_commands():
         man = cmd.create_manpage()
         filename = man.export(output_directory)
         print(f"Wrote manpage to {filename}")
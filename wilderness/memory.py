@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""Memory instrumentation
+
+This module contains the hook that measures the memory use of the command
+that is selected on the command line. Applications created with
+``trace_memory=True`` get a ``--trace-memory [FILE]`` option that traces the
+allocations of the command with :mod:`tracemalloc` and writes a JSON report
+to FILE with:
+
+* the high-water mark of the resident set size of the process (from
+  ``getrusage``, where available),
+* the peak and final size of the traced memory,
+* the top allocation sites at the end of the command (the number of sites is
+  set with ``--trace-memory-top N``), and
+* the checkpoints that the command recorded.
+
+Commands record a checkpoint by calling :func:`checkpoint` (or
+:meth:`Command.checkpoint <wilderness.command.Command.checkpoint>`) with a
+name. For each checkpoint the report contains the traced memory at that
+point and the allocation sites that changed the most since the previous
+checkpoint (or since the start of the command). When memory is not being
+traced, checkpoints do nothing.
+
+As for the profilers, the ``WILDERNESS_TRACE_MEMORY`` and
+``WILDERNESS_TRACE_MEMORY_TOP`` environment variables enable the hook without
+the constructor flag.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import contextvars
+import os
+import sys
+import time
+import tracemalloc
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from wilderness.config import env_int
+from wilderness.hooks import Hook
+from wilderness.profiling import write_metadata
+
+if TYPE_CHECKING:
+    import wilderness.application
+    import wilderness.command
+
+_ACTIVE = contextvars.ContextVar(
+    "wilderness_memory_hook", default=None
+)  # type: contextvars.ContextVar[Optional[MemoryHook]]
+
+# Allocations by the instrumentation itself are excluded from the reports
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def peak_rss_kb() -> Optional[float]:
+    """The high-water mark of the resident set size in kilobytes
+
+    Returns None on platforms without the ``resource`` module.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return maxrss / 1024
+    return float(maxrss)
+
+
+def checkpoint(name: str) -> None:
+    """Record a named memory checkpoint
+
+    This does nothing if the memory of the command is not being traced.
+    """
+    hook = _ACTIVE.get()
+    if hook is not None:
+        hook.checkpoint(name)
+
+
+def _statistics(stats: List[Any], limit: int) -> List[Dict[str, Any]]:
+    sites = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        site = {
+            "file": frame.filename,
+            "line": frame.lineno,
+            "size_kb": stat.size / 1024,
+            "count": stat.count,
+        }
+        if hasattr(stat, "size_diff"):
+            site["size_diff_kb"] = stat.size_diff / 1024
+            site["count_diff"] = stat.count_diff
+        sites.append(site)
+    return sites
+
+
+class MemoryHook(Hook):
+    """Hook that measures the memory use of the command
+
+    Parameters
+    ----------
+    add_options : bool
+        Whether to add the ``--trace-memory`` and ``--trace-memory-top``
+        options to the application. If False, tracing is only controlled by
+        the environment variables.
+
+    top : int
+        The default number of allocation sites in the report.
+
+    """
+
+    def __init__(self, add_options: bool = True, top: int = 10):
+        self._add_options = add_options
+        self._top = top
+        self._limit = top
+        self._active = False
+        self._started_tracing = False
+        self._started = 0.0
+        self._snapshot = None  # type: Optional[tracemalloc.Snapshot]
+        self._checkpoints = []  # type: List[Dict[str, Any]]
+        self._token = None  # type: Optional[contextvars.Token]
+
+    @staticmethod
+    def default_filename(app: "wilderness.application.Application") -> str:
+        return f"{app.name}.memory.json"
+
+    def register(self, app: "wilderness.application.Application") -> None:
+        if not self._add_options:
+            return
+        app.add_argument(
+            "--trace-memory",
+            nargs="?",
+            const=self.default_filename(app),
+            metavar="FILE",
+            help="trace the memory use of the command and report to FILE",
+            description=(
+                "Trace the memory allocations of the command and write a "
+                "report in JSON format to FILE (default: "
+                f"{self.default_filename(app)}). The report contains the "
+                "peak resident set size, the peak traced memory, the top "
+                "allocation sites, and the checkpoints of the command."
+            ),
+        )
+        app.add_argument(
+            "--trace-memory-top",
+            type=int,
+            metavar="N",
+            help="number of allocation sites to report",
+            description=(
+                "The number of allocation sites in the memory report, both "
+                f"at the end and at checkpoints (default: {self._top}). "
+                "Implies --trace-memory."
+            ),
+        )
+
+    def settings(
+        self, app: "wilderness.application.Application"
+    ) -> Tuple[Optional[str], int]:
+        """The output file and the number of allocation sites to report
+
+        Command line options take precedence over environment variables. The
+        output file is None if tracing is disabled.
+
+        """
+        filename = getattr(app.args, "trace_memory", None)
+        top = getattr(app.args, "trace_memory_top", None)
+
+        env = os.environ.get("WILDERNESS_TRACE_MEMORY")
+        if filename is None and env:
+            filename = self.default_filename(app) if env == "1" else env
+        if top is None:
+            top = env_int("WILDERNESS_TRACE_MEMORY_TOP")
+            if top is None:
+                top = self._top
+        elif filename is None:
+            filename = self.default_filename(app)
+        return filename, top
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    def checkpoint(self, name: str) -> None:
+        """Record a named checkpoint, see :func:`checkpoint`"""
+        if not self._active:
+            return
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        diff = []  # type: List[Any]
+        if self._snapshot is not None:
+            diff = snapshot.compare_to(self._snapshot, "lineno")
+        self._checkpoints.append(
+            {
+                "name": name,
+                "time": time.time() - self._started,
+                "traced_current_kb": current / 1024,
+                "traced_peak_kb": peak / 1024,
+                "peak_rss_kb": peak_rss_kb(),
+                "diff": _statistics(diff, self._limit),
+            }
+        )
+        self._snapshot = snapshot
+
+    def start(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+    ) -> None:
+        filename, top = self.settings(app)
+        if filename is None:
+            return
+        self._limit = top
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._active = True
+        self._started = time.time()
+        self._checkpoints = []
+        self._snapshot = self._take_snapshot()
+        self._token = _ACTIVE.set(self)
+
+    def stop(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+        return_code: Optional[int],
+    ) -> None:
+        if not self._active:
+            return
+        assert self._token is not None
+        _ACTIVE.reset(self._token)
+        self._token = None
+
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        self._active = False
+        self._snapshot = None
+        if self._started_tracing:
+            tracemalloc.stop()
+
+        filename, _ = self.settings(app)
+        assert filename is not None
+        write_metadata(
+            filename,
+            app,
+            command,
+            return_code,
+            self._started,
+            peak_rss_kb=peak_rss_kb(),
+            traced_current_kb=current / 1024,
+            traced_peak_kb=peak / 1024,
+            top=_statistics(snapshot.statistics("lineno"), self._limit),
+            checkpoints=self._checkpoints,
+        )
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+
+"""Usage metrics
+
+This module contains the hook that records a metrics record for every
+invocation of an application. A record contains the command, the names of
+the options that were used (but not their values), the duration and the CPU
+time of the command, the peak resident set size of the process, and the
+return code.
+
+Records are written in one of two formats, depending on the extension of the
+metrics file:
+
+* JSON lines (the default): one JSON object per invocation is appended to the
+  file. Each record is written with a single ``write`` call to a file opened
+  in append mode, so concurrent invocations don't interleave their records.
+  When the file grows beyond a maximum size, it is rotated (to ``FILE.1``,
+  ``FILE.2``, etc.), keeping a bounded number of old files.
+
+* Prometheus textfile (for files ending in ``.prom``): the file contains
+  counters that are aggregated over invocations, for use with the textfile
+  collector of the node exporter. The collector reads whole files, so the
+  file is updated by writing a new file and moving it in place.
+
+Records are buffered in memory and written when the process exits, so that
+writing them doesn't delay the output of the command. Metrics are enabled
+with the ``metrics_file`` argument of the application, or with the
+``WILDERNESS_METRICS`` environment variable.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import re
+import socket
+import sys
+import tempfile
+import time
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from wilderness.hooks import Hook
+from wilderness.memory import peak_rss_kb
+
+if TYPE_CHECKING:
+    import wilderness.application
+    import wilderness.command
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+Record = Dict[str, Any]
+
+
+@contextlib.contextmanager
+def _locked(filename: str) -> Iterator[None]:
+    # Serialize rotation and updates between processes, where supported
+    if fcntl is None:
+        yield
+        return
+    with open(filename + ".lock", "a") as fp:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+
+def used_options(
+    argv: Iterable[str], parsers: Iterable[argparse.ArgumentParser]
+) -> List[str]:
+    """Find the names of the options that were used on the command line
+
+    Only option strings that are known to the parsers are returned, so values
+    of arguments are never included. Abbreviated long options are expanded
+    to the full option, and combined short options (such as ``-vH``) to the
+    separate options.
+
+    """
+    actions = {}  # type: Dict[str, argparse.Action]
+    for parser in parsers:
+        for action in parser._actions:
+            for option in action.option_strings:
+                actions[option] = action
+
+    def add(name: str) -> None:
+        if name not in used:
+            used.append(name)
+
+    used = []  # type: List[str]
+    for arg in argv:
+        if arg == "--":
+            break
+        if not arg.startswith("-") or arg == "-":
+            continue
+        name = arg.split("=", 1)[0]
+        if name in actions:
+            add(name)
+        elif name.startswith("--"):
+            matches = [o for o in actions if o.startswith(name)]
+            if len(matches) == 1:
+                add(matches[0])
+        else:
+            # Short options that don't take a value can be combined, and the
+            # value of the last one can be attached (as in -vo out.txt)
+            for char in arg[1:]:
+                short = actions.get("-" + char)
+                if short is None:
+                    break
+                add("-" + char)
+                if short.nargs != 0:
+                    break
+    return used
+
+
+class JSONLinesWriter:
+    """Append records to a JSON lines file with size-bounded rotation
+
+    Parameters
+    ----------
+    filename : str
+        The metrics file.
+
+    max_bytes : int
+        The size after which the file is rotated.
+
+    backup_count : int
+        The number of rotated files to keep.
+
+    """
+
+    def __init__(
+        self, filename: str, max_bytes: int = 10 << 20, backup_count: int = 3
+    ):
+        self._filename = filename
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+
+    def _should_rotate(self) -> bool:
+        try:
+            return os.stat(self._filename).st_size >= self._max_bytes
+        except FileNotFoundError:
+            return False
+
+    def _rotate(self) -> None:
+        with _locked(self._filename):
+            # Another process may have rotated the file in the meantime
+            if not self._should_rotate():
+                return
+            for i in range(self._backup_count - 1, 0, -1):
+                src = f"{self._filename}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self._filename}.{i + 1}")
+            if self._backup_count > 0:
+                os.replace(self._filename, f"{self._filename}.1")
+            else:
+                os.unlink(self._filename)
+
+    def write(self, records: List[Record]) -> None:
+        if self._should_rotate():
+            self._rotate()
+        data = "".join(
+            json.dumps(r, separators=(",", ":"), sort_keys=True) + "\n"
+            for r in records
+        )
+        fd = os.open(
+            self._filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+        )
+        try:
+            # A single write is atomic for appends to regular files, but a
+            # write can still be partial (such as when the disk is full)
+            view = memoryview(data.encode("utf-8"))
+            while view:
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
+
+
+class PrometheusWriter:
+    """Aggregate records into a Prometheus textfile
+
+    Parameters
+    ----------
+    filename : str
+        The metrics file, typically in the directory of the textfile
+        collector.
+
+    prefix : str
+        The prefix of the metric names, typically the application name.
+
+    """
+
+    _LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$")
+
+    # name -> (type, help)
+    _METRICS = {
+        "invocations_total": ("counter", "Number of invocations"),
+        "duration_seconds_total": ("counter", "Total duration of commands"),
+        "cpu_seconds_total": ("counter", "Total CPU time of invocations"),
+        "option_uses_total": ("counter", "Number of times options were used"),
+        "peak_rss_bytes": ("gauge", "Largest peak resident set size"),
+        "last_invocation_timestamp_seconds": (
+            "gauge",
+            "Time of the last invocation",
+        ),
+    }
+
+    def __init__(self, filename: str, prefix: str):
+        self._filename = filename
+        self._prefix = re.sub(r"[^a-zA-Z0-9_]", "_", prefix)
+
+    @staticmethod
+    def _labels(**labels: Any) -> str:
+        parts = []
+        for key, value in sorted(labels.items()):
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            parts.append(f'{key}="{value}"')
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def _read(self) -> Dict[Tuple[str, str], float]:
+        values = {}  # type: Dict[Tuple[str, str], float]
+        try:
+            with open(self._filename, "r", encoding="utf-8") as fp:
+                lines = fp.read().splitlines()
+        except FileNotFoundError:
+            return values
+        for line in lines:
+            match = self._LINE.match(line)
+            if match is None:
+                continue
+            name, labels, value = match.groups()
+            try:
+                values[(name, labels or "")] = float(value)
+            except ValueError:
+                continue
+        return values
+
+    def _update(
+        self, values: Dict[Tuple[str, str], float], record: Record
+    ) -> None:
+        def add(metric, amount, **labels):
+            key = (f"{self._prefix}_{metric}", self._labels(**labels))
+            values[key] = values.get(key, 0.0) + amount
+
+        def maximum(metric, value, **labels):
+            key = (f"{self._prefix}_{metric}", self._labels(**labels))
+            values[key] = max(values.get(key, 0.0), value)
+
+        command = record["command"] or ""
+        code = record["return_code"]
+        code = "exception" if code is None else code
+        add("invocations_total", 1, command=command, return_code=code)
+        add("duration_seconds_total", record["duration"], command=command)
+        add("cpu_seconds_total", record["cpu_time"], command=command)
+        for option in record["options"]:
+            add("option_uses_total", 1, command=command, option=option)
+        if record["peak_rss_kb"] is not None:
+            rss = record["peak_rss_kb"] * 1024
+            maximum("peak_rss_bytes", rss, command=command)
+        maximum("last_invocation_timestamp_seconds", record["timestamp"])
+
+    def _format(self, values: Dict[Tuple[str, str], float]) -> str:
+        lines = []
+        for metric, (kind, help_) in self._METRICS.items():
+            name = f"{self._prefix}_{metric}"
+            series = sorted(k for k in values if k[0] == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in series:
+                lines.append(f"{name}{key[1]} {values[key]!r}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, records: List[Record]) -> None:
+        dirname = os.path.dirname(os.path.abspath(self._filename))
+        with _locked(self._filename):
+            values = self._read()
+            for record in records:
+                self._update(values, record)
+            fd, tmpname = tempfile.mkstemp(dir=dirname, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                    fp.write(self._format(values))
+                os.chmod(tmpname, 0o644)
+                os.replace(tmpname, self._filename)
+            except OSError:
+                os.unlink(tmpname)
+                raise
+
+
+class MetricsHook(Hook):
+    """Hook that records a metrics record for every invocation
+
+    Parameters
+    ----------
+    filename : str
+        The metrics file. Files ending in ``.prom`` are written in the
+        Prometheus textfile format, other files in JSON lines format.
+
+    max_bytes : int
+        The size after which a JSON lines file is rotated.
+
+    backup_count : int
+        The number of rotated JSON lines files to keep.
+
+    buffer_size : int
+        The number of records that are kept in memory before they are
+        written. Remaining records are written when the process exits.
+
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 10 << 20,
+        backup_count: int = 3,
+        buffer_size: int = 64,
+    ):
+        self._filename = filename
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._buffer_size = buffer_size
+        self._buffer = []  # type: List[Record]
+        self._prefix = "wilderness"
+        self._started = 0
+        self._cpu_started = 0.0
+        self._registered_exit = False
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    def register(self, app: "wilderness.application.Application") -> None:
+        self._prefix = app.name
+
+    def start(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+    ) -> None:
+        self._started = time.perf_counter_ns()
+        self._cpu_started = time.process_time()
+
+    def stop(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+        return_code: Optional[int],
+    ) -> None:
+        # The duration includes parsing the command line and the hooks that
+        # run before this one
+        started = app.timeline.get("start", self._started)
+        duration = (time.perf_counter_ns() - started) / 1e9
+        cpu_time = time.process_time() - self._cpu_started
+
+        parsers = [app.parser]
+        if command is not None:
+            node = command  # type: Any
+            while node is not app and node is not None:
+                if node._parser is not None:
+                    parsers.append(node._parser)
+                node = node.parent
+
+        record = {
+            "timestamp": time.time(),
+            "application": app.name,
+            "version": app.version,
+            "command": None if command is None else " ".join(command.path),
+            "options": used_options(app.argv, parsers),
+            "duration": duration,
+            "cpu_time": cpu_time,
+            "peak_rss_kb": peak_rss_kb(),
+            "return_code": return_code,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+        }
+        self._buffer.append(record)
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+        elif not self._registered_exit:
+            atexit.register(self.flush)
+            self._registered_exit = True
+
+    def _writer(self):
+        if self._filename.endswith(".prom"):
+            return PrometheusWriter(self._filename, self._prefix)
+        return JSONLinesWriter(
+            self._filename,
+            max_bytes=self._max_bytes,
+            backup_count=self._backup_count,
+        )
+
+    def flush(self) -> None:
+        """Write the buffered records
+
+        Errors are reported as a warning, since failing to record metrics
+        should not affect the application.
+
+        """
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        try:
+            self._writer().write(records)
+        except OSError as err:
+            print(
+                f"warning: unable to write metrics to {self._filename}: "
+                f"{err}",
+                file=sys.stderr,
+            )
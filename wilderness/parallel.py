@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""Parallel execution
+
+This module contains the executors that are shared by the commands of an
+application. A command that sets the ``parallel`` class attribute to
+``"thread"`` or ``"process"`` gets a ``-j/--jobs N`` option (defaulting to
+the number of CPUs available to the process), and can submit work to
+``self.executor`` in its handle method::
+
+    class ChecksumCommand(Command):
+        parallel = "process"
+
+        def handle(self):
+            for path, digest in zip(
+                self.args.files, self.executor.map(checksum, self.args.files)
+            ):
+                print(digest, path)
+            return 0
+
+The executors are created when they are first used and are owned by the
+application, so that an application that runs many commands in the same
+process (in batch or server mode, or in tests) reuses the worker threads or
+processes. When a different number of jobs is requested, a new executor is
+created, and the executor with the old number of jobs is shut down once no
+running invocation uses it. When the command is interrupted with Ctrl-C,
+pending work is cancelled and the executors are shut down before the
+interrupt propagates.
+The remaining executors are shut down when the process exits, or with
+:func:`Application.shutdown_executors
+<wilderness.application.Application.shutdown_executors>`.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import atexit
+import concurrent.futures
+import contextlib
+import contextvars
+import os
+import queue
+import sys
+import threading
+
+from typing import TYPE_CHECKING
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+if TYPE_CHECKING:
+    import wilderness.subcommands
+
+KINDS = ("thread", "process")
+
+# The kind of an executor and its number of workers
+_Key = Tuple[str, int]
+
+# The executors held by the current invocation
+_HELD = contextvars.ContextVar(
+    "wilderness_executors", default=None
+)  # type: contextvars.ContextVar[Optional[Set[_Key]]]
+
+
+def default_jobs() -> int:
+    """The number of CPUs that are available to the process"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _jobs(text: str) -> int:
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"invalid number of jobs: {text!r}")
+    return value
+
+
+def add_jobs_argument(host: "wilderness.subcommands.SubcommandsMixin"):
+    """Add the ``-j/--jobs`` option for commands that run in parallel
+
+    The option isn't added if the command already has a ``--jobs`` option.
+    """
+    if host.parallel not in KINDS:
+        raise ValueError(
+            f"Invalid value of the parallel attribute: {host.parallel!r}"
+        )
+    if "--jobs" in host.parser._option_string_actions:
+        return
+    host.add_argument(
+        "-j",
+        "--jobs",
+        type=_jobs,
+        metavar="N",
+        help=f"number of parallel jobs (default: {default_jobs()})",
+        description=(
+            "The number of jobs to run in parallel (default: the number of "
+            "CPUs available to the process)."
+        ),
+    )
+
+
+def _cancel_pending(executor: concurrent.futures.Executor) -> None:
+    # Executors can cancel their pending work on shutdown since Python 3.9,
+    # before that the futures in their queues are cancelled here, as the
+    # executors of 3.9 do
+    work_queue = getattr(executor, "_work_queue", None)
+    if work_queue is not None:
+        while True:
+            try:
+                item = work_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.future.cancel()
+    pending = getattr(executor, "_pending_work_items", None)
+    if pending is not None:
+        for item in list(pending.values()):
+            item.future.cancel()
+
+
+class ExecutorPool:
+    """The executors of an application, one per kind and number of jobs
+
+    The executors that an invocation gets are held until the invocation
+    ends (see :meth:`invocation`), so that an invocation that asks for a
+    different number of jobs doesn't shut down an executor that another
+    invocation still uses.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executors = {}  # type: Dict[_Key, concurrent.futures.Executor]
+        self._users = {}  # type: Dict[_Key, int]
+        self._jobs = {}  # type: Dict[str, int]
+        self._registered_exit = False
+
+    def _retire(self, kind: str) -> List[concurrent.futures.Executor]:
+        # Remove the executors of a kind that have an old size and aren't
+        # held by an invocation. This is called with the lock held, and the
+        # executors are shut down by the caller.
+        retired = []
+        for key in list(self._executors):
+            if key[0] != kind or key[1] == self._jobs.get(kind):
+                continue
+            if self._users.get(key, 0) == 0:
+                retired.append(self._executors.pop(key))
+                self._users.pop(key, None)
+        return retired
+
+    def get(self, kind: str, jobs: int) -> concurrent.futures.Executor:
+        """Get the executor of the given kind with the given size"""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        key = (kind, jobs)
+        held = _HELD.get()
+        with self._lock:
+            executor = self._executors.get(key)
+            if executor is None:
+                if kind == "thread":
+                    executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=jobs, thread_name_prefix="wilderness"
+                    )
+                else:
+                    executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=jobs
+                    )
+                self._executors[key] = executor
+            if held is not None and key not in held:
+                held.add(key)
+                self._users[key] = self._users.get(key, 0) + 1
+            self._jobs[kind] = jobs
+            retired = self._retire(kind)
+            if not self._registered_exit:
+                atexit.register(self.shutdown)
+                self._registered_exit = True
+        for old in retired:
+            old.shutdown(wait=False)
+        return executor
+
+    @contextlib.contextmanager
+    def invocation(self) -> Iterator[None]:
+        """Hold the executors that are used in this context until it exits"""
+        held = set()  # type: Set[_Key]
+        token = _HELD.set(held)
+        try:
+            yield
+        finally:
+            _HELD.reset(token)
+            retired = []
+            with self._lock:
+                for key in held:
+                    if key in self._users:
+                        self._users[key] -= 1
+                for kind in {key[0] for key in held}:
+                    retired.extend(self._retire(kind))
+            for old in retired:
+                old.shutdown(wait=False)
+
+    def shutdown(self, cancel: bool = False) -> None:
+        """Shut down the executors
+
+        Parameters
+        ----------
+        cancel : bool
+            Whether to cancel pending work and return without waiting for
+            the running work to finish.
+
+        """
+        with self._lock:
+            executors, self._executors = self._executors, {}
+            self._users = {}
+        for executor in executors.values():
+            if cancel and sys.version_info >= (3, 9):
+                executor.shutdown(wait=False, cancel_futures=True)
+            elif cancel:
+                _cancel_pending(executor)
+                executor.shutdown(wait=False)
+            else:
+                executor.shutdown()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""Performance mode
+
+This module contains the process-level tuning that is used by applications
+created with ``performance=True`` (or when the ``WILDERNESS_PERFORMANCE``
+environment variable is set).
+
+Applications with many commands hold a large number of long-lived objects
+(the commands, their argument parsers, and the actions of these parsers),
+which the cyclic garbage collector keeps scanning while the command runs. In
+performance mode, these objects are moved to the permanent generation with
+:func:`gc.freeze` before the first command runs, and the thresholds of the
+garbage collector are raised while the command runs, so that commands that
+allocate many objects trigger fewer collections.
+
+The teardown of the interpreter can also take a noticeable time for large
+heaps. :func:`fast_exit` (used by :func:`Application.main
+<wilderness.application.Application.main>` in performance mode) closes the
+file arguments that are still open, runs the functions registered with
+:mod:`atexit` (such as writing the metrics and the trace), flushes stdout and
+stderr, and then ends the process with :func:`os._exit`, skipping the
+teardown.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import atexit
+import gc
+import os
+import sys
+import threading
+
+from typing import TYPE_CHECKING
+from typing import NoReturn
+from typing import Optional
+from typing import Tuple
+
+from wilderness.files import close_open_files
+from wilderness.hooks import Hook
+
+if TYPE_CHECKING:
+    import wilderness.application
+    import wilderness.command
+
+
+def fast_exit(return_code: int) -> NoReturn:
+    """Exit the process without the teardown of the interpreter
+
+    The file arguments that are still open (see :mod:`wilderness.files`) are
+    closed, the functions registered with :mod:`atexit` are run, and stdout
+    and stderr are flushed before the process exits. If the output can't be
+    written, the process exits with status 120, as the interpreter does. If
+    other (non-daemon) threads are still running, or if the :mod:`atexit`
+    functions can't be run here, the process exits normally instead.
+
+    """
+    main = threading.main_thread()
+    if any(
+        t is not main and not t.daemon and t.is_alive()
+        for t in threading.enumerate()
+    ):
+        sys.exit(return_code)
+
+    try:
+        close_open_files()
+    except (OSError, ValueError):
+        if return_code == 0:
+            return_code = 120
+
+    # The atexit module has no public function to run the registered
+    # functions, so this uses the private one of CPython and exits normally
+    # on interpreters that don't have it
+    run_exitfuncs = getattr(atexit, "_run_exitfuncs", None)
+    if run_exitfuncs is None:
+        sys.exit(return_code)
+    run_exitfuncs()
+
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            if stream is not None:
+                stream.flush()
+        except (OSError, ValueError):
+            if return_code == 0:
+                return_code = 120
+    os._exit(return_code)
+
+
+class PerformanceHook(Hook):
+    """Hook that tunes the garbage collector for the command
+
+    Parameters
+    ----------
+    threshold : Tuple[int, int, int]
+        The thresholds of the garbage collector while the command runs (see
+        :func:`gc.set_threshold`). The thresholds are restored when the
+        command finishes.
+
+    """
+
+    def __init__(self, threshold: Tuple[int, int, int] = (50000, 20, 20)):
+        self._threshold = threshold
+        self._previous = None  # type: Optional[Tuple[int, int, int]]
+        self._frozen = False
+
+    def start(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+    ) -> None:
+        # The parsers are complete once the command line is parsed, so this
+        # is the first point where all long-lived objects exist. Freezing is
+        # only done once, so that the garbage of earlier runs (in batch mode
+        # or in tests) isn't frozen.
+        if not self._frozen:
+            gc.freeze()
+            self._frozen = True
+        self._previous = gc.get_threshold()
+        gc.set_threshold(*self._threshold)
+
+    def stop(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+        return_code: Optional[int],
+    ) -> None:
+        if self._previous is None:
+            return
+        gc.set_threshold(*self._previous)
+        self._previous = None
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+"""Plugin commands
+
+Applications can be extended with commands from other distributions that
+advertise them through package entry points, such as::
+
+    [options.entry_points]
+    fakegit.commands =
+        lfs = fakegit_lfs.commands:LFSCommand
+
+The object an entry point refers to is either a Command subclass (that can be
+created without arguments), a factory function that returns a Command, or a
+Command instance. The name of the entry point is used as the command name.
+
+Scanning the installed distributions for entry points is relatively slow, so
+the discovered plugins are stored in an index file in the cache directory.
+The index is invalidated when one of the site-packages directories (or a
+directory that a ``.pth`` file in them adds to ``sys.path``) is modified,
+which happens when distributions are installed or removed. Every interpreter
+and virtual environment has its own index. Plugin commands are added as
+lightweight placeholders that only import the plugin when the command is
+selected or its documentation is needed.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import importlib
+import marshal
+import os
+import site
+import sys
+
+from typing import Any
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from wilderness.cache import cache_filename
+from wilderness.cache import read_cache
+from wilderness.cache import write_cache
+from wilderness.command import Command
+from wilderness.group import Group
+from wilderness.manpages import ManPage
+
+# Increase when the layout of the plugin index changes
+_CACHE_VERSION = 1
+
+# (name, title, aliases, target) of a plugin command
+PluginSpec = Tuple[str, Optional[str], Tuple[str, ...], str]
+
+
+def _entry_points(group: str) -> List[Any]:
+    if sys.version_info >= (3, 10):
+        from importlib.metadata import entry_points
+
+        return list(entry_points(group=group))
+    if sys.version_info >= (3, 8):
+        from importlib.metadata import entry_points as _eps
+
+        return list(_eps().get(group, []))
+    # The backport selects by group since version 3.6
+    import importlib_metadata  # type: ignore
+
+    return list(importlib_metadata.entry_points(group=group))
+
+
+def _site_directories() -> List[str]:
+    dirs = []
+    # Old versions of virtualenv don't provide getsitepackages
+    if hasattr(site, "getsitepackages"):
+        dirs.extend(site.getsitepackages())
+    if site.ENABLE_USER_SITE:
+        dirs.append(site.getusersitepackages())
+    return dirs
+
+
+def _pth_paths(sitedir: str) -> List[str]:
+    # The directories that .pth files add to sys.path, such as those of
+    # editable installs
+    paths = []  # type: List[str]
+    try:
+        names = sorted(n for n in os.listdir(sitedir) if n.endswith(".pth"))
+    except OSError:
+        return paths
+    for name in names:
+        try:
+            with open(os.path.join(sitedir, name), encoding="utf-8") as fp:
+                lines = fp.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            continue
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith(("#", "import ", "import\t")):
+                continue
+            paths.append(os.path.join(sitedir, line))
+    return paths
+
+
+def _path_key() -> Tuple[Tuple[str, int], ...]:
+    key = []
+    for sitedir in _site_directories():
+        for path in [sitedir] + _pth_paths(sitedir):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key.append((path, stat.st_mtime_ns))
+    return tuple(key)
+
+
+def load_object(target: str) -> Any:
+    """Import the object referenced by a ``module:attr`` string"""
+    module_name, _, attrs = target.partition(":")
+    obj = importlib.import_module(module_name)
+    for attr in filter(None, attrs.split(".")):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def create_command(obj: Any) -> Command:
+    """Create a command from the object an entry point refers to"""
+    command = obj if isinstance(obj, Command) else obj()
+    if not isinstance(command, Command):
+        raise TypeError(f"Plugin object is not a Command: {obj!r}")
+    return command
+
+
+def _scan_plugins(group: str) -> List[PluginSpec]:
+    specs = []
+    for ep in _entry_points(group):
+        # The plugin has to be loaded once to find its title and aliases
+        try:
+            command = create_command(ep.load())
+        except Exception as err:
+            print(
+                f"warning: unable to load plugin {ep.name!r}: {err}",
+                file=sys.stderr,
+            )
+            continue
+        aliases = tuple(command.aliases)
+        specs.append((ep.name, command.title, aliases, ep.value))
+    return sorted(specs)
+
+
+def discover_plugins(group: str, use_cache: bool = True) -> List[PluginSpec]:
+    """Find the plugin commands advertised for an entry point group
+
+    Parameters
+    ----------
+    group : str
+        The name of the entry point group.
+
+    use_cache : bool
+        Whether to use the on-disk plugin index. The index is keyed by the
+        site-packages directories and the directories added by ``.pth``
+        files, and their modification times.
+
+    Returns
+    -------
+    plugins : List[Tuple[str, Optional[str], Tuple[str, ...], str]]
+        The name, title, aliases, and import path of the plugin commands,
+        sorted by name. Plugins that fail to load are skipped with a warning.
+
+    """
+    if not use_cache:
+        return _scan_plugins(group)
+
+    key = (_CACHE_VERSION, group, _path_key())
+    # Every interpreter and virtual environment has its own index
+    cache_file = cache_filename("plugins", f"{sys.executable}\0{group}")
+    data = read_cache(cache_file)
+    if data is not None:
+        try:
+            cached_key, specs = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            cached_key, specs = None, None
+        if cached_key == key:
+            return [tuple(spec) for spec in specs]  # type: ignore
+
+    specs = _scan_plugins(group)
+    write_cache(cache_file, marshal.dumps((key, specs)))
+    return specs
+
+
+class PluginCommand(Command):
+    """Placeholder for a command that is provided by a plugin
+
+    The plugin is imported when the parser of the command is built, which
+    happens when the command is selected on the command line or when its
+    documentation is needed. The loaded command then shares the parser, the
+    arguments, and the parent of the placeholder, and the placeholder
+    forwards to it. The output format, the kind of parallelism, and whether
+    the command is cancellable are copied from the loaded command, so that
+    the placeholder gets the same options and writes the same records.
+
+    Parameters
+    ----------
+    name : str
+        The name of the command.
+
+    target : str
+        The import path of the plugin object, in ``module:attr`` form.
+
+    title : Optional[str]
+        The title of the command, shown in the help text.
+
+    aliases : Optional[List[str]]
+        Alternative names for the command.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        target: str,
+        title: Optional[str] = None,
+        aliases: Optional[List[str]] = None,
+    ):
+        super().__init__(name, title=title, aliases=aliases)
+        self._target = target
+        self._command = None  # type: Optional[Command]
+
+    @property
+    def target(self) -> str:
+        """The import path of the plugin"""
+        return self._target
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the plugin has been imported"""
+        return self._command is not None
+
+    def load(self) -> Command:
+        """Import the plugin and return the command it provides"""
+        if self._command is not None:
+            return self._command
+        command = create_command(load_object(self._target))
+        command._name = self._name
+        command._parent = self._parent
+        command._arg_help = self._arg_help
+        self._command = command
+        return command
+
+    def register(self):
+        command = self.load()
+        # These are checked on the placeholder when its parser is built and
+        # when the command is run
+        self.output_format = command.output_format
+        self.output_fields = command.output_fields
+        self.parallel = command.parallel
+        self.cancellable = command.cancellable
+        command.parser = self.parser
+        # The parser is already built, so subcommands of the plugin can
+        # create their subparsers right away
+        command._subparsers_ready = True
+        command.register()
+
+    def _walk_built_commands(self) -> Iterator[Command]:
+        if self._command is None:
+            return iter(())
+        return self._command._walk_built_commands()
+
+    @property
+    def commands(self) -> Tuple[Command, ...]:
+        self._ensure_registered()
+        assert self._command is not None
+        return self._command.commands
+
+    @property
+    def groups(self) -> Tuple[Group, ...]:
+        self._ensure_registered()
+        assert self._command is not None
+        return self._command.groups
+
+    def get_command(self, command_name: str) -> Command:
+        self._ensure_registered()
+        assert self._command is not None
+        return self._command.get_command(command_name)
+
+    def format_help(self) -> str:
+        self._ensure_registered()
+        assert self._command is not None
+        return self._command.format_help()
+
+    def handle(self) -> int:
+        self._ensure_registered()
+        assert self._command is not None
+        self._command.args = self.args
+        return self._command.handle()
+
+    def create_manpage(self) -> ManPage:
+        self._ensure_registered()
+        assert self._command is not None
+        return self._command.create_manpage()
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+
+"""Running many processes
+
+This module contains :func:`run_processes`, which runs a list of commands as
+child processes with a limit on the number that run at the same time, as a
+command that fetches from many remotes would::
+
+    argv = [["git", "fetch", remote] for remote in remotes]
+    for result in run_processes(argv, max_concurrency=self.args.jobs):
+        if result.return_code != 0:
+            self.stderr.write(result.stderr.decode())
+
+The processes are started with ``os.posix_spawnp`` where available, which
+avoids copying the memory of the Python process as a fork would. Their
+output is read by a single event loop (using :mod:`selectors`) as it becomes
+available, so that a process that writes a lot of output never blocks on a
+full pipe. The output is either captured, passed to a callback as it
+arrives, or written directly to the standard output and error of the
+application. Processes exit codes follow the shell convention, where a
+process that is killed by a signal has the exit code 128 plus the signal
+number.
+
+When the application is interrupted (with Ctrl-C) or the invocation is
+cancelled (see :mod:`wilderness.cancellation`), the running processes are
+interrupted as well, processes that haven't started yet are skipped, and
+:class:`KeyboardInterrupt` (or :class:`Cancelled
+<wilderness.cancellation.Cancelled>`) is raised once the processes have
+exited.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import collections
+import os
+import selectors
+import signal
+import subprocess
+import time
+
+from typing import IO
+from typing import Any
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from wilderness.cancellation import current_token
+from wilderness.parallel import default_jobs
+from wilderness.streams import current_streams
+
+# Called with the index of the command, the name of the stream ("stdout" or
+# "stderr"), and the data that was read
+OutputCallback = Callable[[int, str, bytes], None]
+
+_READ_SIZE = 1 << 16
+
+# Seconds to wait for interrupted processes before they are killed
+_GRACE_PERIOD = 2.0
+
+# Seconds between checks of the cancellation token
+_CHECK_INTERVAL = 0.1
+
+
+class ProcessResult(NamedTuple):
+    """The result of a process started by :func:`run_processes`"""
+
+    argv: List[str]
+    return_code: Optional[int]
+    stdout: Optional[bytes]
+    stderr: Optional[bytes]
+    started: Optional[float]
+    duration: Optional[float]
+
+    @property
+    def skipped(self) -> bool:
+        """Whether the process wasn't started due to an interrupt"""
+        return self.return_code is None
+
+
+def exit_code(status: int) -> int:
+    """Convert a wait status to an exit code, following the shell"""
+    if os.WIFSIGNALED(status):
+        return 128 + os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class _Child:
+    def __init__(self, index: int, argv: List[str], started: float):
+        self.index = index
+        self.argv = argv
+        self.started = started
+        self.pid = -1
+        self.popen = None  # type: Optional[subprocess.Popen]
+        self.pidfd = -1
+        self.status = None  # type: Optional[int]
+        self.finished = 0.0
+        self.open_fds = 0
+        self.output = {
+            "stdout": bytearray(),
+            "stderr": bytearray(),
+        }  # type: Dict[str, bytearray]
+
+    @property
+    def done(self) -> bool:
+        return self.status is not None and self.open_fds == 0
+
+    def poll(self) -> None:
+        if self.status is not None:
+            return
+        if self.popen is not None:
+            code = self.popen.poll()
+            if code is not None:
+                # Popen reports signals as negative numbers
+                self.status = 128 - code if code < 0 else code
+        else:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid != 0:
+                self.status = exit_code(status)
+        if self.status is not None:
+            self.finished = time.monotonic()
+
+    def send_signal(self, signum: int) -> None:
+        if self.status is not None:
+            return
+        try:
+            if self.popen is not None:
+                self.popen.send_signal(signum)
+            else:
+                os.kill(self.pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+class _Runner:
+    def __init__(
+        self,
+        capture: bool,
+        on_output: Optional[OutputCallback],
+        env: Optional[Mapping[str, str]],
+        cwd: Optional[str],
+    ):
+        self._capture = capture
+        self._on_output = on_output
+        self._pipes = capture or on_output is not None
+        self._env = dict(os.environ if env is None else env)
+        self._cwd = cwd
+        self._selector = selectors.DefaultSelector()
+        self._children = []  # type: List[_Child]
+
+    def _spawn(self, argv: List[str]) -> Tuple[int, Optional[int], List[int]]:
+        # Returns the pid, the pid file descriptor (or None), and the read
+        # ends of the pipes for stdout and stderr. The processes don't share
+        # the standard input of the application.
+        actions = [
+            (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0)
+        ]  # type: List[Tuple[Any, ...]]
+        read_fds = []
+        write_fds = []
+        if self._pipes:
+            for fd in (1, 2):
+                r, w = os.pipe()
+                read_fds.append(r)
+                write_fds.append(w)
+                actions.append((os.POSIX_SPAWN_DUP2, w, fd))
+        try:
+            pid = os.posix_spawnp(
+                argv[0], argv, self._env, file_actions=actions
+            )
+        except OSError:
+            for fd in read_fds:
+                os.close(fd)
+            raise
+        finally:
+            for fd in write_fds:
+                os.close(fd)
+        pidfd = None
+        if hasattr(os, "pidfd_open"):
+            try:
+                pidfd = os.pidfd_open(pid)
+            except OSError:
+                pidfd = None
+        return pid, pidfd, read_fds
+
+    def start(self, index: int, argv: List[str]) -> _Child:
+        child = _Child(index, argv, time.monotonic())
+        use_spawn = hasattr(os, "posix_spawnp") and self._cwd is None
+        read_fds = []  # type: List[int]
+        if use_spawn:
+            pid, pidfd, read_fds = self._spawn(argv)
+            child.pid = pid
+            if pidfd is not None:
+                child.pidfd = pidfd
+                self._selector.register(pidfd, selectors.EVENT_READ, child)
+        else:
+            pipe = subprocess.PIPE if self._pipes else None
+            child.popen = subprocess.Popen(
+                argv,
+                stdin=subprocess.DEVNULL,
+                stdout=pipe,
+                stderr=pipe,
+                env=self._env,
+                cwd=self._cwd,
+            )
+            child.pid = child.popen.pid
+            if self._pipes:
+                assert child.popen.stdout is not None
+                assert child.popen.stderr is not None
+                read_fds = [
+                    os.dup(child.popen.stdout.fileno()),
+                    os.dup(child.popen.stderr.fileno()),
+                ]
+                child.popen.stdout.close()
+                child.popen.stderr.close()
+
+        for fd, name in zip(read_fds, ("stdout", "stderr")):
+            self._selector.register(fd, selectors.EVENT_READ, (child, name))
+            child.open_fds += 1
+        self._children.append(child)
+        return child
+
+    def _read(self, fd: int, child: _Child, name: str) -> None:
+        data = os.read(fd, _READ_SIZE)
+        if not data:
+            self._selector.unregister(fd)
+            os.close(fd)
+            child.open_fds -= 1
+            return
+        if self._capture:
+            child.output[name] += data
+        if self._on_output is not None:
+            self._on_output(child.index, name, data)
+
+    def _reap(self, child: _Child) -> None:
+        child.poll()
+        if child.status is not None and child.pidfd >= 0:
+            self._selector.unregister(child.pidfd)
+            os.close(child.pidfd)
+            child.pidfd = -1
+
+    def wait(self, timeout: Optional[float]) -> List[_Child]:
+        """Process events, returning the children that are done"""
+        # Without a pidfd the exit of a process has to be polled
+        if any(c.pidfd < 0 and c.status is None for c in self._children):
+            timeout = 0.01 if timeout is None else min(timeout, 0.01)
+        for key, _ in self._selector.select(timeout):
+            if isinstance(key.data, _Child):
+                self._reap(key.data)
+            else:
+                child, name = key.data
+                self._read(key.fd, child, name)
+        for child in self._children:
+            if child.pidfd < 0:
+                self._reap(child)
+
+        done = [c for c in self._children if c.done]
+        self._children = [c for c in self._children if not c.done]
+        return done
+
+    @property
+    def running(self) -> int:
+        return len(self._children)
+
+    def interrupt(self) -> None:
+        """Interrupt the running processes and wait for them to exit"""
+        # The remaining output is discarded
+        self._capture = False
+        self._on_output = None
+        for child in self._children:
+            child.send_signal(signal.SIGINT)
+        deadline = time.monotonic() + _GRACE_PERIOD
+        while self._children and time.monotonic() < deadline:
+            self.wait(0.05)
+        for child in self._children:
+            child.send_signal(signal.SIGKILL)
+        while self._children:
+            self.wait(0.05)
+
+    def close(self) -> None:
+        for key in list(self._selector.get_map().values()):
+            os.close(key.fd)
+        self._selector.close()
+
+
+def _write_error(stream: IO[str], message: bytes) -> None:
+    buffer = getattr(stream, "buffer", None)
+    if buffer is None:
+        stream.write(message.decode(errors="replace"))
+    else:
+        stream.flush()
+        buffer.write(message)
+    stream.flush()
+
+
+def run_processes(
+    commands: Sequence[Sequence[str]],
+    max_concurrency: Optional[int] = None,
+    capture: bool = True,
+    on_output: Optional[OutputCallback] = None,
+    env: Optional[Mapping[str, str]] = None,
+    cwd: Optional[str] = None,
+) -> List[ProcessResult]:
+    """Run commands as child processes, with a limit on their concurrency
+
+    Parameters
+    ----------
+    commands : Sequence[Sequence[str]]
+        The commands to run. The executable (the first element of every
+        command) is searched on the PATH.
+
+    max_concurrency : Optional[int]
+        The maximum number of processes that run at the same time. Defaults
+        to the number of CPUs available to the process.
+
+    capture : bool
+        Whether to capture the output of the processes in the results.
+
+    on_output : Optional[Callable[[int, str, bytes], None]]
+        Function that is called with the index of the command, the name of
+        the stream (``"stdout"`` or ``"stderr"``), and the data, whenever a
+        process writes output. The error of a command that can't be started
+        is passed as its standard error. If this is omitted and the output
+        isn't captured, the processes write to the standard output and error
+        of the application directly.
+
+    env : Optional[Mapping[str, str]]
+        The environment of the processes. Defaults to the environment of
+        the application.
+
+    cwd : Optional[str]
+        The working directory of the processes. Processes are started with
+        :mod:`subprocess` instead of ``posix_spawnp`` if this is given.
+
+    Returns
+    -------
+    results : List[ProcessResult]
+        The results of the processes, in the order of the commands. Start
+        times are in seconds since the call. Commands that can't be started
+        have the exit code 127 and the error in their standard error.
+
+    Raises
+    ------
+    KeyboardInterrupt
+        If the application is interrupted or the invocation is cancelled,
+        after the running processes have exited.
+
+    """
+    limit = default_jobs() if max_concurrency is None else max_concurrency
+    if limit < 1:
+        raise ValueError("The maximum concurrency must be at least 1")
+
+    streams = current_streams()
+    if not capture and on_output is None:
+        # The processes share the output of the application
+        streams.stdout.flush()
+        streams.stderr.flush()
+
+    origin = time.monotonic()
+    queue = collections.deque(
+        (i, list(argv)) for i, argv in enumerate(commands)
+    )  # type: Deque[Tuple[int, List[str]]]
+    results = [
+        ProcessResult(list(argv), None, None, None, None, None)
+        for argv in commands
+    ]
+    token = current_token()
+    runner = _Runner(capture, on_output, env, cwd)
+    try:
+        while queue or runner.running:
+            token.check()
+            while queue and runner.running < limit:
+                index, argv = queue.popleft()
+                try:
+                    runner.start(index, argv)
+                except OSError as err:
+                    # Follow the shell for executables that can't be run
+                    message = f"{argv[0]}: {err.strerror}\n".encode()
+                    if on_output is not None:
+                        on_output(index, "stderr", message)
+                    elif not capture:
+                        _write_error(streams.stderr, message)
+                    started = time.monotonic() - origin
+                    results[index] = ProcessResult(
+                        argv,
+                        127,
+                        b"" if capture else None,
+                        message if capture else None,
+                        started,
+                        0.0,
+                    )
+            if not runner.running:
+                continue
+            for child in runner.wait(_CHECK_INTERVAL):
+                stdout = stderr = None
+                if capture:
+                    stdout = bytes(child.output["stdout"])
+                    stderr = bytes(child.output["stderr"])
+                results[child.index] = ProcessResult(
+                    child.argv,
+                    child.status,
+                    stdout,
+                    stderr,
+                    child.started - origin,
+                    child.finished - child.started,
+                )
+    except KeyboardInterrupt:
+        runner.interrupt()
+        raise
+    finally:
+        runner.close()
+    return results
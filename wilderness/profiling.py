@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+
+"""Profiling
+
+This module contains hooks that profile the command that is selected on the
+command line, either with :mod:`cProfile` or with a sampling profiler.
+
+Applications created with ``profile=True`` get a ``--profile [FILE]`` option
+that writes the profile of the command to a file in :mod:`pstats` format,
+and a ``--profile-top N`` option that prints the N functions with the
+highest cumulative time to stderr. Next to the profile, a JSON file with the
+same name and a ``.json`` extension records the command line arguments, the
+command, and its return code.
+
+Profiling can also be enabled without the constructor flag (and without
+changing the command line) by setting the ``WILDERNESS_PROFILE`` environment
+variable to the output file (or to ``1`` for the default file), and the
+``WILDERNESS_PROFILE_TOP`` environment variable to the number of functions to
+print.
+
+The overhead of cProfile can distort the timings of tight loops. The sampling
+profiler instead interrupts the process at a fixed rate of CPU time (using
+``setitimer`` and ``SIGPROF``) and counts the stacks of the main thread that
+it finds. Applications created with ``sampling=True`` get a ``--sample
+[FILE]`` option that writes the counts as folded stacks (one line per stack,
+with the frames separated by semicolons followed by the count), which can be
+turned into a flame graph with tools such as ``flamegraph.pl`` or speedscope.
+The ``--sample-rate HZ`` option sets the number of samples per second of CPU
+time (default: 100). As for cProfile, the ``WILDERNESS_SAMPLE`` and
+``WILDERNESS_SAMPLE_RATE`` environment variables enable the sampling profiler
+without the constructor flag. Sampling is only available on platforms that
+support ``setitimer``, and only the main thread is sampled.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import cProfile
+import json
+import os
+import platform
+import pstats
+import signal
+import sys
+import time
+
+from types import CodeType
+from types import FrameType
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from wilderness.config import env_int
+from wilderness.hooks import Hook
+
+if TYPE_CHECKING:
+    import wilderness.application
+    import wilderness.command
+
+
+def write_metadata(
+    filename: str,
+    app: "wilderness.application.Application",
+    command: Optional["wilderness.command.Command"],
+    return_code: Optional[int],
+    started: float,
+    **extra: Any,
+) -> None:
+    """Write the metadata of a profiled run to a JSON file"""
+    metadata = {
+        "argv": app.argv,
+        "command": None if command is None else command.path,
+        "return_code": return_code,
+        "started": started,
+        "duration": time.time() - started,
+        "python": platform.python_version(),
+        "pid": os.getpid(),
+    }  # type: Dict[str, Any]
+    metadata.update(extra)
+    with open(filename, "w", encoding="utf-8") as fp:
+        json.dump(metadata, fp, indent=2)
+
+
+class ProfileHook(Hook):
+    """Hook that profiles the command with cProfile
+
+    Parameters
+    ----------
+    add_options : bool
+        Whether to add the ``--profile`` and ``--profile-top`` options to the
+        application. If False, profiling is only controlled by the
+        environment variables.
+
+    sort : str
+        The sort key for the printed statistics (see
+        :meth:`pstats.Stats.sort_stats`).
+
+    """
+
+    def __init__(self, add_options: bool = True, sort: str = "cumulative"):
+        self._add_options = add_options
+        self._sort = sort
+        self._profiler = None  # type: Optional[cProfile.Profile]
+        self._started = 0.0
+
+    @staticmethod
+    def default_filename(app: "wilderness.application.Application") -> str:
+        return f"{app.name}.prof"
+
+    def register(self, app: "wilderness.application.Application") -> None:
+        if not self._add_options:
+            return
+        app.add_argument(
+            "--profile",
+            nargs="?",
+            const=self.default_filename(app),
+            metavar="FILE",
+            help="profile the command and write the statistics to FILE",
+            description=(
+                "Run the command under the Python profiler and write the "
+                "statistics in pstats format to FILE (default: "
+                f"{self.default_filename(app)}). The command line arguments "
+                "and the return code of the command are written to FILE.json."
+            ),
+        )
+        app.add_argument(
+            "--profile-top",
+            type=int,
+            metavar="N",
+            help="print the N most expensive functions to stderr",
+            description=(
+                "Print the N functions with the highest cumulative time to "
+                "stderr after the command finishes. Implies --profile."
+            ),
+        )
+
+    def settings(
+        self, app: "wilderness.application.Application"
+    ) -> Tuple[Optional[str], Optional[int]]:
+        """The output file and the number of functions to print
+
+        Command line options take precedence over environment variables. The
+        output file is None if profiling is disabled.
+
+        """
+        filename = getattr(app.args, "profile", None)
+        top = getattr(app.args, "profile_top", None)
+
+        env = os.environ.get("WILDERNESS_PROFILE")
+        if filename is None and env:
+            filename = self.default_filename(app) if env == "1" else env
+        if top is None:
+            top = env_int("WILDERNESS_PROFILE_TOP")
+        if filename is None and top is not None:
+            filename = self.default_filename(app)
+        return filename, top
+
+    def start(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+    ) -> None:
+        filename, _ = self.settings(app)
+        if filename is None:
+            return
+        self._started = time.time()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+        return_code: Optional[int],
+    ) -> None:
+        profiler = self._profiler
+        if profiler is None:
+            return
+        profiler.disable()
+        self._profiler = None
+
+        filename, top = self.settings(app)
+        assert filename is not None
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.dump_stats(filename)
+
+        write_metadata(
+            filename + ".json", app, command, return_code, self._started
+        )
+
+        if top:
+            stats.sort_stats(self._sort).print_stats(top)
+
+
+class SamplingHook(Hook):
+    """Hook that profiles the command with a sampling profiler
+
+    The profiler uses the ``SIGPROF`` signal, so it replaces any handler of
+    this signal while the command runs. The cost of a sample is a walk up the
+    stack and a dictionary update, so at the default rate the overhead is
+    well below one percent, independent of the duration of the command.
+
+    Parameters
+    ----------
+    add_options : bool
+        Whether to add the ``--sample`` and ``--sample-rate`` options to the
+        application. If False, sampling is only controlled by the environment
+        variables.
+
+    rate : int
+        The default number of samples per second of CPU time.
+
+    """
+
+    def __init__(self, add_options: bool = True, rate: int = 100):
+        self._add_options = add_options
+        self._rate = rate
+        self._counts = {}  # type: Dict[Tuple[int, ...], int]
+        self._codes = {}  # type: Dict[int, CodeType]
+        self._root = None  # type: Optional[FrameType]
+        self._previous = None  # type: Any
+        self._started = 0.0
+
+    @staticmethod
+    def default_filename(app: "wilderness.application.Application") -> str:
+        return f"{app.name}.folded"
+
+    def register(self, app: "wilderness.application.Application") -> None:
+        if not self._add_options:
+            return
+        app.add_argument(
+            "--sample",
+            nargs="?",
+            const=self.default_filename(app),
+            metavar="FILE",
+            help="profile the command by sampling and write stacks to FILE",
+            description=(
+                "Run the command under the sampling profiler and write the "
+                "sampled stacks in folded format to FILE (default: "
+                f"{self.default_filename(app)}), for use with flame graph "
+                "tools. The command line arguments and the return code of "
+                "the command are written to FILE.json."
+            ),
+        )
+        app.add_argument(
+            "--sample-rate",
+            type=int,
+            metavar="HZ",
+            help=f"samples per second of CPU time (default: {self._rate})",
+            description=(
+                "The number of samples per second of CPU time used by the "
+                f"sampling profiler (default: {self._rate}). Implies --sample."
+            ),
+        )
+
+    def settings(
+        self, app: "wilderness.application.Application"
+    ) -> Tuple[Optional[str], int]:
+        """The output file and the sampling rate
+
+        Command line options take precedence over environment variables. The
+        output file is None if sampling is disabled.
+
+        """
+        filename = getattr(app.args, "sample", None)
+        rate = getattr(app.args, "sample_rate", None)
+
+        env = os.environ.get("WILDERNESS_SAMPLE")
+        if filename is None and env:
+            filename = self.default_filename(app) if env == "1" else env
+        if rate is None:
+            rate = env_int("WILDERNESS_SAMPLE_RATE")
+            if rate is None:
+                rate = self._rate
+        elif filename is None:
+            filename = self.default_filename(app)
+        return filename, rate
+
+    def _sample(self, signum: int, frame: Optional[FrameType]) -> None:
+        root = self._root
+        codes = self._codes
+        stack = []
+        while frame is not None and frame is not root:
+            code = frame.f_code
+            key = id(code)
+            if key not in codes:
+                codes[key] = code
+            stack.append(key)
+            frame = frame.f_back
+        stack_key = tuple(stack)
+        self._counts[stack_key] = self._counts.get(stack_key, 0) + 1
+
+    def start(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+    ) -> None:
+        filename, rate = self.settings(app)
+        if filename is None:
+            return
+        if not hasattr(signal, "setitimer"):
+            print(
+                "warning: sampling profiler is not supported on this platform",
+                file=sys.stderr,
+            )
+            return
+        if rate <= 0:
+            app.parser.error(f"invalid sampling rate: {rate}")
+            return
+
+        self._counts.clear()
+        self._codes.clear()
+        # Stacks are recorded up to the frame that runs the hooks
+        self._root = sys._getframe(1)
+        try:
+            self._previous = signal.signal(signal.SIGPROF, self._sample)
+        except ValueError:
+            # Not in the main thread
+            self._root = None
+            print(
+                "warning: sampling profiler requires the main thread",
+                file=sys.stderr,
+            )
+            return
+        self._started = time.time()
+        interval = 1.0 / rate
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+
+    def stop(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+        return_code: Optional[int],
+    ) -> None:
+        if self._root is None:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous)
+        self._root = None
+        self._previous = None
+
+        filename, rate = self.settings(app)
+        assert filename is not None
+        with open(filename, "w", encoding="utf-8") as fp:
+            for line in self.folded_stacks(app.name):
+                fp.write(line)
+                fp.write("\n")
+        write_metadata(
+            filename + ".json",
+            app,
+            command,
+            return_code,
+            self._started,
+            rate=rate,
+            samples=sum(self._counts.values()),
+        )
+
+    @staticmethod
+    def _frame_name(code: CodeType) -> str:
+        filename = os.path.basename(code.co_filename)
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({filename}:{code.co_firstlineno})"
+        # Semicolons separate the frames in the folded format
+        return label.replace(";", ":")
+
+    def folded_stacks(self, root: str = "root") -> List[str]:
+        """The sampled stacks in folded format, sorted by stack
+
+        Parameters
+        ----------
+        root : str
+            The name of the outermost frame of every stack.
+
+        """
+        names = {key: self._frame_name(c) for key, c in self._codes.items()}
+        lines = []
+        for stack, count in self._counts.items():
+            frames = [root, *(names[key] for key in reversed(stack))]
+            lines.append(f"{';'.join(frames)} {count}")
+        return sorted(lines)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+"""Progress reporting
+
+This module contains the progress counters of commands. A command creates a
+counter with ``self.progress()`` and advances it as it makes progress,
+which is cheap enough to do for every item, also from worker threads::
+
+    def handle(self):
+        files = self.args.files
+        progress = self.progress("checksums", total=len(files), unit="files")
+        for path, digest in zip(files, self.executor.map(checksum, files)):
+            self.stdout.write(f"{digest}  {path}\\n")
+            progress.advance()
+        return 0
+
+The counters don't write anything themselves. When the standard error of
+the invocation is a terminal, a background thread draws the counters on a
+single status line at most ``rate`` times per second (10 by default), and
+clears the line when the command finishes. When it isn't a terminal,
+nothing is written. Applications that are run by other programs (in batch
+or server mode) can instead report progress as JSON lines on the standard
+error, with one event per counter that changed since the last report::
+
+    {"event": "progress", "name": "checksums", "done": 120, "total": 800,
+     "unit": "files", "elapsed": 1.25}
+
+The mode is set with the ``progress`` argument of the :class:`Application
+<wilderness.application.Application>` or the ``WILDERNESS_PROGRESS``
+environment variable: ``auto`` (the default), ``json``, or ``none``.
+
+Counters don't take a lock when they are advanced: every thread increments
+its own cell of the counter, and the cells are added up when the counter is
+read.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import contextlib
+import contextvars
+import json
+import shutil
+import threading
+import time
+
+from typing import IO
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+MODES = ("auto", "json", "none")
+
+
+class ProgressCounter:
+    """A counter of the progress of a command
+
+    Parameters
+    ----------
+    name : str
+        The name of the counter, which is shown with the progress.
+
+    total : Optional[float]
+        The total of the counter when the work is done, if known.
+
+    unit : str
+        The unit of the counter, such as ``"files"`` or ``"bytes"``.
+
+    """
+
+    def __init__(
+        self, name: str, total: Optional[float] = None, unit: str = ""
+    ):
+        self.name = name
+        self.total = total
+        self.unit = unit
+        self.started = time.monotonic()
+        self._local = threading.local()
+        self._cells = []  # type: List[List[float]]
+        self._lock = threading.Lock()
+
+    def _new_cell(self) -> List[float]:
+        cell = [0]  # type: List[float]
+        with self._lock:
+            self._cells.append(cell)
+        self._local.cell = cell
+        return cell
+
+    def advance(self, amount: float = 1) -> None:
+        """Add to the counter"""
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._new_cell()
+        # Only this thread writes to its cell
+        cell[0] += amount
+
+    @property
+    def done(self) -> float:
+        """The current value of the counter"""
+        return sum(cell[0] for cell in tuple(self._cells))
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the counter was created"""
+        return time.monotonic() - self.started
+
+
+def _number(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.1f}"
+
+
+def format_counter(counter: ProgressCounter, done: float) -> str:
+    """Format a counter for the status line"""
+    text = f"{counter.name}: {_number(done)}"
+    if counter.total is not None:
+        text += f"/{_number(counter.total)}"
+    if counter.unit:
+        text += f" {counter.unit}"
+    if counter.total:
+        text += f" ({min(100.0, 100.0 * done / counter.total):.0f}%)"
+    elapsed = counter.elapsed
+    if elapsed > 0 and done > 0:
+        text += f" {done / elapsed:.1f}/s"
+    return text
+
+
+class ProgressReporter:
+    """Report the progress counters of an invocation
+
+    Parameters
+    ----------
+    stream : Optional[IO[str]]
+        The stream to write the progress to (typically standard error). If
+        None, the progress isn't reported.
+
+    mode : str
+        ``"auto"`` draws a status line if the stream is a terminal and is
+        silent otherwise, ``"json"`` writes JSON lines events, and
+        ``"none"`` is silent.
+
+    rate : float
+        The maximum number of reports per second.
+
+    """
+
+    def __init__(
+        self, stream: Optional[IO[str]], mode: str = "auto", rate: float = 10
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown progress mode: {mode}")
+        if rate <= 0:
+            raise ValueError("The rate of progress reports must be positive")
+        if stream is None:
+            mode = "none"
+        elif mode == "auto":
+            try:
+                mode = "status" if stream.isatty() else "none"
+            except (AttributeError, ValueError):
+                mode = "none"
+        self._stream = stream
+        self._mode = mode
+        self._interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._counters = []  # type: List[ProgressCounter]
+        self._reported = {}  # type: Dict[int, Tuple[float, Optional[float]]]
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+        self._line_width = 0
+
+    @property
+    def counters(self) -> Tuple[ProgressCounter, ...]:
+        return tuple(self._counters)
+
+    def counter(
+        self, name: str, total: Optional[float] = None, unit: str = ""
+    ) -> ProgressCounter:
+        """Create a counter that is reported"""
+        counter = ProgressCounter(name, total=total, unit=unit)
+        with self._lock:
+            self._counters.append(counter)
+            if self._thread is None and self._mode != "none":
+                self._thread = threading.Thread(
+                    target=self._run, name="wilderness-progress", daemon=True
+                )
+                self._thread.start()
+        return counter
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        """Write the progress of the counters"""
+        if self._mode == "status":
+            self._draw(final)
+        elif self._mode == "json":
+            self._write_events(final)
+
+    def _draw(self, final: bool) -> None:
+        assert self._stream is not None
+        if final:
+            # Leave the terminal as it was
+            if self._line_width:
+                self._stream.write("\r\x1b[K")
+                self._stream.flush()
+            return
+        width = shutil.get_terminal_size().columns - 1
+        line = " | ".join(format_counter(c, c.done) for c in self.counters)
+        if len(line) > width:
+            line = line[: max(0, width - 1)] + "…"
+        self._stream.write("\r" + line + "\x1b[K")
+        self._stream.flush()
+        self._line_width = len(line)
+
+    def _write_events(self, final: bool) -> None:
+        events = []
+        for counter in self.counters:
+            state = (counter.done, counter.total)
+            if self._reported.get(id(counter)) == state and not final:
+                continue
+            self._reported[id(counter)] = state
+            event = {
+                "event": "progress",
+                "name": counter.name,
+                "done": state[0],
+                "total": state[1],
+                "unit": counter.unit,
+                "elapsed": round(counter.elapsed, 3),
+            }  # type: Dict[str, Any]
+            if final:
+                event["final"] = True
+            events.append(json.dumps(event) + "\n")
+        if events:
+            assert self._stream is not None
+            self._stream.write("".join(events))
+            self._stream.flush()
+
+    def close(self) -> None:
+        """Stop the reports and write the final report"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.report(final=True)
+
+
+_REPORTER = contextvars.ContextVar(
+    "wilderness_progress", default=None
+)  # type: contextvars.ContextVar[Optional[ProgressReporter]]
+
+
+def current_reporter() -> ProgressReporter:
+    """The progress reporter of the current invocation
+
+    Outside of an invocation a silent reporter is returned.
+    """
+    reporter = _REPORTER.get()
+    if reporter is None:
+        return ProgressReporter(None, mode="none")
+    return reporter
+
+
+@contextlib.contextmanager
+def report_progress(
+    stream: IO[str], mode: str = "auto", rate: float = 10
+) -> Iterator[ProgressReporter]:
+    """Report the progress of the invocations in this context"""
+    reporter = ProgressReporter(stream, mode=mode, rate=rate)
+    token = _REPORTER.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _REPORTER.reset(token)
+        reporter.close()
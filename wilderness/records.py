@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+"""Record output
+
+This module contains the encoders for commands that produce records. A
+command that sets the ``output_format`` class attribute to the name of the
+default format can return (or yield) an iterable of records from its handle
+method, instead of a return code::
+
+    class ListCommand(Command):
+        output_format = "text"
+        output_fields = ("name", "size")
+
+        def handle(self):
+            for path in os.scandir(self.args.directory):
+                yield (path.name, path.stat().st_size)
+
+The application then adds a ``--format`` option to the command, with the
+formats ``text``, ``json``, ``ndjson``, ``csv``, and ``tsv``, and writes the
+records to the standard output of the command in the chosen format. Records
+are either mappings or sequences. The ``output_fields`` attribute gives the
+names of the fields of sequence records, which are used as the header of
+CSV and TSV output and as keys of JSON objects. For mappings the keys of the
+first record are used if ``output_fields`` is not set.
+
+Records are encoded one at a time and written in batches, so a generator of
+records is never held in memory as a whole. Other formats can be added with
+:func:`register_encoder`.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import abc
+import csv
+import json
+
+from typing import IO
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Type
+from typing import Union
+
+if TYPE_CHECKING:
+    import wilderness.subcommands
+
+Record = Union[Mapping[str, Any], Sequence[Any]]
+
+
+class RecordEncoder(abc.ABC):
+    """Base class for record encoders
+
+    Encoders write the encoded records to the stream in batches of
+    ``batch_size`` records.
+
+    Parameters
+    ----------
+    stream : IO[str]
+        The stream to write to.
+
+    fields : Optional[Sequence[str]]
+        The names of the fields of the records, if known.
+
+    """
+
+    batch_size = 1024
+
+    def __init__(self, stream: IO[str], fields: Optional[Sequence[str]]):
+        self._stream = stream
+        self._fields = None if fields is None else list(fields)
+        self._pending = []  # type: List[str]
+
+    def write(self, text: str) -> None:
+        self._pending.append(text)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._stream.write("".join(self._pending))
+            self._pending.clear()
+
+    def fields(self, record: Record) -> Optional[List[str]]:
+        """The names of the fields, taken from the first mapping if needed"""
+        if self._fields is None and isinstance(record, Mapping):
+            self._fields = list(record)
+        return self._fields
+
+    def values(self, record: Record) -> Sequence[Any]:
+        if isinstance(record, Mapping):
+            fields = self.fields(record)
+            assert fields is not None
+            return [record.get(f) for f in fields]
+        return record
+
+    def begin(self) -> None:
+        """Called before the first record"""
+        pass
+
+    @abc.abstractmethod
+    def encode(self, record: Record) -> None:
+        """Write a record"""
+        pass
+
+    def end(self) -> None:
+        """Called after the last record"""
+        self.flush()
+
+
+class TextEncoder(RecordEncoder):
+    """Values separated by spaces, one record per line"""
+
+    def encode(self, record: Record) -> None:
+        values = ("" if v is None else str(v) for v in self.values(record))
+        self.write(" ".join(values) + "\n")
+
+
+class DelimitedEncoder(RecordEncoder):
+    """Values separated by a delimiter, with a header if fields are known"""
+
+    delimiter = ","
+
+    def __init__(self, stream: IO[str], fields: Optional[Sequence[str]]):
+        super().__init__(stream, fields)
+        self._writer = csv.writer(
+            self, delimiter=self.delimiter, lineterminator="\n"
+        )
+        self._started = False
+
+    def encode(self, record: Record) -> None:
+        if not self._started:
+            self._started = True
+            fields = self.fields(record)
+            if fields is not None:
+                self._writer.writerow(fields)
+        self._writer.writerow(self.values(record))
+
+
+class CSVEncoder(DelimitedEncoder):
+    delimiter = ","
+
+
+class TSVEncoder(DelimitedEncoder):
+    delimiter = "\t"
+
+
+class NDJSONEncoder(RecordEncoder):
+    """One JSON value per line
+
+    Sequence records are written as objects if the fields are known and as
+    arrays otherwise.
+    """
+
+    def __init__(self, stream: IO[str], fields: Optional[Sequence[str]]):
+        super().__init__(stream, fields)
+        # json.dumps creates a new encoder for every call with options
+        self._dumps = json.JSONEncoder(
+            default=str, separators=(",", ":"), check_circular=False
+        ).encode
+
+    def _json(self, record: Record) -> str:
+        if not isinstance(record, Mapping) and self._fields is not None:
+            record = dict(zip(self._fields, record))
+        elif not isinstance(record, Mapping):
+            record = list(record)
+        return self._dumps(record)
+
+    def encode(self, record: Record) -> None:
+        self.write(self._json(record) + "\n")
+
+
+class JSONEncoder(NDJSONEncoder):
+    """A JSON array of records, one record per line"""
+
+    def begin(self) -> None:
+        self._separator = "[\n"
+
+    def encode(self, record: Record) -> None:
+        self.write(self._separator + self._json(record))
+        self._separator = ",\n"
+
+    def end(self) -> None:
+        self.write("]\n" if self._separator == ",\n" else "[]\n")
+        super().end()
+
+
+ENCODERS = {
+    "text": TextEncoder,
+    "json": JSONEncoder,
+    "ndjson": NDJSONEncoder,
+    "csv": CSVEncoder,
+    "tsv": TSVEncoder,
+}  # type: Dict[str, Type[RecordEncoder]]
+
+
+def register_encoder(name: str, encoder: Type[RecordEncoder]) -> None:
+    """Register an encoder for use with the ``--format`` option
+
+    Encoders must be registered before the parsers of the commands are
+    built.
+    """
+    ENCODERS[name] = encoder
+
+
+def write_records(
+    records: Iterable[Record],
+    fmt: str,
+    stream: IO[str],
+    fields: Optional[Sequence[str]] = None,
+) -> int:
+    """Encode records to a stream, returning the number of records"""
+    encoder = ENCODERS[fmt](stream, fields)
+    encoder.begin()
+    count = 0
+    try:
+        for record in records:
+            encoder.encode(record)
+            count += 1
+    finally:
+        encoder.end()
+    return count
+
+
+def add_format_argument(host: "wilderness.subcommands.SubcommandsMixin"):
+    """Add the ``--format`` option for commands that produce records
+
+    The option isn't added if the command already has a ``--format`` option.
+    """
+    if "--format" in host.parser._option_string_actions:
+        return
+    host.add_argument(
+        "--format",
+        choices=list(ENCODERS),
+        default=host.output_format,
+        help=f"output format (default: {host.output_format})",
+        description=(
+            "The format of the output: "
+            + ", ".join(ENCODERS)
+            + f" (default: {host.output_format})."
+        ),
+    )
+
+
+def handle_result(
+    host: "wilderness.subcommands.SubcommandsMixin", result: Any
+) -> Any:
+    """Write the records returned by the handle method of a command
+
+    Results of commands that don't produce records, and return codes of
+    commands that do, are returned as is. Other results must be an iterable
+    of records.
+
+    Raises
+    ------
+    TypeError
+        If the result of a command that produces records isn't a return code
+        or an iterable of records.
+
+    """
+    if host.output_format is None or result is None or isinstance(result, int):
+        return result
+    # Strings and mappings are iterable, but aren't sequences of records
+    if isinstance(result, (str, bytes, Mapping)) or not isinstance(
+        result, Iterable
+    ):
+        raise TypeError(
+            "The handle method of a command with an output format must "
+            "return a return code or an iterable of records, not "
+            f"{type(result).__name__}"
+        )
+    args = host.args
+    fmt = getattr(args, "format", None) or host.output_format
+    write_records(result, fmt, host.stdout, host.output_fields)
+    return 0
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""Command registry
+
+This module contains the CommandRegistry class that holds the commands and
+groups of an application or of a command with subcommands. The registry keeps
+cached immutable views of the commands and groups, which are invalidated when
+a command or group is added, so that listing the commands (which happens for
+instance when formatting the help text) doesn't allocate new lists.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+from typing import TYPE_CHECKING
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+
+from wilderness.group import Group
+from wilderness.index import CommandIndex
+
+if TYPE_CHECKING:
+    import wilderness.command
+
+CommandsView = Tuple["wilderness.command.Command", ...]
+
+
+class CommandRegistry:
+    """Registry of commands and groups
+
+    Parameters
+    ----------
+    allow_prefix : bool
+        Whether unique prefixes of command names resolve to the command (see
+        :class:`CommandIndex <wilderness.index.CommandIndex>`).
+
+    """
+
+    __slots__ = (
+        "_commands",
+        "_groups",
+        "_root",
+        "_index",
+        "_commands_view",
+        "_groups_view",
+    )
+
+    def __init__(self, allow_prefix: bool = False):
+        self._commands = {}  # type: Dict[str, wilderness.command.Command]
+        self._groups = {}  # type: Dict[str, Group]
+        self._root = None  # type: Optional[Group]
+        self._index = CommandIndex(allow_prefix=allow_prefix)
+        self._commands_view = None  # type: Optional[CommandsView]
+        self._groups_view = None  # type: Optional[Tuple[Group, ...]]
+
+    @property
+    def index(self) -> CommandIndex:
+        return self._index
+
+    @property
+    def root(self) -> Optional[Group]:
+        """The root group, if commands were added without a group"""
+        return self._root
+
+    @property
+    def named_groups(self) -> Tuple[Group, ...]:
+        """The groups that were explicitly created, in order of creation"""
+        groups = self.groups
+        return groups[1:] if self._root is not None else groups
+
+    @property
+    def commands(self) -> CommandsView:
+        """The commands in group order, starting with the root group"""
+        if self._commands_view is None:
+            self._commands_view = tuple(
+                cmd for group in self.groups for cmd in group.commands
+            )
+        return self._commands_view
+
+    @property
+    def groups(self) -> Tuple[Group, ...]:
+        """The groups, starting with the root group if there is one"""
+        if self._groups_view is None:
+            root = () if self._root is None else (self._root,)
+            self._groups_view = root + tuple(self._groups.values())
+        return self._groups_view
+
+    def invalidate(self) -> None:
+        """Clear the cached views"""
+        self._commands_view = None
+        self._groups_view = None
+
+    def add_group(self, group: Group) -> None:
+        if group.is_root:
+            self._root = group
+        else:
+            assert group.title is not None
+            self._groups[group.title] = group
+        self.invalidate()
+
+    def add_command(self, command: "wilderness.command.Command") -> None:
+        self._commands[command.name] = command
+        self._index.add(command.name, aliases=command.aliases)
+        self._commands_view = None
+
+    def get(self, name: str) -> "wilderness.command.Command":
+        """Get a command by its exact name"""
+        return self._commands[name]
+
+    def resolve(self, key: str) -> Optional["wilderness.command.Command"]:
+        """Find a command by name, alias, or (if allowed) unique prefix"""
+        name = self._index.resolve(key)
+        return None if name is None else self._commands[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._commands
+
+    def __iter__(self) -> Iterator["wilderness.command.Command"]:
+        return iter(self._commands.values())
+
+    def __len__(self) -> int:
+        return len(self._commands)
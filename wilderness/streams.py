@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""Streams
+
+This module contains the input and output streams of an invocation of an
+application. Commands should read from and write to :attr:`Command.stdin
+<wilderness.command.Command.stdin>`, :attr:`Command.stdout
+<wilderness.command.Command.stdout>`, and :attr:`Command.stderr
+<wilderness.command.Command.stderr>` instead of the streams in :mod:`sys`::
+
+    def handle(self):
+        for line in self.stdin:
+            self.stdout.write(line.upper())
+        return 0
+
+The streams are stored in a context variable that is set for every
+invocation (for instance by the :class:`Tester <wilderness.tester.Tester>`,
+which sets in-memory streams), so that invocations in different threads
+don't share output. When no streams are set for an invocation, the streams
+in :mod:`sys` are used. Note that threads don't inherit context variables,
+so worker threads that write output should be started with
+:func:`contextvars.copy_context`.
+
+Applications created with an ``output_buffer_size`` write the standard
+output of commands through a text writer with a large buffer (see
+:func:`buffered_stdout`), which doesn't flush on every line, even when the
+output is a terminal. Binary output can be written to ``self.stdout.buffer``.
+Output that is written with ``print()`` bypasses this buffer, so commands
+shouldn't mix the two.
+
+When the reader of the output goes away (as in ``app ... | head``), writing
+raises :class:`BrokenPipeError`. The application then stops the command
+quietly and returns the status of a process killed by ``SIGPIPE`` (see
+:func:`handle_broken_pipe`), as other command line tools do.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import contextlib
+import contextvars
+import io
+import os
+import sys
+
+from typing import IO
+from typing import Any
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+
+
+class Streams(NamedTuple):
+    """The input and output streams of an invocation"""
+
+    stdin: IO[Any]
+    stdout: IO[Any]
+    stderr: IO[Any]
+
+
+_STREAMS = contextvars.ContextVar(
+    "wilderness_streams", default=None
+)  # type: contextvars.ContextVar[Optional[Streams]]
+
+
+def current_streams() -> Streams:
+    """The streams of the current invocation"""
+    streams = _STREAMS.get()
+    if streams is None:
+        return Streams(sys.stdin, sys.stdout, sys.stderr)
+    return streams
+
+
+@contextlib.contextmanager
+def use_streams(
+    stdin: Optional[IO[Any]] = None,
+    stdout: Optional[IO[Any]] = None,
+    stderr: Optional[IO[Any]] = None,
+) -> Iterator[Streams]:
+    """Set the streams of the invocations in this context
+
+    Streams that are omitted are taken from the enclosing context.
+    """
+    current = current_streams()
+    streams = Streams(
+        current.stdin if stdin is None else stdin,
+        current.stdout if stdout is None else stdout,
+        current.stderr if stderr is None else stderr,
+    )
+    token = _STREAMS.set(streams)
+    try:
+        yield streams
+    finally:
+        _STREAMS.reset(token)
+
+
+# The exit status of a process killed by SIGPIPE (128 + 13)
+EXIT_BROKEN_PIPE = 141
+
+
+@contextlib.contextmanager
+def buffered_stdout(buffer_size: int) -> Iterator[Optional[IO[Any]]]:
+    """Write the standard output of this context through a large buffer
+
+    The writer uses the encoding and error handler of :data:`sys.stdout`
+    and writes to the same file descriptor. The buffer is flushed when the
+    context exits. Nothing is changed if the streams are already set for
+    this context (as in the :class:`Tester <wilderness.tester.Tester>`) or
+    if :data:`sys.stdout` isn't backed by a file descriptor, in which case
+    None is yielded.
+
+    """
+    if _STREAMS.get() is not None:
+        yield None
+        return
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        yield None
+        return
+
+    # Earlier output must come first
+    sys.stdout.flush()
+    raw = io.FileIO(fd, "wb", closefd=False)
+    stdout = io.TextIOWrapper(
+        io.BufferedWriter(raw, buffer_size=buffer_size),
+        encoding=sys.stdout.encoding,
+        errors=sys.stdout.errors,
+        write_through=False,
+    )
+    try:
+        with use_streams(stdout=stdout):
+            yield stdout
+    finally:
+        stdout.flush()
+
+
+def handle_broken_pipe() -> int:
+    """Handle a broken pipe on standard output
+
+    The standard output is pointed to the null device, so that flushing the
+    remaining output (including at interpreter exit) doesn't raise again.
+    Returns the exit status that is used for a broken pipe.
+
+    """
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+    except (AttributeError, OSError, ValueError):
+        pass
+    return EXIT_BROKEN_PIPE
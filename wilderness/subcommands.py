@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+
+"""SubcommandsMixin definitions
+
+A host of subcommands is either an application or a command that has
+commands of its own (such as ``git remote add``). This module contains the
+mixin that provides the shared functionality of adding commands and groups,
+resolving command names, and building the parsers of the subcommands.
+
+The parsers of subcommands are built lazily: a command is registered with
+the subparsers action of its host by name only, and its parser is created
+(and its ``register`` method called) when the command is selected on the
+command line or when its parser is first accessed. This keeps the startup
+time of applications with many (nested) commands independent of the number
+of commands.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import abc
+import argparse
+import concurrent.futures
+
+from typing import IO
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import cast
+
+from wilderness.argparse_wrappers import ArgumentParser
+from wilderness.argparse_wrappers import SubParsersAction
+from wilderness.cancellation import CancellationToken
+from wilderness.cancellation import add_timeout_argument
+from wilderness.cancellation import current_token
+from wilderness.documentable import DocumentableMixin
+from wilderness.group import Group
+from wilderness.parallel import add_jobs_argument
+from wilderness.parallel import default_jobs
+from wilderness.progress import ProgressCounter
+from wilderness.progress import current_reporter
+from wilderness.records import add_format_argument
+from wilderness.registry import CommandRegistry
+from wilderness.streams import current_streams
+
+if TYPE_CHECKING:
+    import wilderness.application
+    import wilderness.command
+
+
+class SubcommandsMixin(DocumentableMixin):
+    _cmd_name = "command"
+
+    # Commands that produce records set the default output format, and
+    # optionally the names of the fields (see wilderness.records)
+    output_format = None  # type: Optional[str]
+    output_fields = None  # type: Optional[Sequence[str]]
+
+    # Commands that run work in parallel set this to "thread" or "process"
+    # (see wilderness.parallel)
+    parallel = None  # type: Optional[str]
+
+    # Commands that check their cancellation token set this to True (see
+    # wilderness.cancellation)
+    cancellable = False  # type: bool
+
+    def __init__(self, *args, allow_command_abbrev: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._subparsers = None  # type: Optional[SubParsersAction]
+        self._subparsers_ready = False
+
+        # The registry is created when the first command is added, since
+        # most commands don't have subcommands
+        self._registry = None  # type: Optional[CommandRegistry]
+        self._allow_command_abbrev = allow_command_abbrev
+
+        self._prolog = None  # type: Optional[str]
+        self._epilog = None  # type: Optional[str]
+
+    @property
+    @abc.abstractmethod
+    def subparsers_dest(self) -> str:
+        """The attribute of the namespace that holds the subcommand name"""
+
+    @property
+    def path(self) -> List[str]:
+        """The names of the commands leading up to and including this one
+
+        This is empty for the application itself.
+        """
+        return []
+
+    @abc.abstractmethod
+    def _get_application(
+        self,
+    ) -> Optional["wilderness.application.Application"]:
+        pass
+
+    @abc.abstractmethod
+    def add_argument(self, *args, **kwargs) -> argparse.Action:
+        """Add an argument to the parser of this host"""
+
+    @property
+    def commands(self) -> Tuple["wilderness.command.Command", ...]:
+        """The commands registered to this host
+
+        Nested subcommands are not included, see :func:`walk_commands` to
+        iterate over all commands. The returned tuple is cached until a
+        command is added.
+
+        Returns
+        -------
+        commands : Tuple[:class:`wilderness.command.Command`, ...]
+            The commands registered to the host.
+
+        """
+        if self._registry is None:
+            return ()
+        return self._registry.commands
+
+    @property
+    def groups(self) -> Tuple[Group, ...]:
+        """The groups registered to this host
+
+        If no groups have been added but commands have been added, this
+        property will contain a single group, the root group. The returned
+        tuple is cached until a group is added.
+
+        Returns
+        -------
+        groups: Tuple[:class:`wilderness.group.Group`, ...]
+            The groups registered to the host
+
+        """
+        if self._registry is None:
+            return ()
+        return self._registry.groups
+
+    @property
+    def registry(self) -> CommandRegistry:
+        """The registry of commands and groups of this host"""
+        if self._registry is None:
+            self._registry = CommandRegistry(
+                allow_prefix=self._allow_command_abbrev
+            )
+        return self._registry
+
+    def walk_commands(self) -> Iterator["wilderness.command.Command"]:
+        """Iterate over all commands, including nested subcommands
+
+        Commands are yielded depth-first, with each command preceding its
+        subcommands.
+
+        """
+        for command in self.commands:
+            yield command
+            yield from command.walk_commands()
+
+    def _walk_built_commands(self) -> Iterator["wilderness.command.Command"]:
+        # Like walk_commands, but without building the parsers of commands
+        if self._registry is None:
+            return
+        for command in self._registry:
+            if command._parser is not None:
+                yield command
+                yield from command._walk_built_commands()
+
+    def add(self, command: "wilderness.command.Command") -> None:
+        """Add a command
+
+        Note that the ``register`` method of the command is called when its
+        parser is first needed, which is typically when the command is
+        selected on the command line.
+
+        Parameters
+        ----------
+        command : :class:`wilderness.command.Command`
+            The command to add.
+
+        """
+        root = self.registry.root
+        if root is None:
+            root = Group(title="Available commands", is_root=True)
+            root.set_host(self)
+            self.registry.add_group(root)
+        root.add(command)
+
+    def add_group(self, title: str) -> Group:
+        """Create a group of commands
+
+        Parameters
+        ----------
+        title : str
+            The title for the group.
+
+        Returns
+        -------
+        :class:`wilderness.group.Group`
+            The created command group.
+
+        """
+        group = Group(title)
+        group.set_host(self)
+        self.registry.add_group(group)
+        return group
+
+    def _add_command(self, command: "wilderness.command.Command") -> None:
+        self.registry.add_command(command)
+        command._parent = self
+        if self._subparsers is not None:
+            self._subparsers.add_lazy_parser(command.name)
+        elif self._subparsers_ready:
+            self._ensure_subparsers()
+
+    def _ensure_subparsers(self) -> None:
+        if self._subparsers is not None:
+            return
+        # The stubs of add_subparsers don't allow the keyword arguments of
+        # custom actions, such as the index
+        options = {
+            "dest": self.subparsers_dest,
+            "metavar": self._cmd_name,
+            "action": SubParsersAction,
+            "index": self.registry.index,
+        }  # type: Dict[str, Any]
+        self._subparsers = cast(
+            SubParsersAction, self.parser.add_subparsers(**options)
+        )
+        self._subparsers.builder = self._build_parser
+        for command in self.registry:
+            self._subparsers.add_lazy_parser(command.name)
+
+    def _build_parser(self, name: str) -> ArgumentParser:
+        assert self._subparsers is not None
+        command = self.registry.get(name)
+        parser = self._subparsers.create_parser(
+            command.name, add_help=command._add_help
+        )
+        parser.help_provider = command
+        command.parser = parser
+        command.register()
+        if command.output_format is not None:
+            add_format_argument(command)
+        if command.parallel is not None:
+            add_jobs_argument(command)
+        if command.cancellable:
+            add_timeout_argument(command)
+
+        command._subparsers_ready = True
+        if command._registry is not None:
+            command._ensure_subparsers()
+
+        app = command.application
+        if app is not None:
+            app._configure_command(command)
+        return parser
+
+    def get_command(self, command_name: str) -> "wilderness.command.Command":
+        """Get a command by name
+
+        Commands can be found by their name or one of their aliases. If
+        command abbreviations are allowed, unique prefixes are also accepted.
+
+        Parameters
+        ----------
+        command_name : str
+            The name of the command to find
+
+        Returns
+        -------
+        command : :class:`wilderness.command.Command`
+            The instance of the Command to be returned.
+
+        Raises
+        ------
+        KeyError
+            If no command with the provided name can be found, a KeyError is
+            raised.
+
+        """
+        command = None
+        if self._registry is not None:
+            command = self._registry.resolve(command_name)
+        if command is None:
+            raise KeyError(command_name)
+        return command
+
+    def get_commands_text(self) -> str:
+        app = self._get_application()
+        assert app is not None
+        prefix = "-".join([app.name, *self.path])
+        text = []
+        for cmd in self.commands:
+            text.append(f"{prefix}-{cmd.name}(1)")
+            text.append(f"\t{cmd.title or ''}")
+            text.append("")
+        return "\n".join(text)
+
+    def format_help(self) -> str:
+        """Format the command line help
+
+        This method creates the help text for the command line, which is
+        typically printed when the -h / --help / help command line arguments
+        are used. The :func:`print_help` method calls this method to format
+        the help text.
+
+        Returns
+        -------
+        help_text : str
+            The help text as a single string.
+
+        """
+        parser = self.parser
+        formatter = argparse.RawTextHelpFormatter(prog=parser.prog)
+
+        # usage
+        formatter.add_usage(
+            parser.usage, parser._actions, parser._mutually_exclusive_groups
+        )
+
+        # prolog
+        formatter.add_text(self._prolog)
+
+        # add commands by group
+        for title, actions in self._command_sections():
+            formatter.start_section(title)
+            formatter.add_arguments(actions)
+            formatter.end_section()
+
+        # epilog
+        formatter.add_text(self._epilog)
+
+        # determine help from format above
+        return formatter.format_help()
+
+    def _command_sections(
+        self,
+    ) -> Iterator[Tuple[Optional[str], Sequence[argparse.Action]]]:
+        # add commands from root group, unless we only have help
+        root = self.registry.root
+        only_help = root and len(root) == 1 and root.commands[0].name == "help"
+        if root and not only_help:
+            yield root.title, root.commands_as_actions()
+
+        # add commands from other groups
+        for group in self.registry.named_groups:
+            yield group.title, group.commands_as_actions()
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        """The shared executor of the application for this command
+
+        This requires that the ``parallel`` attribute is set. The number of
+        workers is given by the ``--jobs`` option. See
+        :mod:`wilderness.parallel` for details.
+
+        """
+        if self.parallel is None:
+            raise ValueError(
+                "The executor requires the parallel attribute to be set"
+            )
+        app = self._get_application()
+        assert app is not None
+        jobs = getattr(self.args, "jobs", None) or default_jobs()
+        return app._executors.get(self.parallel, jobs)
+
+    @property
+    def cancellation(self) -> CancellationToken:
+        """The cancellation token of the current invocation
+
+        See :mod:`wilderness.cancellation` for details.
+        """
+        return current_token()
+
+    def progress(
+        self, name: str, total: Optional[float] = None, unit: str = ""
+    ) -> ProgressCounter:
+        """Create a counter that reports the progress of the command
+
+        The counter is advanced with its ``advance`` method, which can be
+        called from worker threads. See :mod:`wilderness.progress` for how
+        the progress is reported.
+
+        Parameters
+        ----------
+        name : str
+            The name of the counter, which is shown with the progress.
+
+        total : Optional[float]
+            The total of the counter when the command is done, if known.
+            This can also be set later, as the ``total`` attribute of the
+            counter.
+
+        unit : str
+            The unit of the counter, such as ``"files"``.
+
+        Returns
+        -------
+        counter : :class:`wilderness.progress.ProgressCounter`
+            The progress counter.
+
+        """
+        return current_reporter().counter(name, total=total, unit=unit)
+
+    @property
+    def stdin(self) -> IO[Any]:
+        """The standard input of the current invocation
+
+        See :mod:`wilderness.streams` for details.
+        """
+        return current_streams().stdin
+
+    @property
+    def stdout(self) -> IO[Any]:
+        """The standard output of the current invocation"""
+        return current_streams().stdout
+
+    @property
+    def stderr(self) -> IO[Any]:
+        """The standard error of the current invocation"""
+        return current_streams().stderr
+
+    def print_help(self, file: Optional[IO[str]] = None):
+        """Print the command line help text
+
+        Parameters
+        ----------
+        file : Optional[IO[str]]
+            The file to which to write the help text. If omitted, the help text
+            will be written to the standard output of the invocation.
+
+        """
+        if file is None:
+            file = self.stdout
+        message = self.format_help()
+        self.parser._print_message(message, file=file)
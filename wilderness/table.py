@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+
+"""Tables
+
+This module contains a writer for column-aligned tables, such as the output
+of ``df``, and the formatting of sizes that is used by such tools.
+
+Aligning the columns of a table requires the widths of the columns, which
+normally means that all rows are read before the first row is written. The
+:class:`TableWriter` instead determines the widths from the first rows (the
+lookahead window), and then writes every row as soon as it is given. The
+output therefore starts quickly and the memory use doesn't grow with the
+number of rows. Cells of later rows that are wider than their column are
+either written in full (which breaks the alignment of that row, as ``df``
+does for long device names), truncated, or wrapped onto continuation lines::
+
+    sizes = SizeFormatter.from_args(self.args)
+    columns = [
+        Column("Filesystem"),
+        Column("Size", align="right", formatter=sizes.format),
+        Column("Mounted on"),
+    ]
+    with TableWriter(self.stdout, columns) as table:
+        for fs in filesystems():
+            table.write_row((fs.device, fs.size, fs.mount_point))
+
+The :class:`SizeFormatter` formats numbers of bytes with the semantics of the
+``-h``, ``-H``, and ``-B SIZE`` options of the GNU coreutils.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import argparse
+import math
+import re
+
+from typing import IO
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+_UNITS = "KMGTPEZY"
+
+_SIZE = re.compile(r"^(\d*)([KMGTPEZY]?)(B|iB)?$", re.IGNORECASE)
+
+
+def parse_size(text: str) -> int:
+    """Parse a SIZE argument, as used by ``-B`` or ``--block-size``
+
+    A SIZE is an integer with an optional unit. The units K, M, G, T, P, E,
+    Z, and Y (and KiB, MiB, etc.) are powers of 1024, and KB, MB, etc. are
+    powers of 1000. The integer can be omitted, as in ``-BM``.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        If the size is invalid, so that this function can be used as the
+        ``type`` of an argument.
+
+    """
+    match = _SIZE.match(text.strip())
+    if match is None or not (match.group(1) or match.group(2)):
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    number, unit, suffix = match.groups()
+    value = int(number) if number else 1
+    if unit:
+        base = 1000 if suffix and suffix.upper() == "B" else 1024
+        value *= base ** (_UNITS.index(unit.upper()) + 1)
+    elif suffix and suffix.upper() != "B":
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    return value
+
+
+class SizeFormatter:
+    """Format sizes in bytes for display
+
+    Parameters
+    ----------
+    block_size : int
+        Sizes are shown as the number of blocks of this size, rounded up.
+        This is ignored for human-readable sizes.
+
+    human : Optional[int]
+        The base for human-readable sizes: 1024 (as ``-h``, giving sizes
+        such as ``1023M`` and ``1.5G``) or 1000 (as ``-H``, giving sizes
+        such as ``1.1G``). If None, sizes are shown in blocks.
+
+    """
+
+    def __init__(self, block_size: int = 1024, human: Optional[int] = None):
+        if human not in (None, 1000, 1024):
+            raise ValueError(f"Invalid base for human-readable sizes: {human}")
+        self._block_size = block_size
+        self._human = human
+
+    @classmethod
+    def from_args(
+        cls, args: argparse.Namespace, default_block_size: int = 1024
+    ) -> "SizeFormatter":
+        """Create a formatter from parsed command line arguments
+
+        The ``human_readable``, ``si``, and ``block_size`` attributes of the
+        arguments are used if present, where the block size can be a SIZE
+        string or an integer. As for ``df``, the last of ``-h`` and ``-H``
+        isn't tracked, so ``-h`` takes precedence.
+
+        """
+        if getattr(args, "human_readable", False):
+            return cls(human=1024)
+        if getattr(args, "si", False):
+            return cls(human=1000)
+        block_size = getattr(args, "block_size", None)
+        if isinstance(block_size, str):
+            block_size = parse_size(block_size)
+        return cls(block_size=block_size or default_block_size)
+
+    @property
+    def header(self) -> str:
+        """The header of a size column, such as ``1K-blocks`` or ``Size``"""
+        if self._human is not None:
+            return "Size"
+        size = self._block_size
+        for exponent in range(len(_UNITS), 0, -1):
+            for base, suffix in ((1024, ""), (1000, "B")):
+                unit = base**exponent
+                if size % unit == 0:
+                    count = size // unit
+                    return f"{count}{_UNITS[exponent - 1]}{suffix}-blocks"
+        return f"{size}B-blocks"
+
+    def format(self, size: Union[int, float, None]) -> str:
+        if size is None:
+            return "-"
+        size = math.ceil(size)
+        if self._human is None:
+            return str(-(-size // self._block_size))
+
+        base = self._human
+        if size < base:
+            return str(size)
+        exponent = 1
+        while size >= base ** (exponent + 1) and exponent < len(_UNITS):
+            exponent += 1
+        # Round up, as the coreutils do, using integers to avoid rounding
+        # errors. Rounding up can carry into the next unit.
+        unit = base**exponent
+        if size < 10 * unit:
+            tenths = -(-size * 10 // unit)
+            if tenths < 100:
+                return f"{tenths // 10}.{tenths % 10}{self._unit(exponent)}"
+        value = -(-size // unit)
+        if value >= base and exponent < len(_UNITS):
+            return f"1.0{self._unit(exponent + 1)}"
+        return f"{value}{self._unit(exponent)}"
+
+    def _unit(self, exponent: int) -> str:
+        unit = _UNITS[exponent - 1]
+        return "k" if self._human == 1000 and unit == "K" else unit
+
+
+class Column(NamedTuple):
+    """A column of a table
+
+    The ``align`` field is ``"left"`` or ``"right"``. The ``formatter``
+    converts the values in the column to text (by default with ``str``, and
+    None becomes an empty cell). The width of the column is at most
+    ``max_width``, if given.
+    """
+
+    title: str
+    align: str = "left"
+    formatter: Optional[Callable[[Any], str]] = None
+    max_width: Optional[int] = None
+
+
+class TableWriter:
+    """Write a column-aligned table with bounded memory
+
+    Parameters
+    ----------
+    stream : IO[str]
+        The stream to write the table to.
+
+    columns : Sequence[Union[Column, str]]
+        The columns of the table. Strings are used as titles of left-aligned
+        columns.
+
+    lookahead : int
+        The number of rows that are used to determine the widths of the
+        columns. These rows are held back until the widths are known, all
+        other rows are written immediately.
+
+    max_width : Optional[int]
+        The maximum width of the table. If the columns are wider, the widest
+        columns are narrowed until the table fits.
+
+    overflow : str
+        How to write cells that are wider than their column: ``"extend"``
+        writes the cell in full, ``"truncate"`` cuts it and ends it with
+        ``ellipsis``, and ``"reflow"`` wraps it onto continuation lines.
+
+    header : bool
+        Whether to write the titles of the columns.
+
+    separator : str
+        The text between the columns.
+
+    ellipsis : str
+        The text that ends truncated cells.
+
+    """
+
+    def __init__(
+        self,
+        stream: IO[str],
+        columns: Sequence[Union[Column, str]],
+        lookahead: int = 100,
+        max_width: Optional[int] = None,
+        overflow: str = "extend",
+        header: bool = True,
+        separator: str = " ",
+        ellipsis: str = "…",
+    ):
+        if overflow not in ("extend", "truncate", "reflow"):
+            raise ValueError(f"Unknown overflow mode: {overflow}")
+        self._stream = stream
+        self._columns = [
+            c if isinstance(c, Column) else Column(c) for c in columns
+        ]
+        self._lookahead = max(0, lookahead)
+        self._max_width = max_width
+        self._overflow = overflow
+        self._separator = separator
+        self._ellipsis = ellipsis
+        self._widths = None  # type: Optional[List[int]]
+        self._pending = []  # type: List[List[str]]
+        self._n_pending = 0
+        if header:
+            self._pending.append([c.title for c in self._columns])
+
+    @property
+    def widths(self) -> Optional[List[int]]:
+        """The widths of the columns, or None if not yet determined"""
+        return self._widths
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _format(self, row: Sequence[Any]) -> List[str]:
+        if len(row) != len(self._columns):
+            raise ValueError(
+                f"Expected {len(self._columns)} values, received {len(row)}"
+            )
+        cells = []
+        for column, value in zip(self._columns, row):
+            if column.formatter is not None:
+                cells.append(column.formatter(value))
+            else:
+                cells.append("" if value is None else str(value))
+        return cells
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """Write a row of values, one for every column"""
+        cells = self._format(row)
+        if self._widths is None and self._n_pending >= self._lookahead:
+            self._flush_pending()
+        if self._widths is not None:
+            self._write(cells)
+            return
+        self._pending.append(cells)
+        self._n_pending += 1
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def close(self) -> None:
+        """Write the rows that are held back"""
+        if self._widths is None:
+            self._flush_pending()
+
+    def _compute_widths(self) -> List[int]:
+        widths = [0] * len(self._columns)
+        for cells in self._pending:
+            for i, cell in enumerate(cells):
+                widths[i] = max(widths[i], len(cell))
+        for i, column in enumerate(self._columns):
+            if column.max_width is not None:
+                widths[i] = min(widths[i], column.max_width)
+
+        if self._max_width is not None:
+            sep = len(self._separator) * (len(widths) - 1)
+            excess = sum(widths) + sep - self._max_width
+            while excess > 0:
+                i = max(range(len(widths)), key=widths.__getitem__)
+                if widths[i] <= 1:
+                    break
+                widths[i] -= 1
+                excess -= 1
+        return widths
+
+    def _flush_pending(self) -> None:
+        self._widths = self._compute_widths()
+        pending, self._pending = self._pending, []
+        for cells in pending:
+            self._write(cells)
+
+    def _fit(self, cells: List[str]) -> List[List[str]]:
+        # Split the row into lines with cells that fit their column
+        assert self._widths is not None
+        if self._overflow == "extend":
+            return [cells]
+        if self._overflow == "truncate":
+            fitted = []
+            for cell, width in zip(cells, self._widths):
+                if len(cell) > width:
+                    keep = max(0, width - len(self._ellipsis))
+                    cell = (cell[:keep] + self._ellipsis)[:width]
+                fitted.append(cell)
+            return [fitted]
+        chunks = [
+            [c[i : i + w] for i in range(0, len(c), w)] or [""]
+            for c, w in zip(cells, (max(1, w) for w in self._widths))
+        ]
+        height = max(len(c) for c in chunks)
+        return [
+            [c[line] if line < len(c) else "" for c in chunks]
+            for line in range(height)
+        ]
+
+    def _write(self, cells: List[str]) -> None:
+        assert self._widths is not None
+        last = len(self._columns) - 1
+        lines = []
+        for line in self._fit(cells):
+            parts = []
+            for i, (cell, column) in enumerate(zip(line, self._columns)):
+                width = self._widths[i]
+                if column.align == "right":
+                    parts.append(cell.rjust(width))
+                elif i < last:
+                    parts.append(cell.ljust(width))
+                else:
+                    parts.append(cell)
+            lines.append(self._separator.join(parts).rstrip() + "\n")
+        self._stream.write("".join(lines))
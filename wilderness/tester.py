@@ -4,6 +4,18 @@
 
 This module contains the CommandTester class.
 
+The output of a command is captured by giving the command in-memory streams
+(see :mod:`wilderness.streams`). By default the streams in :mod:`sys` are
+also redirected, so that output written with ``print()`` is captured. Since
+this redirect affects the entire process, tests that run in parallel threads
+should create the tester with ``redirect=False`` and write output to
+``self.stdout`` and ``self.stderr`` in the command.
+
+The tester also measures the wall time, the CPU time, and the peak traced
+memory of each run, so that tests can check that a command stays within a
+performance budget, either given explicitly with :func:`Tester.assert_within`
+or stored in a baseline file with :func:`Tester.assert_baseline`.
+
 Author: G.J.J. van den Burg
 License: See the LICENSE file.
 Copyright: 2021, G.J.J. van den Burg
@@ -12,19 +24,98 @@ This file is part of Wilderness.
 """
 
 import contextlib
+import gc
 import io
+import json
+import os
+import time
+import tracemalloc
 
+from typing import Callable
+from typing import Dict
 from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Sequence
 
 from wilderness.application import Application
+from wilderness.command import Command
+from wilderness.files import closing_files
+from wilderness.records import handle_result
+from wilderness.streams import use_streams
+from wilderness.subcommands import SubcommandsMixin
+
+
+class Measurement(NamedTuple):
+    """Resources used by a run of a command or application"""
+
+    wall_ms: float
+    cpu_ms: float
+    peak_kb: float
 
 
 class Tester:
+    """Run commands or applications and capture their output
+
+    Parameters
+    ----------
+    app : :class:`wilderness.Application`
+        The application to test.
+
+    repeat : int
+        Number of times to run the command or application for each test. The
+        times that are recorded are the minimum over the runs and the peak
+        memory is the maximum, which makes the measurements more stable on
+        busy machines. The output and return code are those of the last run.
+
+    trace_memory : Optional[bool]
+        Whether to measure the peak memory with :mod:`tracemalloc`. Note that
+        tracing memory allocations slows down the run, which is included in
+        the recorded times. By default, memory is only traced if a baseline
+        file is given.
+
+    baseline_file : Optional[str]
+        Path to a JSON file with the stored measurements that are used by
+        :func:`assert_baseline`.
+
+    update_baseline : bool
+        Whether :func:`assert_baseline` should store the current measurements
+        in the baseline file instead of comparing against it. This can also
+        be enabled by setting the ``WILDERNESS_UPDATE_BASELINE`` environment
+        variable to ``1``.
+
+    redirect : bool
+        Whether to redirect :data:`sys.stdout` and :data:`sys.stderr` while
+        the command runs, in addition to setting the streams of the
+        invocation. Disable this (and don't enable ``trace_memory``, since
+        tracemalloc is also process-wide) to run testers in parallel
+        threads.
+
+    """
+
     __test__ = False  # for Pytest users
 
-    def __init__(self, app: Application) -> None:
+    def __init__(
+        self,
+        app: Application,
+        repeat: int = 1,
+        trace_memory: Optional[bool] = None,
+        baseline_file: Optional[str] = None,
+        update_baseline: bool = False,
+        redirect: bool = True,
+    ) -> None:
         self._app = app
+        self._repeat = max(1, repeat)
+        if trace_memory is None:
+            trace_memory = baseline_file is not None
+        self._trace_memory = trace_memory
+        self._baseline_file = baseline_file
+        self._update_baseline = update_baseline or (
+            os.environ.get("WILDERNESS_UPDATE_BASELINE") == "1"
+        )
+        self._measurement = None  # type: Optional[Measurement]
+        self._redirect = redirect
+        self._stdin = ""
 
     @property
     def application(self) -> Application:
@@ -34,6 +125,7 @@ class Tester:
         self._retcode = None
         self._io_stderr = None
         self._io_stdout = None
+        self._measurement = None
 
     def get_return_code(self) -> Optional[int]:
         return self._retcode
@@ -48,34 +140,232 @@ class Tester:
             return None
         return self._io_stderr.getvalue()
 
-    def test_command(self, cmd_name: str, args: List[str]) -> None:
+    def get_measurement(self) -> Optional[Measurement]:
+        """The resources used by the last test, if any"""
+        return self._measurement
+
+    def test_command(
+        self, cmd_name: str, args: List[str], stdin: Optional[str] = None
+    ) -> None:
+        """Run a command directly
+
+        Nested commands can be tested by giving the path to the command
+        separated by spaces, as in ``"remote add"``. The ``stdin`` argument
+        is the text that the command reads from its standard input.
+        """
         self.clear()
-        command = self.application.get_command(cmd_name)
-        if command is None:
+        self._stdin = "" if stdin is None else stdin
+        path = cmd_name.split()
+        host = self.application  # type: SubcommandsMixin
+        try:
+            for name in path:
+                host = host.get_command(name)
+        except KeyError:
             raise ValueError(f"No such command: {cmd_name}")
+        assert isinstance(host, Command)
+        command = host
 
-        args.insert(0, cmd_name)
+        args = [*path, *args]
         parser = self.application._parser
         parser.exit_on_error = False
-        parsed_args = parser.parse_args(args=args)
-        command.args = parsed_args
 
-        self._io_stdout = io.StringIO()
-        self._io_stderr = io.StringIO()
+        def run() -> int:
+            command.args = parser.parse_args(args=list(args))
+            with closing_files(), self.application._executors.invocation():
+                return handle_result(command, command.handle())
 
-        with contextlib.redirect_stdout(self._io_stdout):
-            with contextlib.redirect_stderr(self._io_stderr):
-                self._retcode = command.handle()
+        self._measure(run)
 
-    def test_application(self, args: Optional[List[str]] = None) -> None:
+    def test_application(
+        self, args: Optional[List[str]] = None, stdin: Optional[str] = None
+    ) -> None:
         self.clear()
+        self._stdin = "" if stdin is None else stdin
         args = [] if args is None else args
+        self._measure(
+            lambda: self.application.run(args=list(args), exit_on_error=False)
+        )
+
+    def _measure(self, func: Callable[[], int]) -> None:
+        wall = cpu = float("inf")
+        peak = 0
+        for _ in range(self._repeat):
+            self._io_stdout = io.StringIO()
+            self._io_stderr = io.StringIO()
+
+            # Start from a clean slate, so that the garbage of earlier runs
+            # isn't collected during this one and isn't counted in its peak
+            if self._trace_memory:
+                gc.collect()
+            tracing = self._trace_memory and not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            try:
+                before, _ = tracemalloc.get_traced_memory()
+                # The peak can only be reset since Python 3.9, before that
+                # it is exact only if the tracing is started here
+                if hasattr(tracemalloc, "reset_peak"):
+                    tracemalloc.reset_peak()
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                with contextlib.ExitStack() as stack:
+                    stack.enter_context(
+                        use_streams(
+                            stdin=io.StringIO(self._stdin),
+                            stdout=self._io_stdout,
+                            stderr=self._io_stderr,
+                        )
+                    )
+                    if self._redirect:
+                        stack.enter_context(
+                            contextlib.redirect_stdout(self._io_stdout)
+                        )
+                        stack.enter_context(
+                            contextlib.redirect_stderr(self._io_stderr)
+                        )
+                    self._retcode = func()
+                cpu = min(cpu, time.process_time() - cpu_start)
+                wall = min(wall, time.perf_counter() - wall_start)
+                _, run_peak = tracemalloc.get_traced_memory()
+                peak = max(peak, run_peak - before)
+            finally:
+                if tracing:
+                    tracemalloc.stop()
+
+        self._measurement = Measurement(
+            wall_ms=wall * 1e3, cpu_ms=cpu * 1e3, peak_kb=peak / 1024
+        )
 
-        self._io_stdout = io.StringIO()
-        self._io_stderr = io.StringIO()
+    def _require_measurement(self) -> Measurement:
+        if self._measurement is None:
+            raise ValueError(
+                "No measurement available, run test_command or "
+                "test_application first"
+            )
+        return self._measurement
 
-        with contextlib.redirect_stdout(self._io_stdout):
-            with contextlib.redirect_stderr(self._io_stderr):
-                self._retcode = self.application.run(
-                    args=args, exit_on_error=False
+    def assert_within(
+        self,
+        max_ms: Optional[float] = None,
+        max_kb: Optional[float] = None,
+        max_cpu_ms: Optional[float] = None,
+    ) -> None:
+        """Assert that the last test stayed within a performance budget
+
+        Parameters
+        ----------
+        max_ms : Optional[float]
+            Maximum wall time in milliseconds.
+
+        max_kb : Optional[float]
+            Maximum peak traced memory in kilobytes. Requires that the tester
+            traces memory.
+
+        max_cpu_ms : Optional[float]
+            Maximum CPU time in milliseconds.
+
+        Raises
+        ------
+        AssertionError
+            If the last test exceeded the budget.
+
+        """
+        measurement = self._require_measurement()
+        budget = {"wall_ms": max_ms, "cpu_ms": max_cpu_ms, "peak_kb": max_kb}
+        if max_kb is not None and not self._trace_memory:
+            raise ValueError("Memory budget requires trace_memory=True")
+        failures = [
+            f"{key} = {getattr(measurement, key):.2f} > {limit:.2f}"
+            for key, limit in budget.items()
+            if limit is not None and getattr(measurement, key) > limit
+        ]
+        if failures:
+            raise AssertionError(
+                "Performance budget exceeded: " + ", ".join(failures)
+            )
+
+    def assert_baseline(
+        self,
+        name: str,
+        tolerance: float = 0.25,
+        slack_ms: float = 1.0,
+        metrics: Sequence[str] = ("cpu_ms", "peak_kb"),
+    ) -> None:
+        """Assert that the last test didn't regress compared to a baseline
+
+        The measurements of the last test are compared to those stored
+        under the given name in the baseline file. If the baseline file
+        doesn't have an entry with this name yet, or if the tester was
+        created with ``update_baseline=True``, the current measurements are
+        stored instead.
+
+        By default the CPU time and the peak memory are compared, since these
+        are less sensitive than the wall time to other processes running on
+        the same machine.
+
+        Parameters
+        ----------
+        name : str
+            The name of the entry in the baseline file.
+
+        tolerance : float
+            Allowed relative increase compared to the baseline.
+
+        slack_ms : float
+            Allowed absolute increase of the times in milliseconds, on top of
+            the relative tolerance. This avoids spurious failures for fast
+            commands due to timer resolution and scheduling noise.
+
+        metrics : Sequence[str]
+            The measurements to compare, from ``"wall_ms"``, ``"cpu_ms"``,
+            and ``"peak_kb"``.
+
+        Raises
+        ------
+        AssertionError
+            If one of the measurements exceeds the baseline.
+
+        """
+        if self._baseline_file is None:
+            raise ValueError("No baseline file provided to the Tester")
+        measurement = self._require_measurement()
+        if "peak_kb" in metrics and not self._trace_memory:
+            raise ValueError("Memory baseline requires trace_memory=True")
+        baselines = self._read_baselines()
+        if self._update_baseline or name not in baselines:
+            baselines[name] = measurement._asdict()
+            self._write_baselines(baselines)
+            return
+
+        failures = []
+        baseline = baselines[name]
+        for key in metrics:
+            if key not in baseline:
+                continue
+            value = getattr(measurement, key)
+            limit = baseline[key] * (1 + tolerance)
+            if key.endswith("_ms"):
+                limit += slack_ms
+            if value > limit:
+                failures.append(
+                    f"{key} = {value:.2f} > {limit:.2f} "
+                    f"(baseline: {baseline[key]:.2f})"
                 )
+        if failures:
+            raise AssertionError(
+                f"Performance regression for {name!r}: " + ", ".join(failures)
+            )
+
+    def _read_baselines(self) -> Dict[str, Dict[str, float]]:
+        assert self._baseline_file is not None
+        try:
+            with open(self._baseline_file, "r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return {}
+
+    def _write_baselines(self, baselines: Dict[str, Dict[str, float]]):
+        assert self._baseline_file is not None
+        with open(self._baseline_file, "w", encoding="utf-8") as fp:
+            json.dump(baselines, fp, indent=2, sort_keys=True)
+            fp.write("\n")
@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+
+"""Tracing
+
+This module contains a lightweight tracer for nested spans. Commands can
+open spans themselves to time the phases of their work::
+
+    def handle(self):
+        with self.span("load-index"):
+            index = load_index()
+        with self.span("search", query=self.args.query):
+            ...
+
+and the application records spans for parsing the command line, finding the
+command (dispatch), and running the command (handle), all nested under a
+span for the entire run.
+
+When tracing is disabled, :func:`span` returns a shared object that does
+nothing, so spans can be left in the code at almost no cost. When tracing is
+enabled, finished spans are stored in a ring buffer of fixed size, so that
+long-running (batch or server) processes use bounded memory and keep the
+most recent spans. The spans are exported when the process exits, either in
+the Chrome trace event format (which can be opened in ``chrome://tracing``,
+Perfetto, or speedscope) or in a format that follows the JSON encoding of
+OTLP. Other exporters can be added with :func:`register_exporter`.
+
+Applications created with ``tracing=True`` get the ``--trace [FILE]`` and
+``--trace-format FORMAT`` options. As for the profilers, the
+``WILDERNESS_TRACE`` and ``WILDERNESS_TRACE_FORMAT`` environment variables
+enable tracing without the constructor flag.
+
+Author: G.J.J. van den Burg
+License: See the LICENSE file.
+Copyright: 2021, G.J.J. van den Burg
+
+This file is part of Wilderness.
+"""
+
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+
+from wilderness.hooks import Hook
+
+if TYPE_CHECKING:
+    import wilderness.application
+    import wilderness.command
+
+
+class SpanRecord(NamedTuple):
+    """A finished span"""
+
+    name: str
+    trace_id: int
+    span_id: int
+    parent_id: Optional[int]
+    start_ns: int
+    end_ns: int
+    thread_id: int
+    attributes: Dict[str, Any]
+
+
+_CURRENT_SPAN = contextvars.ContextVar(
+    "wilderness_current_span", default=None
+)  # type: contextvars.ContextVar[Optional[int]]
+
+_TRACER = None  # type: Optional[Tracer]
+
+
+class Span:
+    """An open span, used as a context manager"""
+
+    __slots__ = (
+        "_tracer",
+        "name",
+        "attributes",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        attributes: Dict[str, Any],
+        start_ns: Optional[int] = None,
+    ):
+        self._tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = tracer.new_id()
+        self.parent_id = None  # type: Optional[int]
+        self.start_ns = start_ns
+        self._token = None  # type: Optional[contextvars.Token]
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.parent_id = _CURRENT_SPAN.get()
+        self._token = _CURRENT_SPAN.set(self.span_id)
+        if self.start_ns is None:
+            self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        end_ns = time.perf_counter_ns()
+        assert self._token is not None
+        _CURRENT_SPAN.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        assert self.start_ns is not None
+        self._tracer.record(
+            self.name,
+            self.span_id,
+            self.parent_id,
+            self.start_ns,
+            end_ns,
+            self.attributes,
+        )
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Record finished spans in a ring buffer
+
+    Parameters
+    ----------
+    capacity : int
+        The number of spans that are kept. When the buffer is full, the
+        oldest spans are overwritten.
+
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self._capacity = capacity
+        self._buffer = [None] * capacity  # type: List[Optional[SpanRecord]]
+        self._index = itertools.count()
+        self._ids = itertools.count(1)
+        self._recorded = 0
+        self._trace_id = 0
+        self.new_trace()
+        # Offset between the performance counter and the epoch
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def dropped(self) -> int:
+        """The number of spans that were overwritten"""
+        return max(0, self._recorded - self._capacity)
+
+    @property
+    def trace_id(self) -> int:
+        return self._trace_id
+
+    def new_trace(self) -> int:
+        """Start a new trace, such as for a new run of the application"""
+        self._trace_id = int.from_bytes(os.urandom(16), "big")
+        return self._trace_id
+
+    def new_id(self) -> int:
+        return next(self._ids)
+
+    def to_epoch_ns(self, perf_ns: int) -> int:
+        return perf_ns + self._epoch_offset_ns
+
+    def record(
+        self,
+        name: str,
+        span_id: int,
+        parent_id: Optional[int],
+        start_ns: int,
+        end_ns: int,
+        attributes: Dict[str, Any],
+    ) -> None:
+        index = next(self._index)
+        self._recorded = index + 1
+        self._buffer[index % self._capacity] = SpanRecord(
+            name,
+            self._trace_id,
+            span_id,
+            parent_id,
+            start_ns,
+            end_ns,
+            threading.get_ident(),
+            attributes,
+        )
+
+    def span(
+        self, name: str, start_ns: Optional[int] = None, **attributes: Any
+    ) -> Span:
+        return Span(self, name, attributes, start_ns=start_ns)
+
+    def spans(self) -> List[SpanRecord]:
+        """The recorded spans, from oldest to newest"""
+        n = self._recorded
+        if n <= self._capacity:
+            items = self._buffer[:n]
+        else:
+            start = n % self._capacity
+            items = self._buffer[start:] + self._buffer[:start]
+        return [s for s in items if s is not None]
+
+    def clear(self) -> None:
+        self._buffer = [None] * self._capacity
+        self._index = itertools.count()
+        self._recorded = 0
+
+
+def get_tracer() -> Optional[Tracer]:
+    """The active tracer, or None if tracing is disabled"""
+    return _TRACER
+
+
+def enable_tracing(capacity: int = 4096) -> Tracer:
+    """Enable tracing, returning the active tracer"""
+    global _TRACER
+    if _TRACER is None:
+        _TRACER = Tracer(capacity=capacity)
+    return _TRACER
+
+
+def disable_tracing() -> None:
+    global _TRACER
+    _TRACER = None
+
+
+def span(name: str, **attributes: Any):
+    """Open a span, for use as a context manager
+
+    Parameters
+    ----------
+    name : str
+        The name of the span.
+
+    **attributes
+        Attributes of the span. Attributes can also be added with the
+        ``set_attribute`` method of the span.
+
+    """
+    tracer = _TRACER
+    if tracer is None:
+        return _NOOP_SPAN
+    return Span(tracer, name, attributes)
+
+
+Exporter = Callable[[Tracer, TextIO, Dict[str, Any]], None]
+
+EXPORTERS = {}  # type: Dict[str, Exporter]
+
+
+def register_exporter(name: str, exporter: Exporter) -> None:
+    """Register an exporter for use with ``--trace-format``
+
+    An exporter is called with the tracer, the file to write to, and the
+    attributes of the process (such as the application name and the command
+    line arguments).
+    """
+    EXPORTERS[name] = exporter
+
+
+def export_chrome(
+    tracer: Tracer, fp: TextIO, resource: Dict[str, Any]
+) -> None:
+    """Export spans in the Chrome trace event format"""
+    pid = os.getpid()
+    events = []
+    for record in tracer.spans():
+        args = dict(record.attributes)
+        args["span_id"] = record.span_id
+        if record.parent_id is not None:
+            args["parent_id"] = record.parent_id
+        events.append(
+            {
+                "name": record.name,
+                "ph": "X",
+                "ts": tracer.to_epoch_ns(record.start_ns) / 1e3,
+                "dur": (record.end_ns - record.start_ns) / 1e3,
+                "pid": pid,
+                "tid": record.thread_id,
+                "args": args,
+            }
+        )
+    json.dump(
+        {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {**resource, "dropped_spans": tracer.dropped},
+        },
+        fp,
+    )
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+    ]
+
+
+def export_otlp(tracer: Tracer, fp: TextIO, resource: Dict[str, Any]) -> None:
+    """Export spans following the JSON encoding of OTLP"""
+    spans = []
+    for record in tracer.spans():
+        item = {
+            "traceId": f"{record.trace_id:032x}",
+            "spanId": f"{record.span_id:016x}",
+            "name": record.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(tracer.to_epoch_ns(record.start_ns)),
+            "endTimeUnixNano": str(tracer.to_epoch_ns(record.end_ns)),
+            "attributes": _otlp_attributes(
+                {**record.attributes, "thread.id": record.thread_id}
+            ),
+        }
+        if record.parent_id is not None:
+            item["parentSpanId"] = f"{record.parent_id:016x}"
+        if "error" in record.attributes:
+            item["status"] = {"code": 2}  # STATUS_CODE_ERROR
+        spans.append(item)
+    json.dump(
+        {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes(resource)},
+                    "scopeSpans": [
+                        {"scope": {"name": "wilderness"}, "spans": spans}
+                    ],
+                }
+            ]
+        },
+        fp,
+    )
+
+
+register_exporter("chrome", export_chrome)
+register_exporter("otlp", export_otlp)
+
+
+class TracingHook(Hook):
+    """Hook that traces the run of the application
+
+    Parameters
+    ----------
+    add_options : bool
+        Whether to add the ``--trace`` and ``--trace-format`` options to the
+        application. If False, tracing is only controlled by the environment
+        variables.
+
+    capacity : int
+        The number of spans that are kept in the ring buffer.
+
+    """
+
+    def __init__(self, add_options: bool = True, capacity: int = 4096):
+        self._add_options = add_options
+        self._capacity = capacity
+        self._filename = None  # type: Optional[str]
+        self._format = "chrome"
+        self._resource = {}  # type: Dict[str, Any]
+        self._spans = []  # type: List[Span]
+        self._registered_exit = False
+
+    @staticmethod
+    def default_filename(app: "wilderness.application.Application") -> str:
+        return f"{app.name}.trace.json"
+
+    def register(self, app: "wilderness.application.Application") -> None:
+        if not self._add_options:
+            return
+        app.add_argument(
+            "--trace",
+            nargs="?",
+            const=self.default_filename(app),
+            metavar="FILE",
+            help="trace the phases of the command and write spans to FILE",
+            description=(
+                "Record the phases of the run (parsing, dispatch, and the "
+                "spans opened by the command) and write them to FILE "
+                f"(default: {self.default_filename(app)}) when the "
+                "application exits."
+            ),
+        )
+        app.add_argument(
+            "--trace-format",
+            choices=sorted(EXPORTERS),
+            help="format of the trace file (default: chrome)",
+            description=(
+                "The format of the trace file: the Chrome trace event format "
+                "(chrome, the default) or the JSON encoding of OTLP (otlp). "
+                "Implies --trace."
+            ),
+        )
+
+    def settings(
+        self, app: "wilderness.application.Application"
+    ) -> Tuple[Optional[str], str]:
+        """The output file and the format of the trace
+
+        Command line options take precedence over environment variables. The
+        output file is None if tracing is disabled.
+
+        """
+        filename = getattr(app.args, "trace", None)
+        fmt = getattr(app.args, "trace_format", None)
+        env = os.environ.get("WILDERNESS_TRACE")
+        if filename is None and env:
+            filename = self.default_filename(app) if env == "1" else env
+        if fmt is None:
+            fmt = os.environ.get("WILDERNESS_TRACE_FORMAT") or None
+        elif filename is None:
+            filename = self.default_filename(app)
+        return filename, fmt or "chrome"
+
+    def start(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+    ) -> None:
+        filename, fmt = self.settings(app)
+        if filename is None:
+            return
+        if fmt not in EXPORTERS:
+            app.parser.error(f"unknown trace format: {fmt}")
+            return
+        self._filename = filename
+        self._format = fmt
+        self._resource = {
+            "service.name": app.name,
+            "service.version": app.version,
+            "process.pid": os.getpid(),
+            "process.command_args": app.argv,
+        }
+
+        tracer = enable_tracing(capacity=self._capacity)
+        tracer.new_trace()
+
+        # Parsing and dispatch happen before the hooks start, so these spans
+        # are recorded from the timeline of the application
+        timeline = app.timeline
+        root = tracer.span(
+            "run",
+            start_ns=timeline.get("start"),
+            argv=" ".join(app.argv),
+        ).__enter__()
+        phases = ["start", "parsed", "dispatched"]
+        for name, begin, end in zip(["parse", "dispatch"], phases, phases[1:]):
+            if begin in timeline and end in timeline:
+                tracer.record(
+                    name,
+                    tracer.new_id(),
+                    root.span_id,
+                    timeline[begin],
+                    timeline[end],
+                    {},
+                )
+        handle = tracer.span("handle").__enter__()
+        if command is not None:
+            handle.set_attribute("command", " ".join(command.path))
+        self._spans = [root, handle]
+
+        if not self._registered_exit:
+            atexit.register(self.export)
+            self._registered_exit = True
+
+    def stop(
+        self,
+        app: "wilderness.application.Application",
+        command: Optional["wilderness.command.Command"],
+        return_code: Optional[int],
+    ) -> None:
+        if not self._spans:
+            return
+        root, handle = self._spans
+        self._spans = []
+        if return_code is None:
+            handle.set_attribute("error", "exception")
+        else:
+            handle.set_attribute("return_code", return_code)
+        handle.__exit__(None, None, None)
+        root.__exit__(None, None, None)
+
+    def export(self) -> None:
+        """Write the recorded spans to the trace file
+
+        This is called when the process exits. Errors are reported as a
+        warning, since failing to write the trace should not affect the
+        application.
+
+        """
+        tracer = get_tracer()
+        if tracer is None or self._filename is None:
+            return
+        exporter = EXPORTERS[self._format]
+        try:
+            with open(self._filename, "w", encoding="utf-8") as fp:
+                exporter(tracer, fp, self._resource)
+        except OSError as err:
+            print(
+                f"warning: unable to write trace to {self._filename}: {err}",
+                file=sys.stderr,
+            )